@@ -0,0 +1,108 @@
+import math
+import threading
+import time
+
+from django.conf import settings
+
+
+def write_rate_limit():
+    return getattr(settings, 'LIBRARY_WRITE_RATE_LIMIT', None)
+
+
+def client_key(request):
+    """
+    Whose token bucket a write draws from: the signed-in user, else the
+    remote address. Only identities the server vouches for count; headers
+    or body fields would let a client mint fresh buckets, or drain someone
+    else's.
+    """
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        return f'user:{user.pk}'
+    return f"ip:{request.META.get('REMOTE_ADDR', '')}"
+
+
+# ===============================
+# 🪣 Token Buckets
+# ===============================
+class RateLimiter:
+    """
+    One token bucket per client key: `burst` tokens, refilled at `rate`
+    per second, one taken per request. Idle buckets are full, so they are
+    dropped once more than `max_clients` are tracked.
+    """
+    def __init__(self, rate, burst, max_clients=10000):
+        self.rate = float(rate)
+        self.burst = float(burst)
+        self.max_clients = max_clients
+        self._lock = threading.Lock()
+        self._buckets = {}
+
+    def take(self, key, now=None):
+        """
+        Take a token for `key`. Returns 0 if one was available, else the
+        seconds until there will be.
+        """
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - updated) * self.rate)
+            if tokens >= 1:
+                self._buckets[key] = (tokens - 1, now)
+                return 0
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > self.max_clients:
+                self._prune(now)
+            return (1 - tokens) / self.rate
+
+    def _prune(self, now):
+        refill = self.burst / self.rate
+        for key, (_, updated) in list(self._buckets.items()):
+            if now - updated >= refill:
+                del self._buckets[key]
+
+
+# ===============================
+# 🚦 Write Concurrency Gate
+# ===============================
+class ConcurrencyGate:
+    """
+    At most `limit` writes run at once. A write that finds the gate full
+    waits up to `wait` seconds for a slot, with at most `queue_depth`
+    waiting; past either bound it is turned away rather than left to pile
+    up on the SQLite writer lock.
+    """
+    def __init__(self, limit, wait, queue_depth):
+        self.wait = wait
+        self.queue_depth = queue_depth
+        self._slots = threading.BoundedSemaphore(limit)
+        self._lock = threading.Lock()
+        self.waiting = 0
+
+    def enter(self):
+        """
+        `(admitted, queued_seconds)`; `queued_seconds` is None when the
+        caller did not wait, either because a slot was free or because the
+        queue was full. An admitted caller must call `leave()`.
+        """
+        if self._slots.acquire(blocking=False):
+            return True, None
+        with self._lock:
+            if self.waiting >= self.queue_depth:
+                return False, None
+            self.waiting += 1
+        start = time.perf_counter()
+        try:
+            admitted = self._slots.acquire(timeout=self.wait)
+        finally:
+            with self._lock:
+                self.waiting -= 1
+        return admitted, time.perf_counter() - start
+
+    def leave(self):
+        self._slots.release()
+
+
+def retry_after(seconds):
+    """`Retry-After` wants whole seconds; never advertise 0."""
+    return str(max(1, math.ceil(seconds)))
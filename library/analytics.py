@@ -0,0 +1,198 @@
+import datetime
+
+from django.db import transaction
+from django.db.models import Count, F, Max, Min, Sum
+from django.db.models.functions import TruncWeek
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from .cache import bump_model_version
+from .models import Book, BorrowHistory, DailyAuthorCirculation, DailyBookCirculation, DailyCirculation
+
+DEFAULT_RANGE_DAYS = 30
+MAX_RANGE_DAYS = 3660
+MAX_LIMIT = 100
+BATCH_SIZE = 5000
+
+
+# ===============================
+# 🔁 Rollup Refresh
+# ===============================
+def last_rolled_up_day():
+    return DailyCirculation.objects.aggregate(last=Max('day'))['last']
+
+
+def _insert(model, rows):
+    """
+    `bulk_create` an iterable of rows `BATCH_SIZE` at a time; returns the count.
+    """
+    written, batch = 0, []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == BATCH_SIZE:
+            model.objects.bulk_create(batch)
+            written, batch = written + len(batch), []
+    model.objects.bulk_create(batch)
+    return written + len(batch)
+
+
+def refresh_rollups(since=None, until=None):
+    """
+    Recompute the daily rollup rows for `since`..`until` from the borrow
+    history (archived loans included) with grouped aggregate queries,
+    replacing what was there.
+
+    `until` defaults to today. `since` defaults to the last day already
+    rolled up, which may have been partial, so a regular run only
+    aggregates the days since the previous one; on an empty rollup it
+    starts at the first checkout. Every day in the range gets a
+    DailyCirculation row, idle days included, so the latest row marks how
+    far the rollup goes. Returns `(days, title_days)` written.
+    """
+    until = until or timezone.localdate()
+    first = BorrowHistory.objects.aggregate(first=Min('checkout_date'))['first'] or until
+    if since is None:
+        since = last_rolled_up_day() or first
+    if since > until:
+        return 0, 0
+
+    day, days = max(since, first), {}
+    while day <= until:
+        days[day] = DailyCirculation(day=day)
+        day += datetime.timedelta(days=1)
+    checked_out = BorrowHistory.objects.order_by().filter(checkout_date__range=(since, until))
+    returned = BorrowHistory.objects.order_by().filter(return_date__range=(since, until))
+    with transaction.atomic():
+        for model in (DailyCirculation, DailyBookCirculation, DailyAuthorCirculation):
+            model.objects.filter(day__range=(since, until)).delete()
+        transaction.on_commit(lambda: bump_model_version(DailyCirculation))
+
+        for day, n in checked_out.values_list('checkout_date').annotate(n=Count('pk')):
+            days[day].checkouts = n
+        for day, n, duration in returned.values_list('return_date').annotate(
+            n=Count('pk'), duration=Sum(F('return_date') - F('checkout_date'))
+        ):
+            days[day].returns, days[day].loan_days = n, duration.days if duration else 0
+        _insert(DailyCirculation, days.values())
+
+        title_days = _insert(DailyBookCirculation, (
+            DailyBookCirculation(day=day, book_id=book_id, checkouts=n)
+            for day, book_id, n in checked_out.values_list('checkout_date', 'book_id')
+            .annotate(n=Count('pk')).iterator(chunk_size=BATCH_SIZE)
+        ))
+        _insert(DailyAuthorCirculation, (
+            DailyAuthorCirculation(day=day, author=author, checkouts=n)
+            for day, author, n in checked_out.values_list('checkout_date', 'book__author')
+            .annotate(n=Count('pk')).iterator(chunk_size=BATCH_SIZE)
+        ))
+
+    return len(days), title_days
+
+
+# ===============================
+# 📈 Reports
+# ===============================
+def parse_range(params):
+    """
+    `(from, to)` dates from `?from=` / `?to=`, defaulting to the last
+    `DEFAULT_RANGE_DAYS` days. Raises ValueError on bad input.
+    """
+    bounds = []
+    for name in ('from', 'to'):
+        value = params.get(name)
+        parsed = parse_date(value) if value else None
+        if value and parsed is None:
+            raise ValueError(f"Invalid date for '{name}'; use YYYY-MM-DD.")
+        bounds.append(parsed)
+    date_from, date_to = bounds
+    date_to = date_to or timezone.localdate()
+    date_from = date_from or date_to - datetime.timedelta(days=DEFAULT_RANGE_DAYS - 1)
+    if date_from > date_to:
+        raise ValueError("'from' must not be after 'to'.")
+    if (date_to - date_from).days >= MAX_RANGE_DAYS:
+        raise ValueError(f"A report may span at most {MAX_RANGE_DAYS} days.")
+    return date_from, date_to
+
+
+def parse_limit(params, default=10):
+    try:
+        limit = int(params.get('limit', default))
+    except (TypeError, ValueError):
+        raise ValueError("'limit' must be a whole number.")
+    if not 1 <= limit <= MAX_LIMIT:
+        raise ValueError(f"'limit' must be between 1 and {MAX_LIMIT}.")
+    return limit
+
+
+def _average(loan_days, returns):
+    return round(loan_days / returns, 2) if returns else None
+
+
+def top_books(date_from, date_to, limit=10):
+    """
+    Totals are ranked from the covering rollup index alone; titles are
+    fetched for the winners only.
+    """
+    rows = list(
+        DailyBookCirculation.objects.filter(day__range=(date_from, date_to))
+        .values('book_id').annotate(checkouts=Sum('checkouts'))
+        .order_by('-checkouts', 'book_id')[:limit]
+    )
+    books = Book.objects.in_bulk([row['book_id'] for row in rows])
+    return [
+        {"book_id": row['book_id'], "title": books[row['book_id']].title,
+         "author": books[row['book_id']].author, "checkouts": row['checkouts']}
+        for row in rows if row['book_id'] in books
+    ]
+
+
+def top_authors(date_from, date_to, limit=10):
+    return list(
+        DailyAuthorCirculation.objects.filter(day__range=(date_from, date_to))
+        .values('author').annotate(checkouts=Sum('checkouts'))
+        .order_by('-checkouts', 'author')[:limit]
+    )
+
+
+def circulation_series(date_from, date_to, interval='day'):
+    """
+    Checkouts, returns and average loan length per day or per week
+    (weeks start on Monday). Periods without activity are filled with
+    zeros so charts get an unbroken series.
+    """
+    rows = DailyCirculation.objects.filter(day__range=(date_from, date_to))
+    if interval == 'week':
+        rows = rows.annotate(period=TruncWeek('day')).values('period')
+        start, step = date_from - datetime.timedelta(days=date_from.weekday()), datetime.timedelta(weeks=1)
+    else:
+        rows = rows.annotate(period=F('day')).values('period')
+        start, step = date_from, datetime.timedelta(days=1)
+    totals = {
+        row['period']: row for row in rows.annotate(
+            total_checkouts=Sum('checkouts'), total_returns=Sum('returns'), total_loan_days=Sum('loan_days')
+        ).order_by('period')
+    }
+
+    series, period = [], start
+    while period <= date_to:
+        row = totals.get(period, {})
+        returns = row.get('total_returns', 0)
+        series.append({
+            "period": period,
+            "checkouts": row.get('total_checkouts', 0),
+            "returns": returns,
+            "average_loan_days": _average(row.get('total_loan_days', 0), returns),
+        })
+        period += step
+    return series
+
+
+def circulation_summary(date_from, date_to):
+    totals = DailyCirculation.objects.filter(day__range=(date_from, date_to)).aggregate(
+        checkouts=Sum('checkouts'), returns=Sum('returns'), loan_days=Sum('loan_days')
+    )
+    return {
+        "checkouts": totals['checkouts'] or 0,
+        "returns": totals['returns'] or 0,
+        "average_loan_days": _average(totals['loan_days'] or 0, totals['returns'] or 0),
+    }
@@ -0,0 +1,67 @@
+import datetime
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Max, Min
+from django.utils import timezone
+
+from .models import ArchivedBorrowRecord, BorrowRecord
+
+BATCH_SIZE = 10000
+COLUMNS = (
+    'id', 'customer_id', 'book_id', 'checkout_date', 'due_date', 'return_date', 'is_returned',
+    'updated_at', 'change_seq',
+)
+
+
+def archive_cutoff(days=None):
+    """
+    Loans returned before this date are old enough to archive.
+    """
+    days = getattr(settings, 'LIBRARY_ARCHIVE_AFTER_DAYS', 365) if days is None else days
+    return timezone.localdate() - datetime.timedelta(days=days)
+
+
+def archivable(before):
+    return BorrowRecord.objects.filter(return_date__lt=before)
+
+
+# ===============================
+# 🗄️ Archiving
+# ===============================
+def archive_returned_loans(before=None, batch_size=BATCH_SIZE, progress=None):
+    """
+    Move loans returned before `before` (default: `archive_cutoff()`) from
+    BorrowRecord into ArchivedBorrowRecord.
+
+    The hot table is walked in primary key ranges of `batch_size`. Each
+    range is moved with one `INSERT ... SELECT` and one `DELETE` of the
+    same rows, in its own short transaction, so borrows and returns only
+    ever wait for one chunk. Open loans are never touched. `progress`, if
+    given, is called with the running total after each chunk. Returns the
+    number of loans moved.
+    """
+    before = before or archive_cutoff()
+    bounds = archivable(before).aggregate(low=Min('pk'), high=Max('pk'))
+    if bounds['low'] is None:
+        return 0
+
+    quote = connection.ops.quote_name
+    columns = ', '.join(quote(column) for column in COLUMNS)
+    hot, cold = quote(BorrowRecord._meta.db_table), quote(ArchivedBorrowRecord._meta.db_table)
+    where = f"{quote('id')} >= %s AND {quote('id')} < %s AND {quote('return_date')} < %s"
+    insert = f"INSERT INTO {cold} ({columns}) SELECT {columns} FROM {hot} WHERE {where}"
+    delete = f"DELETE FROM {hot} WHERE {where}"
+
+    moved, low = 0, bounds['low']
+    while low <= bounds['high']:
+        params = [low, low + batch_size, connection.ops.adapt_datefield_value(before)]
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(insert, params)
+            copied = cursor.rowcount
+            cursor.execute(delete, params)
+        moved += copied
+        low += batch_size
+        if progress and copied:
+            progress(moved)
+    return moved
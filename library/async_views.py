@@ -0,0 +1,99 @@
+from asgiref.sync import sync_to_async
+from django.http import Http404
+from rest_framework import generics
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from .models import Book, BorrowHistory, BorrowRecord
+from .pagination import LibraryCursorPagination
+from .serializers import BookSerializer, BorrowHistorySerializer, BorrowRecordSerializer
+
+
+# ===============================
+# ⚡ Async Base Views
+# ===============================
+class AsyncAPIView(generics.GenericAPIView):
+    """
+    GenericAPIView with async handlers. DRF's own request setup
+    (authentication, permission and throttle classes) and exception
+    handling run around the handler exactly as for the sync views; the
+    parts that may touch the database run off the event loop.
+    """
+    async def dispatch(self, request, *args, **kwargs):
+        self.args, self.kwargs = args, kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+        try:
+            await sync_to_async(self.initial)(request, *args, **kwargs)
+            method = request.method.lower()
+            handler = getattr(self, method, None) if method in self.http_method_names else None
+            if handler is None:
+                self.http_method_not_allowed(request, *args, **kwargs)
+            response = await handler(request, *args, **kwargs)
+        except Exception as exc:
+            response = self.handle_exception(exc)
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
+
+    async def options(self, request, *args, **kwargs):
+        return await sync_to_async(APIView.options)(self, request, *args, **kwargs)
+
+
+class AsyncKeysetListView(AsyncAPIView):
+    """
+    Async list view paged newest first by primary key with the same
+    LibraryCursorPagination as the sync lists, so pages, cursors and
+    `next` links are interchangeable. The page is streamed with
+    `aiterator()` and serialized only after every related object is
+    loaded, so serialization never touches the database from the event
+    loop. Subclasses set `queryset` or override `get_queryset`, as with any
+    GenericAPIView.
+    """
+    replica_reads = True
+    pagination_class = LibraryCursorPagination
+
+    async def get(self, request, *args, **kwargs):
+        queryset = self.get_queryset()
+        setup = getattr(self.serializer_class, 'setup_eager_loading', None)
+        if setup:
+            queryset = setup(queryset)
+
+        page = self.paginator.page_queryset(queryset, request, view=self)
+        rows = [row async for row in (queryset if page is None else page).aiterator()]
+        if page is None:
+            return Response(self.get_serializer(rows, many=True).data)
+        rows = self.paginator.paginate_rows(rows)
+        return self.get_paginated_response(self.get_serializer(rows, many=True).data)
+
+
+# ===============================
+# 📚 ASYNC BOOK VIEWS
+# ===============================
+class AsyncBookListView(AsyncKeysetListView):
+    queryset = Book.objects.all()
+    serializer_class = BookSerializer
+
+
+class AsyncBookDetailView(AsyncAPIView):
+    async def get(self, request, pk):
+        try:
+            book = await Book.objects.aget(pk=pk)
+        except Book.DoesNotExist:
+            raise Http404("No Book matches the given query.")
+        return Response(BookSerializer(book).data)
+
+
+# ===============================
+# 📄 ASYNC BORROW RECORD VIEWS
+# ===============================
+class AsyncBorrowRecordListView(AsyncKeysetListView):
+    queryset = BorrowHistory.objects.all()
+    serializer_class = BorrowHistorySerializer
+
+
+class AsyncCustomerBorrowedBooksView(AsyncKeysetListView):
+    serializer_class = BorrowRecordSerializer
+
+    def get_queryset(self):
+        return BorrowRecord.objects.filter(customer_id=self.kwargs['customer_id'], return_date__isnull=True)
@@ -0,0 +1,225 @@
+import json
+import statistics
+import threading
+import time
+
+from django.core.handlers.wsgi import WSGIHandler
+from django.db.models import Max
+from django.test import RequestFactory, override_settings
+from django.urls import get_resolver
+
+from . import services
+from .models import Book, BorrowRecord, ChangeLog, Customer
+
+
+# ===============================
+# 🎯 Route Scenarios
+# ===============================
+def build_scenarios():
+    """
+    One request per named route in `library/urls.py`, built against rows
+    that exist in the current database. Write scenarios undo themselves
+    (borrow then return, upsert an existing row) so they can repeat.
+    """
+    # The borrow scenarios need a customer below the open-loan limit and a
+    # title they are not already borrowing.
+    customer = Customer.objects.order_by('open_loan_count', 'pk').first()
+    book = Book.objects.filter(copies_available__gt=0).exclude(
+        pk__in=BorrowRecord.objects.filter(customer=customer, return_date__isnull=True).values('book_id')
+    ).order_by('pk').first()
+    if book is None or customer is None:
+        raise ValueError("The database needs at least one available book and one customer; run seed_library.")
+    loan = BorrowRecord.objects.filter(return_date__isnull=True).order_by('pk').first()
+    loan_customer = loan.customer_id if loan else customer.pk
+    pair = {"customer_id": customer.pk, "book_id": book.pk}
+    book_row = {
+        "title": book.title, "author": book.author, "isbn": book.isbn,
+        "published_date": book.published_date.isoformat(), "copies_available": book.copies_available,
+    }
+    # Holds need a title with no copies on the shelf and a customer not
+    # already borrowing it.
+    held = Book.objects.filter(copies_available=0).order_by('pk').first()
+    holder = held and Customer.objects.exclude(
+        pk__in=BorrowRecord.objects.filter(book=held, return_date__isnull=True).values('customer_id')
+    ).order_by('pk').first()
+    hold_pair = {"customer_id": holder.pk, "book_id": held.pk} if holder else None
+    customer_row = {"name": customer.name, "email": customer.email, "membership_class": customer.membership_class}
+    # The change feed is read from its latest full page.
+    last_change = ChangeLog.objects.aggregate(last=Max('seq'))['last'] or 0
+
+    def get(path, data=None):
+        return [('get', path, data)]
+
+    def post(path, data):
+        return ('post', path, data)
+
+    hold_steps = (
+        [post('/api/holds/', hold_pair), post('/api/holds/cancel/', hold_pair)] if hold_pair
+        else get('/api/holds/', {'status': 'waiting'})
+    )
+
+    return {
+        'book-list-create': get('/api/books/'),
+        'book-detail': get(f'/api/books/{book.pk}/'),
+        'book-search': get('/api/books/search/', {'q': book.title.split()[0]}),
+        'book-cache-stats': get('/api/books/cache-stats/'),
+        'book-import': [post('/api/books/import/', {"rows": [book_row]})],
+        'customer-list-create': get('/api/customers/'),
+        'customer-detail': get(f'/api/customers/{customer.pk}/'),
+        'customer-import': [post('/api/customers/import/', {"rows": [customer_row]})],
+        'customer-borrowed-books': get(f'/api/customers/{loan_customer}/borrowed-books/'),
+        'customer-fines': get(f'/api/customers/{loan_customer}/fines/'),
+        'borrow-book': [post('/api/borrow/', pair), post('/api/return/', pair)],
+        'return-book': [post('/api/borrow/', pair), post('/api/return/', pair)],
+        'bulk-borrow': [post('/api/borrow/bulk/', {"items": [pair]}), post('/api/return/bulk/', {"items": [pair]})],
+        'bulk-return': [post('/api/borrow/bulk/', {"items": [pair]}), post('/api/return/bulk/', {"items": [pair]})],
+        'hold-list-create': hold_steps,
+        'hold-cancel': hold_steps,
+        'borrow-records': get('/api/borrow-records/'),
+        'borrow-records-export': get('/api/borrow-records/export/', {'customer_id': loan_customer, 'format': 'ndjson'}),
+        'overdue-books': get('/api/borrow-records/overdue/'),
+        'overdue-by-customer': get('/api/borrow-records/overdue/by-customer/'),
+        'book-request-create': get('/api/book-requests/'),
+        'book-request-list': get('/api/book-requests/list/'),
+        'analytics-top-books': get('/api/analytics/top-books/'),
+        'analytics-top-authors': get('/api/analytics/top-authors/'),
+        'analytics-circulation': get('/api/analytics/circulation/', {'interval': 'week'}),
+        'analytics-summary': get('/api/analytics/summary/'),
+        'change-feed': get('/api/changes/', {'since': max(0, last_change - 500)}),
+        'metrics': get('/api/metrics/'),
+        'async-book-list': get('/api/async/books/'),
+        'async-book-detail': get(f'/api/async/books/{book.pk}/'),
+        'async-borrow-records': get('/api/async/borrow-records/'),
+        'async-customer-borrowed-books': get(f'/api/async/customers/{loan_customer}/borrowed-books/'),
+    }
+
+
+def library_route_names():
+    resolver = get_resolver()
+    names = set()
+    for pattern in resolver.url_patterns:
+        for inner in getattr(pattern, 'url_patterns', []):
+            if getattr(inner, 'name', None) and inner.callback.__module__.startswith('library.'):
+                names.add(inner.name)
+    return names
+
+
+# ===============================
+# ⏱️ Runner
+# ===============================
+def percentile(sorted_values, fraction):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+def summarize(latencies, elapsed):
+    latencies = sorted(latencies)
+    return {
+        "requests": len(latencies),
+        "throughput": round(len(latencies) / elapsed, 1) if elapsed else None,
+        "p50_ms": round(statistics.median(latencies) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+    }
+
+
+class BenchmarkRunner:
+    """
+    Runs scenarios through the full Django request stack in process
+    (WSGI handler, middleware, views), without network noise.
+    """
+    def __init__(self, iterations=200, warmup=20):
+        self.iterations = iterations
+        self.warmup = warmup
+        # Scenarios replay the same writes from one client far faster than
+        # its token bucket allows; they measure route cost, not the limit.
+        with override_settings(LIBRARY_WRITE_RATE_LIMIT=None):
+            self.handler = WSGIHandler()
+        self.factory = RequestFactory()
+
+    def call(self, method, path, data):
+        if method == 'get':
+            request = self.factory.get(path, data or {})
+        else:
+            request = self.factory.post(path, json.dumps(data), content_type='application/json')
+        environ = dict(request.environ)
+        status = []
+        body = self.handler(environ, lambda code, headers, *args: status.append(code))
+        for _ in body:
+            pass
+        if hasattr(body, 'close'):
+            body.close()
+        code = int(status[0].split()[0])
+        if code >= 400:
+            raise RuntimeError(f"{method.upper()} {path} returned {status[0]}")
+
+    def run_scenario(self, steps):
+        for _ in range(self.warmup):
+            for step in steps:
+                self.call(*step)
+        latencies = []
+        start = time.perf_counter()
+        for _ in range(self.iterations):
+            for step in steps:
+                began = time.perf_counter()
+                self.call(*step)
+                latencies.append(time.perf_counter() - began)
+        return summarize(latencies, time.perf_counter() - start)
+
+    def run_contention(self, threads=8, seconds=5, books=3):
+        """
+        `threads` workers borrowing and returning the same few titles.
+        """
+        book_ids = list(Book.objects.filter(copies_available__gt=0).order_by('pk').values_list('pk', flat=True)[:books])
+        customer_ids = list(Customer.objects.order_by('pk').values_list('pk', flat=True)[:threads])
+        latencies, errors, lock = [], [], threading.Lock()
+        stop = time.perf_counter() + seconds
+
+        def worker(customer_id):
+            from django.db import connection
+            try:
+                while time.perf_counter() < stop:
+                    for book_id in book_ids:
+                        began = time.perf_counter()
+                        try:
+                            services.borrow_book(customer_id, book_id)
+                            services.return_book(customer_id, book_id)
+                        except services.CirculationError:
+                            pass
+                        except Exception as exc:
+                            with lock:
+                                errors.append(repr(exc))
+                            continue
+                        with lock:
+                            latencies.append(time.perf_counter() - began)
+            finally:
+                connection.close()
+
+        workers = [threading.Thread(target=worker, args=(customer_id,)) for customer_id in customer_ids]
+        start = time.perf_counter()
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        result = summarize(latencies, time.perf_counter() - start) if latencies else {"requests": 0}
+        result["errors"] = len(errors)
+        return result
+
+
+# ===============================
+# 📏 Baselines
+# ===============================
+def compare(results, baseline, max_regression):
+    """
+    Return a message for every route whose p50 latency grew or whose
+    throughput fell by more than `max_regression` percent.
+    """
+    failures = []
+    limit = 1 + max_regression / 100
+    for name, current in results.items():
+        before = baseline.get(name)
+        if not before or not current.get("requests") or not before.get("requests"):
+            continue
+        if current["p50_ms"] > before["p50_ms"] * limit:
+            failures.append(f"{name}: p50 {before['p50_ms']}ms -> {current['p50_ms']}ms")
+        if before.get("throughput") and current["throughput"] * limit < before["throughput"]:
+            failures.append(f"{name}: throughput {before['throughput']}/s -> {current['throughput']}/s")
+    return failures
@@ -0,0 +1,129 @@
+import hashlib
+import json
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import router
+from rest_framework import status
+from rest_framework.response import Response
+
+HITS_KEY = 'library:cache:hits'
+MISSES_KEY = 'library:cache:misses'
+
+
+def get_cache():
+    return caches[getattr(settings, 'LIBRARY_CACHE_ALIAS', 'default')]
+
+
+def is_process_local():
+    """
+    True when the cache lives in each process's memory, so versions bumped
+    in one process (another worker, a management command) are not seen by
+    the others; their cached responses go stale for up to
+    `LIBRARY_CACHE_TIMEOUT` seconds instead.
+    """
+    return isinstance(get_cache(), LocMemCache)
+
+
+def _incr(key):
+    cache = get_cache()
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # Missing (or evicted) counter: start it. add() loses no race.
+        if cache.add(key, 1, timeout=None):
+            return 1
+        return cache.incr(key)
+
+
+# ===============================
+# 🔢 Per-Model Versions
+# ===============================
+def version_key(model):
+    return f'library:version:{model._meta.label_lower}'
+
+
+def get_model_version(model):
+    # Seeded from the clock rather than 1, so a version evicted from the
+    # cache restarts above every version that was ever handed out.
+    return get_cache().get_or_set(version_key(model), time.time_ns() // 1000, timeout=None)
+
+
+def bump_model_version(model):
+    """
+    Invalidate every cached response for `model`. Entries keyed by the
+    old version are never read again and age out on their own.
+    """
+    key = version_key(model)
+    get_model_version(model)
+    return _incr(key)
+
+
+# ===============================
+# 📊 Hit / Miss Statistics
+# ===============================
+def cache_stats():
+    counts = get_cache().get_many([HITS_KEY, MISSES_KEY])
+    hits, misses = counts.get(HITS_KEY, 0), counts.get(MISSES_KEY, 0)
+    total = hits + misses
+    return {
+        "hits": hits,
+        "misses": misses,
+        "hit_ratio": round(hits / total, 4) if total else None,
+    }
+
+
+def make_etag(data):
+    payload = json.dumps(data, cls=DjangoJSONEncoder, sort_keys=True)
+    return '"{}"'.format(hashlib.sha1(payload.encode()).hexdigest())
+
+
+# ===============================
+# 🗄️ Read-Through View Mixin
+# ===============================
+class CachedResponseMixin:
+    """
+    Serves GET responses from the cache, keyed by the full request URL,
+    the current version of `cache_model` and the database alias the
+    request reads from, and answers a matching `If-None-Match` with 304.
+    Anything that changes `cache_model` must call `bump_model_version`
+    (see `library.signals`). Keying by alias keeps a response read from a
+    lagging replica away from clients pinned to the primary.
+
+    Invalidation only reaches processes sharing the cache backend; with a
+    process-local one (see `is_process_local`) other workers keep serving
+    their copy until it expires.
+    """
+    cache_model = None
+
+    def get_cache_key(self, request):
+        url = request.build_absolute_uri()
+        digest = hashlib.md5(url.encode()).hexdigest()
+        alias = router.db_for_read(self.cache_model)
+        version = get_model_version(self.cache_model)
+        return f'library:response:{self.cache_model._meta.label_lower}:v{version}:{alias}:{digest}'
+
+    def get(self, request, *args, **kwargs):
+        cache = get_cache()
+        key = self.get_cache_key(request)
+        cached = cache.get(key)
+
+        if cached is None:
+            _incr(MISSES_KEY)
+            response = super().get(request, *args, **kwargs)
+            if response.status_code != status.HTTP_200_OK:
+                return response
+            cached = {"data": response.data, "etag": make_etag(response.data)}
+            cache.set(key, cached, getattr(settings, 'LIBRARY_CACHE_TIMEOUT', 300))
+            outcome = 'MISS'
+        else:
+            _incr(HITS_KEY)
+            outcome = 'HIT'
+
+        headers = {"ETag": cached["etag"], "X-Cache": outcome}
+        if cached["etag"] in request.headers.get('If-None-Match', ''):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        return Response(cached["data"], headers=headers)
@@ -0,0 +1,68 @@
+from .models import Book, BorrowHistory, ChangeLog, Customer
+from .serializers import BookSerializer, BorrowHistorySerializer, CustomerSerializer
+
+DEFAULT_LIMIT = 500
+MAX_LIMIT = 1000
+
+# What each change log kind renders as. Loans are read from BorrowHistory
+# so archived ones still resolve.
+FEEDS = {
+    ChangeLog.BOOK: (Book, BookSerializer),
+    ChangeLog.CUSTOMER: (Customer, CustomerSerializer),
+    ChangeLog.BORROW_RECORD: (BorrowHistory, BorrowHistorySerializer),
+}
+
+
+def parse_params(params):
+    """
+    `(since, limit)` from `?since=` and `?limit=`. Raises ValueError on
+    bad input.
+    """
+    try:
+        since = int(params.get('since', 0))
+        limit = int(params.get('limit', DEFAULT_LIMIT))
+    except (TypeError, ValueError):
+        raise ValueError("'since' and 'limit' must be whole numbers.")
+    if since < 0:
+        raise ValueError("'since' must not be negative.")
+    if not 1 <= limit <= MAX_LIMIT:
+        raise ValueError(f"'limit' must be between 1 and {MAX_LIMIT}.")
+    return since, limit
+
+
+# ===============================
+# 🔄 Change Feed
+# ===============================
+def changes_since(since, limit=DEFAULT_LIMIT):
+    """
+    The next `limit` changes after sequence number `since`, oldest first.
+
+    One primary key range read of the change log, then one fast-path read
+    per kind for the rows still there, so a page costs the same however
+    large the tables are. A row that is gone by the time it is read comes
+    back as deleted. Clients store `next` and pass it as `since`.
+    """
+    entries = list(ChangeLog.objects.filter(seq__gt=since).order_by('seq')[:limit + 1])
+    has_more = len(entries) > limit
+    entries = entries[:limit]
+
+    rows = {}
+    for kind, (model, serializer) in FEEDS.items():
+        ids = [entry.object_id for entry in entries if entry.kind == kind and not entry.deleted]
+        if ids:
+            values = serializer.fast_values(model.objects.filter(pk__in=ids))
+            rows[kind] = {row['id']: row for row in serializer.fast_representation(values)}
+
+    results = []
+    for entry in entries:
+        data = rows.get(entry.kind, {}).get(entry.object_id)
+        results.append({
+            "seq": entry.seq, "type": entry.kind, "id": entry.object_id,
+            "deleted": data is None, "changed_at": entry.changed_at, "data": data,
+        })
+    return {
+        "since": since,
+        "next": entries[-1].seq if entries else since,
+        "has_more": has_more,
+        "results": results,
+    }
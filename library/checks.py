@@ -0,0 +1,36 @@
+from django.conf import settings
+from django.core.checks import Error, Tags, Warning, register
+
+from .cache import is_process_local
+
+
+# ===============================
+# 🩺 System Checks
+# ===============================
+@register(Tags.caches)
+def check_replica_cache(app_configs, **kwargs):
+    """
+    `sync_replicas` invalidates replica-keyed responses by bumping cache
+    versions; a process-local cache would keep every web worker serving
+    the old copy's responses.
+    """
+    if getattr(settings, 'LIBRARY_READ_ALIASES', []) and is_process_local():
+        return [Error(
+            "Read replicas are configured but the library cache is process-local (LocMemCache).",
+            hint="Point LIBRARY_CACHE_ALIAS at a shared backend such as Redis or Memcached.",
+            id='library.E001',
+        )]
+    return []
+
+
+@register(Tags.caches, deploy=True)
+def check_shared_cache(app_configs, **kwargs):
+    if is_process_local():
+        return [Warning(
+            "The library cache is process-local (LocMemCache): with several workers, cached book "
+            "and analytics responses can be stale for up to LIBRARY_CACHE_TIMEOUT seconds after "
+            "a write in another process, refresh_rollups included.",
+            hint="Point LIBRARY_CACHE_ALIAS at a shared backend such as Redis or Memcached.",
+            id='library.W001',
+        )]
+    return []
@@ -0,0 +1,64 @@
+import csv
+import datetime
+import json
+
+from .models import BorrowHistory
+
+EXPORT_COLUMNS = (
+    ('id', 'id'),
+    ('customer_id', 'customer_id'),
+    ('customer', 'customer__name'),
+    ('book_id', 'book_id'),
+    ('book', 'book__title'),
+    ('isbn', 'book__isbn'),
+    ('checkout_date', 'checkout_date'),
+    ('due_date', 'due_date'),
+    ('return_date', 'return_date'),
+    ('is_returned', 'is_returned'),
+)
+CHUNK_SIZE = 2000
+
+
+class _Echo:
+    """
+    File-like object whose write() hands the line back, so csv.writer
+    can format one row at a time.
+    """
+    def write(self, value):
+        return value
+
+
+def borrow_history_rows(customer_id=None, date_from=None, date_to=None):
+    """
+    Stream borrow history as tuples in EXPORT_COLUMNS order, oldest first,
+    from hot and archived loans alike. Filters are applied in SQL and rows
+    are fetched `CHUNK_SIZE` at a time.
+    """
+    queryset = BorrowHistory.objects.all()
+    if customer_id is not None:
+        queryset = queryset.filter(customer_id=customer_id)
+    if date_from is not None:
+        queryset = queryset.filter(checkout_date__gte=date_from)
+    if date_to is not None:
+        queryset = queryset.filter(checkout_date__lte=date_to)
+    fields = [field for _, field in EXPORT_COLUMNS]
+    return queryset.order_by('id').values_list(*fields).iterator(chunk_size=CHUNK_SIZE)
+
+
+def stream_csv(rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow([name for name, _ in EXPORT_COLUMNS])
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def stream_ndjson(rows):
+    names = [name for name, _ in EXPORT_COLUMNS]
+    for row in rows:
+        yield json.dumps(dict(zip(names, row)), default=_json_default) + '\n'
+
+
+def _json_default(value):
+    if isinstance(value, datetime.date):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
@@ -0,0 +1,149 @@
+from django.db import connection, transaction
+from django.db.models import Max, Min
+from django.utils import timezone
+
+from .models import BorrowRecord, Customer, FineLedgerEntry, LoanFine, fine_rule
+
+BATCH_SIZE = 50000
+
+
+def _owed(rule):
+    # Rule values are config integers, inlined so the CASE stays readable.
+    return (
+        f"MIN({int(rule['max_cents'])}, "
+        f"{int(rule['daily_cents'])} * MAX(0, days_overdue - {int(rule['grace_days'])}))"
+    )
+
+
+def _accrual_sql():
+    """
+    `(sql, class_params)`: a SELECT of the overdue open loans in an id
+    range with the fine each should have accrued by a day (`accrued`) and
+    how much of it is new (`delta`). The caller appends the parameters
+    `day, low, high, day`.
+    """
+    quote = connection.ops.quote_name
+    classes = [value for value, _ in Customer.MEMBERSHIP_CLASSES]
+    cases = ' '.join(f"WHEN %s THEN {_owed(fine_rule(value))}" for value in classes)
+    sql = f"""
+        SELECT loan_id, customer_id, book_id, accrued, accrued - previous AS delta FROM (
+            SELECT loan_id, customer_id, book_id, previous,
+                   CASE membership_class {cases} ELSE {_owed(fine_rule())} END AS accrued
+            FROM (
+                SELECT r.id AS loan_id, r.customer_id, r.book_id, c.membership_class,
+                       CAST(julianday(%s) - julianday(r.due_date) AS INTEGER) AS days_overdue,
+                       COALESCE(f.accrued_cents, 0) AS previous
+                FROM {quote(BorrowRecord._meta.db_table)} r
+                JOIN {quote(Customer._meta.db_table)} c ON c.id = r.customer_id
+                LEFT JOIN {quote(LoanFine._meta.db_table)} f ON f.loan_id = r.id
+                WHERE r.id >= %s AND r.id < %s AND r.return_date IS NULL AND r.due_date < %s
+            )
+        )
+        WHERE accrued > previous
+    """
+    return sql, classes
+
+
+# ===============================
+# 💸 Nightly Accrual
+# ===============================
+def compute_fines(day=None, batch_size=BATCH_SIZE, progress=None):
+    """
+    Accrue fines on every overdue open loan as of `day` (default today).
+
+    Loans are walked in primary key ranges of `batch_size`. Each range is
+    two set-based statements in one transaction: an upsert of the day's
+    FineLedgerEntry per customer, then an upsert of each loan's LoanFine.
+    A loan only contributes what it owes beyond what it already accrued,
+    so running again for the same day, or resuming an interrupted run,
+    posts nothing twice. `progress`, if given, is called with the running
+    total after each range. Returns the number of loans charged.
+    """
+    day = day or timezone.localdate()
+    last = FineLedgerEntry.objects.aggregate(last=Max('day'))['last']
+    if last and day < last:
+        raise ValueError(f"Fines are already posted up to {last}; balances only move forward.")
+
+    bounds = BorrowRecord.objects.filter(return_date__isnull=True, due_date__lt=day).aggregate(
+        low=Min('pk'), high=Max('pk')
+    )
+    if bounds['low'] is None:
+        return 0
+
+    quote = connection.ops.quote_name
+    ledger, fines = quote(FineLedgerEntry._meta.db_table), quote(LoanFine._meta.db_table)
+    accrual, class_params = _accrual_sql()
+    post = f"""
+        INSERT INTO {ledger} (customer_id, day, amount_cents, balance_cents)
+        SELECT a.customer_id, %s, SUM(a.delta), SUM(a.delta) + COALESCE((
+            SELECT e.balance_cents FROM {ledger} e WHERE e.customer_id = a.customer_id
+            ORDER BY e.day DESC LIMIT 1
+        ), 0)
+        FROM ({accrual}) a
+        WHERE true
+        GROUP BY a.customer_id
+        ON CONFLICT (customer_id, day) DO UPDATE SET
+            amount_cents = amount_cents + excluded.amount_cents,
+            balance_cents = balance_cents + excluded.amount_cents
+    """
+    record = f"""
+        INSERT INTO {fines} (loan_id, customer_id, book_id, accrued_cents, accrued_through)
+        SELECT a.loan_id, a.customer_id, a.book_id, a.accrued, %s
+        FROM ({accrual}) a
+        WHERE true
+        ON CONFLICT (loan_id) DO UPDATE SET
+            accrued_cents = excluded.accrued_cents,
+            accrued_through = excluded.accrued_through
+    """
+
+    stamp = connection.ops.adapt_datefield_value(day)
+    loans, low = 0, bounds['low']
+    while low <= bounds['high']:
+        params = [stamp, *class_params, stamp, low, low + batch_size, stamp]
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(post, params)
+            cursor.execute(record, params)
+            loans += cursor.rowcount
+        low += batch_size
+        if progress:
+            progress(loans)
+    return loans
+
+
+def balance(customer_id):
+    """
+    A customer's fine balance in cents and the day it was last posted.
+    """
+    latest = FineLedgerEntry.objects.filter(customer_id=customer_id).order_by('-day').values_list(
+        'balance_cents', 'day'
+    ).first()
+    return latest or (0, None)
+
+
+# ===============================
+# 🧾 Customer Statement
+# ===============================
+LEDGER_DAYS = 30
+LOAN_LIMIT = 50
+
+
+def customer_fines(customer_id):
+    """
+    The precomputed balance, the last `LEDGER_DAYS` ledger postings and the
+    fines on the customer's `LOAN_LIMIT` most recent charged loans. Reads only what the
+    nightly accrual wrote, so it costs a few index lookups.
+    """
+    balance_cents, as_of = balance(customer_id)
+    entries = FineLedgerEntry.objects.filter(customer_id=customer_id).order_by('-day').values(
+        'day', 'amount_cents', 'balance_cents'
+    )[:LEDGER_DAYS]
+    loans = LoanFine.objects.filter(customer_id=customer_id).order_by('-loan_id').values(
+        'loan_id', 'book_id', 'accrued_cents', 'accrued_through'
+    )[:LOAN_LIMIT]
+    return {
+        "customer_id": customer_id,
+        "balance_cents": balance_cents,
+        "as_of": as_of,
+        "ledger": list(entries),
+        "loans": list(loans),
+    }
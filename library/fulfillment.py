@@ -0,0 +1,41 @@
+from .models import BookRequest, match_key
+
+# Titles per candidate lookup and request ids per UPDATE, well under
+# SQLite's bound-parameter limit.
+BATCH_SIZE = 5000
+
+
+# ===============================
+# 📬 Book Request Fulfillment
+# ===============================
+def fulfil_requests(books):
+    """
+    Mark pending book requests fulfilled by any of `books`, an iterable of
+    `(title, author)` pairs. A request matches on its normalized title and,
+    if it named one, its normalized author.
+
+    The work is set-based: per batch of titles, one indexed lookup of the
+    pending requests with those titles and one UPDATE of the matches, so
+    the cost follows the number of new books, not of pending requests.
+    Returns the number of requests fulfilled.
+    """
+    authors_by_title = {}
+    for title, author in books:
+        key = match_key(title, 200)
+        if key:
+            authors_by_title.setdefault(key, set()).add(match_key(author, 100))
+
+    titles, fulfilled = list(authors_by_title), 0
+    for start in range(0, len(titles), BATCH_SIZE):
+        candidates = BookRequest.objects.filter(
+            is_fulfilled=False, title_key__in=titles[start:start + BATCH_SIZE]
+        ).values_list('pk', 'title_key', 'author_key')
+        matched = [
+            pk for pk, title_key, author_key in candidates
+            if not author_key or author_key in authors_by_title[title_key]
+        ]
+        for offset in range(0, len(matched), BATCH_SIZE):
+            fulfilled += BookRequest.objects.filter(
+                pk__in=matched[offset:offset + BATCH_SIZE], is_fulfilled=False
+            ).update(is_fulfilled=True)
+    return fulfilled
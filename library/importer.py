@@ -0,0 +1,230 @@
+import csv
+import datetime
+import json
+from itertools import islice
+
+from django.db import DatabaseError, transaction
+from django.db.models.functions import Lower
+
+from .fulfillment import fulfil_requests
+from .models import Book, Customer
+from .signals import invalidate_catalog
+
+DEFAULT_BATCH_SIZE = 5000
+
+
+class ImportResult:
+    def __init__(self):
+        self.created = 0
+        self.updated = 0
+        self.requests_fulfilled = 0
+        self.errors = []
+
+    def add_error(self, row_number, message):
+        self.errors.append({"row": row_number, "error": message})
+
+    def as_dict(self):
+        return {
+            "created": self.created, "updated": self.updated,
+            "requests_fulfilled": self.requests_fulfilled, "errors": self.errors,
+        }
+
+
+# ===============================
+# 🧹 Row Cleaning
+# ===============================
+def _required(row, field, max_length):
+    value = (row.get(field) or '').strip()
+    if not value:
+        raise ValueError(f"'{field}' is required.")
+    if len(value) > max_length:
+        raise ValueError(f"'{field}' is longer than {max_length} characters.")
+    return value
+
+
+def _supplied(row, field):
+    return row.get(field) not in (None, '')
+
+
+def _optional_int(row, field, default=None):
+    value = row.get(field)
+    if value in (None, ''):
+        return default
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"'{field}' must be a whole number.")
+    if value < 0:
+        raise ValueError(f"'{field}' must not be negative.")
+    return value
+
+
+def clean_book(row):
+    """
+    `(book, fields)`: the row as a Book and the optional columns it
+    supplies. `copies_available` only seeds new titles; on existing ones
+    it is live circulation state (loans, copies set aside for holds).
+    """
+    try:
+        published_date = datetime.date.fromisoformat(str(row.get('published_date') or '').strip())
+    except ValueError:
+        raise ValueError("'published_date' must be a YYYY-MM-DD date.")
+    return Book(
+        title=_required(row, 'title', 200),
+        author=_required(row, 'author', 100),
+        isbn=_required(row, 'isbn', 13),
+        published_date=published_date,
+        copies_available=_optional_int(row, 'copies_available', default=1),
+        loan_period_days=_optional_int(row, 'loan_period_days') or None,
+    ), [field for field in ('loan_period_days',) if _supplied(row, field)]
+
+
+def clean_customer(row):
+    """
+    `(customer, fields)`: the row as a Customer and the optional columns
+    it supplies, so a row without them leaves an existing customer's
+    phone and membership class alone.
+    """
+    email = _required(row, 'email', 254).lower()
+    if '@' not in email:
+        raise ValueError("'email' is not a valid email address.")
+    membership_class = (row.get('membership_class') or 'standard').strip()
+    if membership_class not in dict(Customer.MEMBERSHIP_CLASSES):
+        raise ValueError(f"Unknown membership_class '{membership_class}'.")
+    return Customer(
+        name=_required(row, 'name', 100),
+        email=email,
+        phone=(row.get('phone') or '').strip()[:20] or None,
+        membership_class=membership_class,
+    ), [field for field in ('phone', 'membership_class') if _supplied(row, field)]
+
+
+class CatalogImporter:
+    """
+    Upserts rows of one model keyed by a unique field. `clean` turns a row
+    into `(object, optional_fields)`; an existing row gets `update_fields`
+    plus only the optional fields its import row supplies. `key_lookup`,
+    if given, is the expression existing keys are matched on (e.g.
+    `Lower('email')`). `after_chunk`, if given, is called with each
+    upserted chunk's objects and returns the number of book requests they
+    fulfilled.
+    """
+    def __init__(self, model, unique_field, update_fields, clean, key_lookup=None, after_chunk=None):
+        self.model = model
+        self.unique_field = unique_field
+        self.update_fields = update_fields
+        self.clean = clean
+        self.key_lookup = key_lookup
+        self.after_chunk = after_chunk
+
+    def import_rows(self, rows, batch_size=DEFAULT_BATCH_SIZE, result=None):
+        """
+        Validate and upsert `rows` (an iterable of dicts) in chunks.
+
+        Each chunk costs one set-based lookup of existing keys (to tell
+        creates from updates), one `INSERT ... ON CONFLICT DO UPDATE`
+        per set of supplied optional columns and, for books, one batch
+        match against pending book requests. Invalid rows are reported in the result
+        and skipped; they never abort the import.
+        """
+        result = result or ImportResult()
+        numbered = enumerate(rows, start=1)
+        while True:
+            chunk = list(islice(numbered, batch_size))
+            if not chunk:
+                break
+            self._import_chunk(chunk, result)
+        if self.model is Book and (result.created or result.updated):
+            invalidate_catalog()
+        return result
+
+    def _import_chunk(self, chunk, result):
+        objects = {}
+        for row_number, row in chunk:
+            try:
+                obj, optional = self.clean(row)
+            except (ValueError, TypeError, AttributeError) as exc:
+                result.add_error(row_number, str(exc))
+                continue
+            # Later rows for the same key win, as they would row by row.
+            objects[getattr(obj, self.unique_field)] = (row_number, obj, tuple(optional))
+        if not objects:
+            return
+
+        existing = self._existing_keys(list(objects))
+        groups = {}
+        for key, (row_number, obj, optional) in objects.items():
+            if key in existing:
+                # Point the upsert at the stored key (e.g. its email's case).
+                setattr(obj, self.unique_field, existing[key])
+            groups.setdefault(optional, []).append((row_number, obj))
+        try:
+            with transaction.atomic():
+                for optional, group in groups.items():
+                    self.model.objects.bulk_create(
+                        [obj for _, obj in group],
+                        update_conflicts=True,
+                        unique_fields=[self.unique_field],
+                        update_fields=[*self.update_fields, *optional],
+                    )
+        except DatabaseError as exc:
+            for row_number, _, _ in objects.values():
+                result.add_error(row_number, f"Batch rejected by the database: {exc}")
+            return
+        result.updated += len(existing)
+        result.created += len(objects) - len(existing)
+        if self.after_chunk:
+            result.requests_fulfilled += self.after_chunk([obj for _, obj, _ in objects.values()])
+
+    def _existing_keys(self, keys):
+        """
+        `{cleaned key: stored key}` for the keys that already exist.
+        """
+        if self.key_lookup is None:
+            lookup = {f'{self.unique_field}__in': keys}
+            return {key: key for key in self.model.objects.filter(**lookup).values_list(self.unique_field, flat=True)}
+        return dict(
+            self.model.objects.annotate(import_key=self.key_lookup).filter(import_key__in=keys)
+            .values_list('import_key', self.unique_field)
+        )
+
+
+IMPORTERS = {
+    'books': CatalogImporter(
+        Book, 'isbn',
+        ['title', 'author', 'published_date'],
+        clean_book,
+        after_chunk=lambda books: fulfil_requests((book.title, book.author) for book in books),
+    ),
+    'customers': CatalogImporter(
+        Customer, 'email',
+        ['name'],
+        clean_customer,
+        # Emails are imported lowercased; match stored ones of any case.
+        key_lookup=Lower('email'),
+    ),
+}
+
+
+# ===============================
+# 📄 Input Formats
+# ===============================
+def read_rows(stream, input_format):
+    """
+    Yield dicts from a text stream of CSV (with a header row) or JSON Lines.
+    """
+    if input_format == 'csv':
+        yield from csv.DictReader(stream)
+    elif input_format == 'jsonl':
+        for line in stream:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError:
+                row = None
+            # Malformed lines become rows that fail cleaning and get reported.
+            yield row if isinstance(row, dict) else {}
+    else:
+        raise ValueError(f"Unsupported format '{input_format}'; use 'csv' or 'jsonl'.")
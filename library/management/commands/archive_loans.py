@@ -0,0 +1,35 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from library.archive import BATCH_SIZE, archivable, archive_cutoff, archive_returned_loans
+from library.models import ArchivedBorrowRecord, BorrowRecord
+
+
+class Command(BaseCommand):
+    help = (
+        "Move returned loans older than LIBRARY_ARCHIVE_AFTER_DAYS out of the hot "
+        "BorrowRecord table into the archive, in short chunked transactions. Run nightly."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than-days', type=int,
+                            help="Archive loans returned more than this many days ago.")
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help="Ids per chunk.")
+        parser.add_argument('--dry-run', action='store_true', help="Only count what would move.")
+
+    def handle(self, *args, older_than_days, batch_size, dry_run, **options):
+        before = archive_cutoff(older_than_days)
+        if dry_run:
+            self.stdout.write(f"{archivable(before).count()} loans returned before {before} would be archived.")
+            return
+
+        def progress(total):
+            self.stdout.write(f"  {total} archived")
+
+        start = time.perf_counter()
+        moved = archive_returned_loans(before, batch_size, progress=progress if options['verbosity'] > 1 else None)
+        self.stdout.write(self.style.SUCCESS(
+            f"{moved} loans returned before {before} archived in {time.perf_counter() - start:.2f}s; "
+            f"{BorrowRecord.objects.count()} hot, {ArchivedBorrowRecord.objects.count()} archived."
+        ))
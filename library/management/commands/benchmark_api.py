@@ -0,0 +1,77 @@
+import json
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+
+from library.benchmarks import BenchmarkRunner, build_scenarios, compare, library_route_names
+
+DEFAULT_BASELINE = Path(settings.BASE_DIR) / 'benchmarks' / 'baseline.json'
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark every route in library/urls.py plus concurrent borrow/return "
+        "contention, and optionally save or compare against a baseline."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=200)
+        parser.add_argument('--warmup', type=int, default=20)
+        parser.add_argument('--only', nargs='*', help="Route names to run (default: all).")
+        parser.add_argument('--contention-threads', type=int, default=8, help="0 skips the contention run.")
+        parser.add_argument('--contention-seconds', type=float, default=5)
+        parser.add_argument('--save-baseline', nargs='?', const=str(DEFAULT_BASELINE), metavar='PATH')
+        parser.add_argument('--compare', nargs='?', const=str(DEFAULT_BASELINE), metavar='PATH')
+        parser.add_argument('--max-regression', type=float, default=20, help="Allowed regression in percent.")
+
+    def handle(self, *args, **options):
+        try:
+            scenarios = build_scenarios()
+        except ValueError as exc:
+            raise CommandError(str(exc))
+        uncovered = library_route_names() - set(scenarios)
+        if uncovered:
+            raise CommandError(f"No benchmark scenario for: {', '.join(sorted(uncovered))}")
+        if options['only']:
+            scenarios = {name: scenarios[name] for name in options['only']}
+
+        runner = BenchmarkRunner(iterations=options['iterations'], warmup=options['warmup'])
+        results = {}
+        with override_settings(ALLOWED_HOSTS=['testserver', *settings.ALLOWED_HOSTS]):
+            for name, steps in scenarios.items():
+                results[name] = runner.run_scenario(steps)
+                self.report(name, results[name])
+        if options['contention_threads']:
+            results['contention'] = runner.run_contention(
+                threads=options['contention_threads'], seconds=options['contention_seconds']
+            )
+            self.report('contention', results['contention'])
+
+        if options['save_baseline']:
+            path = Path(options['save_baseline'])
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(json.dumps(results, indent=2, sort_keys=True) + '\n')
+            self.stdout.write(f"Baseline saved to {path}")
+
+        if options['compare']:
+            path = Path(options['compare'])
+            if not path.exists():
+                raise CommandError(f"No baseline at {path}; run with --save-baseline first.")
+            failures = compare(results, json.loads(path.read_text()), options['max_regression'])
+            if failures:
+                raise CommandError("Performance regressions:\n  " + "\n  ".join(failures))
+            self.stdout.write(self.style.SUCCESS(f"No regressions beyond {options['max_regression']}%."))
+
+    def report(self, name, result):
+        if not result.get("requests"):
+            self.stdout.write(f"{name:32} no successful requests, {result.get('errors', 0)} errors")
+            return
+        line = (
+            f"{name:32} {result['throughput']:>9,.1f} req/s  "
+            f"p50 {result['p50_ms']:>8.2f}ms  p99 {result['p99_ms']:>8.2f}ms"
+        )
+        if 'errors' in result:
+            line += f"  errors {result['errors']}"
+        self.stdout.write(line)
@@ -0,0 +1,132 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from library.models import ArchivedBorrowRecord, BorrowHistory, BorrowRecord, Customer
+from library.pagination import LibraryCursorPagination
+
+GROWTH_CHUNK = 500000
+
+# Synthetic history gets negative ids so it can never collide with loans
+# archived for real, which keep their BorrowRecord ids.
+GROW = """
+WITH RECURSIVE seq(n) AS (SELECT %s UNION ALL SELECT n + 1 FROM seq WHERE n < %s)
+SELECT -seq.n, c.id, b.id,
+       date('now', '-' || (400 + seq.n %% 3650) || ' days'),
+       date('now', '-' || (386 + seq.n %% 3650) || ' days'),
+       date('now', '-' || (393 + seq.n %% 3650) || ' days'),
+       1
+FROM seq
+JOIN bench_customers c ON c.slot = seq.n %% %s
+JOIN bench_books b ON b.slot = seq.n %% %s
+"""
+
+
+def percentile(timings, fraction):
+    return timings[min(len(timings) - 1, int(len(timings) * fraction))]
+
+
+class Command(BaseCommand):
+    help = (
+        "Grow the archived borrow history in steps (synthetic rows) and time the "
+        "open-loan lookups the borrow, return and borrowed-books endpoints run at each size."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='0,100000,1000000,10000000',
+                            help="Comma-separated archive sizes to measure at.")
+        parser.add_argument('--lookups', type=int, default=500, help="Lookups of each kind per size.")
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--max-growth', type=float,
+                            help="Fail if open-loan p50 at the largest size exceeds the smallest by this factor.")
+        parser.add_argument('--keep', action='store_true', help="Leave the synthetic history in place.")
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError("benchmark_archive grows history with SQLite SQL.")
+        sizes = sorted(int(size) for size in options['sizes'].split(','))
+        rng = random.Random(options['seed'])
+        open_loans = list(BorrowRecord.objects.filter(return_date__isnull=True)
+                          .values_list('customer_id', 'book_id')[:10000])
+        customers = list(Customer.objects.values_list('pk', flat=True)[:10000])
+        if not open_loans:
+            raise CommandError("No open loans to look up; seed the library first.")
+
+        with connection.cursor() as cursor:
+            for table, source in (('bench_customers', 'library_customer'), ('bench_books', 'library_book')):
+                cursor.execute(f"DROP TABLE IF EXISTS temp.{table}")
+                cursor.execute(f"CREATE TEMP TABLE {table} (slot INTEGER PRIMARY KEY, id INTEGER)")
+                cursor.execute(f"INSERT INTO {table} SELECT ROW_NUMBER() OVER (ORDER BY id) - 1, id FROM {source}")
+            cursor.execute("SELECT COUNT(*) FROM bench_customers")
+            customer_count = cursor.fetchone()[0]
+            cursor.execute("SELECT COUNT(*) FROM bench_books")
+            book_count = cursor.fetchone()[0]
+
+        page_size = LibraryCursorPagination.page_size or 50
+        lookups = {
+            'open loan (customer, book)': lambda: list(BorrowRecord.objects.filter(
+                return_date__isnull=True, **dict(zip(('customer_id', 'book_id'), rng.choice(open_loans)))
+            ).values_list('pk')[:1]),
+            'borrowed books page': lambda: list(BorrowRecord.objects.filter(
+                customer_id=rng.choice(customers), return_date__isnull=True
+            ).order_by('-pk')[:page_size + 1]),
+            'history page (union)': lambda: list(BorrowHistory.objects.filter(
+                customer_id=rng.choice(customers)
+            ).order_by('-pk')[:page_size + 1]),
+        }
+
+        grown, results = 0, []
+        try:
+            for size in sizes:
+                grown = self.grow(grown, size, customer_count, book_count)
+                row = {'size': ArchivedBorrowRecord.objects.count()}
+                for label, lookup in lookups.items():
+                    timings = []
+                    for _ in range(options['lookups']):
+                        start = time.perf_counter()
+                        lookup()
+                        timings.append((time.perf_counter() - start) * 1000)
+                    timings.sort()
+                    row[label] = (statistics.median(timings), percentile(timings, 0.99))
+                    self.stdout.write(
+                        f"{row['size']:>10} archived  {label:<28} "
+                        f"p50={row[label][0]:.3f}ms p99={row[label][1]:.3f}ms"
+                    )
+                results.append(row)
+        finally:
+            if not options['keep'] and grown:
+                self.stdout.write(f"Removing {grown} synthetic rows...")
+                with transaction.atomic():
+                    ArchivedBorrowRecord.objects.filter(pk__lt=0).delete()
+
+        if options['max_growth'] is not None and len(results) > 1:
+            for label in ('open loan (customer, book)', 'borrowed books page'):
+                first, last = results[0][label][0], results[-1][label][0]
+                if last > first * options['max_growth']:
+                    raise CommandError(
+                        f"{label} p50 grew from {first:.3f}ms to {last:.3f}ms "
+                        f"(more than {options['max_growth']}x) as history grew."
+                    )
+
+    def grow(self, grown, size, customer_count, book_count):
+        """
+        Add synthetic archived loans until `grown` reaches `size`, a chunk
+        per transaction. Returns the new total.
+        """
+        table = connection.ops.quote_name(ArchivedBorrowRecord._meta.db_table)
+        columns = 'id, customer_id, book_id, checkout_date, due_date, return_date, is_returned'
+        start = time.perf_counter()
+        while grown < size:
+            chunk = min(GROWTH_CHUNK, size - grown)
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.execute(
+                    f"INSERT INTO {table} ({columns}) {GROW}",
+                    [grown + 1, grown + chunk, customer_count, book_count],
+                )
+            grown += chunk
+        if time.perf_counter() - start > 1:
+            self.stdout.write(f"Grew archive to {grown} synthetic rows in {time.perf_counter() - start:.1f}s")
+        return grown
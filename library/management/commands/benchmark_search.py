@@ -0,0 +1,51 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from library.models import Book
+from library.search import search_books
+
+
+class Command(BaseCommand):
+    help = "Time full-text book searches against the current catalog and report latency percentiles."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--queries', type=int, default=500, help="Number of searches to run.")
+        parser.add_argument('--limit', type=int, default=50, help="Results per search.")
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--max-p99-ms', type=float, help="Fail if p99 latency exceeds this many ms.")
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        sample = list(Book.objects.order_by('?').values_list('title', 'author')[:1000])
+        if not sample:
+            raise CommandError("The catalog is empty; seed some books first.")
+
+        def make_query():
+            title, author = rng.choice(sample)
+            words = (title + ' ' + author).split()
+            kind = rng.randrange(3)
+            if kind == 0:
+                return rng.choice(words)
+            if kind == 1:
+                return rng.choice(words)[:3] + '*'
+            return '"{}"'.format(' '.join(title.split()[:2]))
+
+        timings = []
+        for _ in range(options['queries']):
+            q = make_query()
+            start = time.perf_counter()
+            search_books(q, limit=options['limit'])
+            timings.append((time.perf_counter() - start) * 1000)
+
+        timings.sort()
+        p50 = statistics.median(timings)
+        p99 = timings[min(len(timings) - 1, int(len(timings) * 0.99))]
+        self.stdout.write(
+            f"{Book.objects.count()} books, {len(timings)} queries: "
+            f"p50={p50:.2f}ms p99={p99:.2f}ms max={timings[-1]:.2f}ms"
+        )
+        if options['max_p99_ms'] is not None and p99 > options['max_p99_ms']:
+            raise CommandError(f"p99 {p99:.2f}ms exceeds {options['max_p99_ms']}ms")
@@ -0,0 +1,65 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from library.serializers import BookRequestSerializer, BookSerializer, BorrowRecordSerializer, CustomerSerializer
+
+SERIALIZERS = {
+    'books': BookSerializer,
+    'customers': CustomerSerializer,
+    'borrow-records': BorrowRecordSerializer,
+    'book-requests': BookRequestSerializer,
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Time one list page rendered with ModelSerializer against the fast read path "
+        "(.values() + fast_representation), query included, for each list serializer."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10000, help="Rows per page.")
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--min-speedup', type=float, help="Fail if any speedup is below this factor.")
+
+    def handle(self, *args, **options):
+        rows, repeat = options['rows'], options['repeat']
+        failures = []
+        for name, serializer_class in SERIALIZERS.items():
+            queryset = serializer_class.Meta.model.objects.order_by('-pk')
+            if hasattr(serializer_class, 'setup_eager_loading'):
+                queryset = serializer_class.setup_eager_loading(queryset)
+            page = queryset[:rows]
+            count = page.count()
+            if not count:
+                self.stdout.write(f"{name}: no rows, skipped")
+                continue
+
+            def model_serializer():
+                return serializer_class(list(page.all()), many=True).data
+
+            def fast_path():
+                return serializer_class.fast_representation(list(serializer_class.fast_values(page.all())))
+
+            slow, fast = self.best(model_serializer, repeat), self.best(fast_path, repeat)
+            speedup = slow / fast
+            self.stdout.write(
+                f"{name}: {count} rows  ModelSerializer {slow * 1000:.1f}ms  "
+                f"fast path {fast * 1000:.1f}ms  speedup {speedup:.1f}x"
+            )
+            if options['min_speedup'] is not None and speedup < options['min_speedup']:
+                failures.append(name)
+
+        if failures:
+            raise CommandError(f"Speedup below {options['min_speedup']}x for: {', '.join(failures)}")
+
+    @staticmethod
+    def best(func, repeat):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - start)
+        return statistics.median(timings)
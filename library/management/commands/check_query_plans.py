@@ -0,0 +1,104 @@
+import re
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Sum
+
+from library.models import (
+    Book, BorrowHistory, BorrowRecord, BookRequest, ChangeLog, Customer, DailyBookCirculation, FineLedgerEntry, Hold, LoanFine,
+)
+from library.pagination import LibraryCursorPagination
+from library.services import loan_counter_drift
+from library.views import (
+    BookRetrieveUpdateDeleteView,
+    BorrowRecordListView,
+    BookSearchView,
+    CustomerBorrowedBooksView,
+    OverdueBooksView,
+    OverdueByCustomerView,
+)
+
+# A bare "SCAN <table>" (no index) is a full table scan.
+FULL_SCAN = re.compile(r'\bSCAN (?P<table>\w+)\s*$')
+
+
+def view_queryset(view_class, **kwargs):
+    view = view_class(kwargs=kwargs)
+    return view.get_queryset()
+
+
+def view_page(view_class, filters=None, **kwargs):
+    """
+    The first page the view's cursor paginator fetches, after `filters`.
+    """
+    paginator = view_class.pagination_class or LibraryCursorPagination
+    ordering = paginator.ordering
+    if isinstance(ordering, str):
+        ordering = (ordering,)
+    size = paginator.page_size or 50
+    queryset = view_queryset(view_class, **kwargs).filter(**(filters or {}))
+    return queryset.order_by(*ordering)[:size + 1]
+
+
+def hot_paths():
+    """
+    The queries each request on a hot endpoint runs, keyed by a label.
+    """
+    return {
+        'book-detail': view_queryset(BookRetrieveUpdateDeleteView).filter(pk=1),
+        'book-search?title=': view_page(BookSearchView, {'title': 'Dune'}),
+        'book-search?author=': view_page(BookSearchView, {'author': 'Frank Herbert'}),
+        'customer-borrowed-books': view_page(CustomerBorrowedBooksView, customer_id=1),
+        'borrow: open loan lookup': BorrowRecord.objects.filter(
+            customer_id=1, book_id=1, return_date__isnull=True
+        ),
+        'overdue-books': view_page(OverdueBooksView),
+        'overdue-by-customer': view_page(OverdueByCustomerView),
+        'book-requests: pending queue': BookRequest.objects.filter(
+            is_fulfilled=False
+        ).order_by('date_requested'),
+        'book-requests: fulfillment match': BookRequest.objects.filter(
+            is_fulfilled=False, title_key__in=['dune', 'neuromancer']
+        ),
+        'borrow-records (history) by customer': view_page(BorrowRecordListView, {'customer_id': 1}),
+        'archive: archivable range': BorrowRecord.objects.filter(return_date__lt='2000-01-01'),
+        'rollups: checkouts since': BorrowHistory.objects.filter(checkout_date__gte='2000-01-01'),
+        'rollups: returns since': BorrowHistory.objects.filter(return_date__gte='2000-01-01'),
+        'analytics: top books': DailyBookCirculation.objects.filter(
+            day__range=('2000-01-01', '2000-01-31')
+        ).values('book_id').annotate(n=Sum('checkouts')),
+        'bulk: inventory lookup': Book.objects.filter(pk__in=[1, 2, 3]),
+        'holds: queue head': Hold.objects.filter(
+            book_id=1, status=Hold.WAITING
+        ).order_by('created_at', 'pk')[:1],
+        'holds: expiry sweep': Hold.objects.filter(status=Hold.READY, expires_on__lt='2000-01-01'),
+        'changes: feed page': ChangeLog.objects.filter(seq__gt=1).order_by('seq')[:501],
+        # The lookup the change log triggers run to replace an object's entry.
+        'changes: trigger replace': ChangeLog.objects.filter(kind=ChangeLog.BOOK, object_id=1),
+        'fines: overdue loans': BorrowRecord.objects.filter(return_date__isnull=True, due_date__lt='2000-01-01'),
+        'fines: balance': FineLedgerEntry.objects.filter(customer_id=1).order_by('-day')[:1],
+        'counters: drift': loan_counter_drift(Customer.objects.filter(pk=1)),
+        'fines: loan fines': LoanFine.objects.filter(customer_id=1).order_by('-loan_id')[:50],
+    }
+
+
+class Command(BaseCommand):
+    help = "Run EXPLAIN QUERY PLAN on the hot-path queries and fail on any full table scan."
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError("check_query_plans only understands SQLite query plans.")
+
+        offenders = []
+        for label, queryset in hot_paths().items():
+            plan = queryset.explain()
+            scans = [m.group('table') for m in map(FULL_SCAN.search, plan.splitlines()) if m]
+            if scans:
+                offenders.append(label)
+                self.stdout.write(self.style.ERROR(f"✗ {label}: full scan of {', '.join(scans)}"))
+            else:
+                self.stdout.write(self.style.SUCCESS(f"✓ {label}"))
+            if options['verbosity'] > 1:
+                self.stdout.write(plan)
+
+        if offenders:
+            raise CommandError(f"{len(offenders)} hot-path query(s) do a full table scan: {', '.join(offenders)}")
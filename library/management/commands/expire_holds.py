@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from library.services import expire_ready_holds
+
+
+class Command(BaseCommand):
+    help = (
+        "Expire ready holds whose pickup deadline has passed and pass their copies to "
+        "the next customer in each queue, or back to the shelf. Run daily."
+    )
+
+    def handle(self, *args, **options):
+        expired = expire_ready_holds()
+        self.stdout.write(self.style.SUCCESS(f"{expired} holds expired."))
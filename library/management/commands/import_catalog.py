@@ -0,0 +1,48 @@
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from library.importer import DEFAULT_BATCH_SIZE, IMPORTERS, read_rows
+
+
+class Command(BaseCommand):
+    help = "Bulk upsert books or customers from a CSV or JSON Lines file."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Input file, or '-' for stdin.")
+        parser.add_argument('--kind', choices=sorted(IMPORTERS), default='books')
+        parser.add_argument('--format', dest='input_format', choices=['csv', 'jsonl'],
+                            help="Input format. Defaults to the file extension.")
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+        parser.add_argument('--max-errors-shown', type=int, default=20)
+
+    def handle(self, *args, path, kind, input_format, batch_size, max_errors_shown, **options):
+        if input_format is None:
+            if path.endswith('.csv'):
+                input_format = 'csv'
+            elif path.endswith(('.jsonl', '.ndjson')):
+                input_format = 'jsonl'
+            else:
+                raise CommandError("Cannot tell the input format from the file name; pass --format.")
+
+        stream = sys.stdin if path == '-' else open(path, newline='', encoding='utf-8')
+        start = time.perf_counter()
+        try:
+            result = IMPORTERS[kind].import_rows(read_rows(stream, input_format), batch_size=batch_size)
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+        elapsed = time.perf_counter() - start
+
+        for error in result.errors[:max_errors_shown]:
+            self.stderr.write(f"row {error['row']}: {error['error']}")
+        if len(result.errors) > max_errors_shown:
+            self.stderr.write(f"... and {len(result.errors) - max_errors_shown} more errors")
+
+        rows = result.created + result.updated + len(result.errors)
+        self.stdout.write(self.style.SUCCESS(
+            f"{kind}: {result.created} created, {result.updated} updated, {len(result.errors)} errors "
+            f"in {elapsed:.2f}s ({rows / elapsed if elapsed else 0:,.0f} rows/s); "
+            f"{result.requests_fulfilled} book requests fulfilled"
+        ))
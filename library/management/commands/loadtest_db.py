@@ -0,0 +1,115 @@
+import datetime
+import random
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, close_old_connections, connection
+
+from library import services
+from library.models import Book, BorrowRecord, Customer
+from library.views import BorrowRecordListView
+
+ISBN_PREFIX = 'LT'
+EMAIL_DOMAIN = 'loadtest.invalid'
+# The journal mode lives in the database file, not the connection profile,
+# so set the one each profile is measured with.
+JOURNAL_MODES = {'stock': 'DELETE', 'tuned': 'WAL'}
+
+
+class Command(BaseCommand):
+    help = (
+        "Run concurrent readers and borrow/return writers against the configured "
+        "database and report throughput and lock errors. Compare profiles with "
+        "LIBRARY_DB_PROFILE=stock|tuned; the database file is switched to that "
+        "profile's journal mode."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seconds', type=float, default=10)
+        parser.add_argument('--readers', type=int, default=8)
+        parser.add_argument('--writers', type=int, default=4)
+        parser.add_argument('--books', type=int, default=200)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, seconds, readers, writers, books, seed, **options):
+        with connection.cursor() as cursor:
+            cursor.execute(f'PRAGMA journal_mode={JOURNAL_MODES[settings.LIBRARY_DB_PROFILE]}')
+        book_ids, customer_ids = self.create_fixtures(books, writers)
+        stop = threading.Event()
+        counts = Counter()
+        lock = threading.Lock()
+
+        def record(key):
+            with lock:
+                counts[key] += 1
+
+        def run(work, rng):
+            try:
+                while not stop.is_set():
+                    try:
+                        work(rng)
+                        record('ok')
+                    except services.CirculationError:
+                        record('rejected')
+                    except OperationalError as exc:
+                        record('locked' if 'locked' in str(exc) else 'db_error')
+            finally:
+                close_old_connections()
+                connection.close()
+
+        def read(rng):
+            list(BorrowRecordListView(kwargs={}).get_queryset().order_by('-id')[:50])
+            Book.objects.get(pk=rng.choice(book_ids))
+            record('reads')
+
+        def write(rng):
+            customer_id, book_id = rng.choice(customer_ids), rng.choice(book_ids)
+            try:
+                services.borrow_book(customer_id, book_id)
+            except services.AlreadyBorrowed:
+                services.return_book(customer_id, book_id)
+            record('writes')
+
+        threads = [
+            threading.Thread(target=run, args=(read, random.Random(seed + i))) for i in range(readers)
+        ] + [
+            threading.Thread(target=run, args=(write, random.Random(seed + 1000 + i))) for i in range(writers)
+        ]
+        try:
+            for thread in threads:
+                thread.start()
+            time.sleep(seconds)
+            stop.set()
+            for thread in threads:
+                thread.join()
+        finally:
+            self.delete_fixtures()
+
+        self.stdout.write(
+            f"profile={settings.LIBRARY_DB_PROFILE} readers={readers} writers={writers} {seconds:.0f}s: "
+            f"{counts['reads'] / seconds:,.0f} reads/s, {counts['writes'] / seconds:,.0f} writes/s, "
+            f"{counts['locked']} 'database is locked' errors, {counts['db_error']} other DB errors"
+        )
+
+    def create_fixtures(self, books, customers):
+        self.delete_fixtures()
+        Book.objects.bulk_create(
+            Book(title=f"Load test {i}", author="Load Test", isbn=f"{ISBN_PREFIX}{i:011d}",
+                 published_date=datetime.date(2000, 1, 1), copies_available=3)
+            for i in range(books)
+        )
+        Customer.objects.bulk_create(
+            Customer(name=f"Load tester {i}", email=f"tester{i}@{EMAIL_DOMAIN}")
+            for i in range(customers * 10)
+        )
+        book_ids = list(Book.objects.filter(isbn__startswith=ISBN_PREFIX).values_list('pk', flat=True))
+        customer_ids = list(Customer.objects.filter(email__endswith=EMAIL_DOMAIN).values_list('pk', flat=True))
+        return book_ids, customer_ids
+
+    def delete_fixtures(self):
+        BorrowRecord.objects.filter(book__isbn__startswith=ISBN_PREFIX).delete()
+        Book.objects.filter(isbn__startswith=ISBN_PREFIX).delete()
+        Customer.objects.filter(email__endswith=EMAIL_DOMAIN).delete()
@@ -0,0 +1,81 @@
+import asyncio
+import statistics
+import time
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+async def fetch(host, port, path, timeout, slow_send=0):
+    reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+    try:
+        writer.write(f"GET {path} HTTP/1.1\r\nHost: {host}\r\n".encode())
+        if slow_send:
+            # A slow client (e.g. on a mobile link) trickling its request in.
+            await writer.drain()
+            await asyncio.sleep(slow_send)
+        writer.write(b"Connection: close\r\n\r\n")
+        await writer.drain()
+        status_line = await asyncio.wait_for(reader.readline(), timeout)
+        await asyncio.wait_for(reader.read(), timeout)
+        return int(status_line.split()[1])
+    finally:
+        writer.close()
+
+
+class Command(BaseCommand):
+    help = (
+        "Drive many concurrent HTTP clients at a running server and report latency "
+        "percentiles, e.g. to compare the sync routes under a WSGI server with the "
+        "/api/async/ routes under an ASGI server."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('url', help="e.g. http://127.0.0.1:8000/api/async/borrow-records/")
+        parser.add_argument('--concurrency', type=int, default=200)
+        parser.add_argument('--seconds', type=float, default=10)
+        parser.add_argument('--timeout', type=float, default=30)
+        parser.add_argument('--slow-send', type=float, default=0,
+                            help="Seconds each client pauses halfway through sending its request.")
+
+    def handle(self, *args, url, concurrency, seconds, timeout, slow_send, **options):
+        parts = urlsplit(url)
+        if parts.scheme != 'http' or not parts.hostname:
+            raise CommandError("Only plain http:// URLs are supported.")
+        path = parts.path + (f"?{parts.query}" if parts.query else '')
+        latencies, failures = asyncio.run(
+            self.run(parts.hostname, parts.port or 80, path, concurrency, seconds, timeout, slow_send)
+        )
+        if not latencies:
+            raise CommandError(f"No successful requests ({failures} failures).")
+
+        latencies.sort()
+
+        def percentile(p):
+            return latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000
+
+        self.stdout.write(
+            f"{concurrency} clients, {len(latencies)} ok, {failures} failed, "
+            f"{len(latencies) / seconds:,.0f} req/s: p50={statistics.median(latencies) * 1000:.1f}ms "
+            f"p90={percentile(0.90):.1f}ms p99={percentile(0.99):.1f}ms"
+        )
+
+    async def run(self, host, port, path, concurrency, seconds, timeout, slow_send):
+        latencies, failures = [], 0
+        deadline = time.perf_counter() + seconds
+
+        async def client():
+            nonlocal failures
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                try:
+                    status = await fetch(host, port, path, timeout, slow_send)
+                except (OSError, asyncio.TimeoutError, ValueError, IndexError):
+                    status = None
+                if status == 200:
+                    latencies.append(time.perf_counter() - start)
+                else:
+                    failures += 1
+
+        await asyncio.gather(*(client() for _ in range(concurrency)))
+        return latencies, failures
@@ -0,0 +1,57 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Max, Min
+
+from library.models import Customer
+from library.services import loan_counter_drift, recompute_loan_counters
+
+COUNTERS = (
+    ('open_loan_count', 'actual_open'),
+    ('overdue_loan_count', 'actual_overdue'),
+    ('lifetime_loan_count', 'actual_lifetime'),
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the per-customer loan counters from borrow records in bulk SQL and "
+        "report any drift. Run daily: it also brings overdue counts up to date."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=10000, help="Customers per UPDATE.")
+        parser.add_argument('--dry-run', action='store_true', help="Report drift without fixing it.")
+        parser.add_argument('--show', type=int, default=10, help="Drifted customers to list.")
+        parser.add_argument('--fail-on-drift', action='store_true')
+
+    def handle(self, *args, batch_size, dry_run, show, fail_on_drift, **options):
+        start = time.perf_counter()
+        bounds = Customer.objects.aggregate(low=Min('pk'), high=Max('pk'))
+        drifted, totals, samples = 0, dict.fromkeys((name for name, _ in COUNTERS), 0), []
+
+        low = bounds['low']
+        while low is not None and low <= bounds['high']:
+            chunk = Customer.objects.filter(pk__gte=low, pk__lt=low + batch_size)
+            with transaction.atomic():
+                for row in loan_counter_drift(chunk).values('pk', *(f for pair in COUNTERS for f in pair)):
+                    drifted += 1
+                    for stored, actual in COUNTERS:
+                        totals[stored] += abs(row[stored] - row[actual])
+                    if len(samples) < show:
+                        samples.append(row)
+                if not dry_run:
+                    recompute_loan_counters(chunk)
+            low += batch_size
+
+        for row in samples:
+            self.stdout.write(f"  customer {row['pk']}: " + ", ".join(
+                f"{stored}={row[stored]} (actual {row[actual]})" for stored, actual in COUNTERS
+            ))
+        summary = ", ".join(f"{name} off by {total}" for name, total in totals.items())
+        verb = "found" if dry_run else "fixed"
+        message = f"{drifted} customers drifted ({summary}); {verb} in {time.perf_counter() - start:.1f}s."
+        if drifted and fail_on_drift:
+            raise CommandError(message)
+        self.stdout.write(self.style.WARNING(message) if drifted else self.style.SUCCESS(message))
@@ -0,0 +1,44 @@
+import datetime
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from library.analytics import refresh_rollups
+from library.cache import is_process_local
+
+
+class Command(BaseCommand):
+    help = (
+        "Refresh the daily circulation rollups behind /api/analytics/. By default only "
+        "the days since the last refresh are recomputed; schedule it as often as the "
+        "dashboards need fresh figures."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', help="First day to recompute (YYYY-MM-DD).")
+        parser.add_argument('--until', help="Last day to recompute (YYYY-MM-DD); defaults to today.")
+        parser.add_argument('--full', action='store_true', help="Rebuild from the first checkout.")
+
+    def handle(self, *args, since, until, full, **options):
+        bounds = []
+        for name, value in (('since', since), ('until', until)):
+            parsed = parse_date(value) if value else None
+            if value and parsed is None:
+                raise CommandError(f"--{name} must be a YYYY-MM-DD date.")
+            bounds.append(parsed)
+        since, until = bounds
+        if full:
+            if since:
+                raise CommandError("--full and --since are mutually exclusive.")
+            since = datetime.date.min
+        start = time.perf_counter()
+        days, book_rows = refresh_rollups(since, until)
+        self.stdout.write(self.style.SUCCESS(
+            f"{days} days and {book_rows} title-days rolled up in {time.perf_counter() - start:.2f}s."
+        ))
+        if is_process_local():
+            self.stdout.write(self.style.WARNING(
+                "The cache is process-local, so running servers keep serving cached analytics "
+                "for up to LIBRARY_CACHE_TIMEOUT seconds."
+            ))
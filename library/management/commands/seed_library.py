@@ -0,0 +1,296 @@
+import datetime
+import itertools
+import random
+import re
+import time
+from contextlib import contextmanager, nullcontext
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from library.models import ArchivedBorrowRecord, Book, BookRequest, BorrowRecord, ChangeLog, Customer, loan_period_days
+from library.services import recompute_loan_counters
+from library.signals import invalidate_catalog
+
+BATCH_SIZE = 20000
+# Rebuilding indexes after the load only pays off for large seeds.
+DEFER_INDEXES_ABOVE = 100_000
+LOAN_FIELDS = ('customer', 'book', 'checkout_date', 'due_date', 'return_date', 'is_returned')
+SUFFIXES = {'': 1, 'k': 1_000, 'm': 1_000_000}
+
+
+def count(value):
+    """
+    Parse a row count such as `5000`, `200k`, `1M` or `1_000_000`.
+    """
+    match = re.fullmatch(r'(\d+(?:\.\d+)?)([kKmM]?)', value.replace('_', ''))
+    if not match:
+        raise ValueError(value)
+    return int(float(match.group(1)) * SUFFIXES[match.group(2).lower()])
+
+
+def fraction(value):
+    value = float(value)
+    if not 0 <= value <= 1:
+        raise ValueError(value)
+    return value
+
+
+def zipf_cum_weights(n, exponent):
+    """
+    Cumulative weights for random.choices() where item i is picked with
+    probability proportional to 1 / (i + 1) ** exponent.
+    """
+    return list(itertools.accumulate(1 / (rank ** exponent) for rank in range(1, n + 1)))
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(itertools.islice(iterator, size)):
+        yield batch
+
+
+@contextmanager
+def deferred_indexes(*models):
+    """
+    Drop the models' declared indexes and constraints for the duration of
+    a bulk load and rebuild them once at the end, which is far cheaper
+    than maintaining them row by row. Foreign keys are already deferred
+    until commit on SQLite.
+    """
+    dropped = []
+    with connection.schema_editor() as editor:
+        for model in models:
+            for index in model._meta.indexes:
+                editor.remove_index(model, index)
+                dropped.append(('add_index', model, index))
+            for constraint in model._meta.constraints:
+                editor.remove_constraint(model, constraint)
+                dropped.append(('add_constraint', model, constraint))
+    try:
+        yield
+    finally:
+        with connection.schema_editor() as editor:
+            for method, model, item in dropped:
+                getattr(editor, method)(model, item)
+
+
+class Command(BaseCommand):
+    help = (
+        "Fill the database with a deterministic synthetic library for profiling and "
+        "benchmarks: Zipf-skewed title popularity, a mix of returned, open and overdue "
+        "loans, written with bulk_create while indexes are deferred."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--books', type=count, default=1000, help="e.g. 1M")
+        parser.add_argument('--customers', type=count, default=200, help="e.g. 200k")
+        parser.add_argument('--loans', type=count, default=5000, help="e.g. 5M")
+        parser.add_argument('--requests', type=count, default=200)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--history-days', type=int, default=3 * 365,
+                            help="Checkout dates are spread over this many past days.")
+        parser.add_argument('--open-fraction', type=fraction, default=0.05,
+                            help="Share of loans still open.")
+        parser.add_argument('--overdue-fraction', type=fraction, default=0.15,
+                            help="Share of open loans past their due date.")
+        parser.add_argument('--popularity-skew', type=float, default=1.1,
+                            help="Zipf exponent for title popularity (0 = uniform).")
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+        parser.add_argument('--flush', action='store_true', help="Delete existing library rows first.")
+
+    def handle(self, *args, **options):
+        if options['flush']:
+            # The change log goes last, taking the tombstones of the rows above with it.
+            for model in (ArchivedBorrowRecord, BorrowRecord, BookRequest, Book, Customer, ChangeLog):
+                model.objects.all().delete()
+        elif Book.objects.exists() or Customer.objects.exists():
+            raise CommandError("The library already has data; pass --flush to replace it.")
+        if options['loans'] and not (options['books'] and options['customers']):
+            raise CommandError("Loans need at least one book and one customer.")
+
+        self.options = options
+        self.rng = random.Random(options['seed'])
+        self.today = timezone.localdate()
+        self.batch_size = options['batch_size']
+        start = time.perf_counter()
+
+        defer = options['loans'] + options['books'] >= DEFER_INDEXES_ABOVE and not connection.in_atomic_block
+        indexes = deferred_indexes(Book, BorrowRecord, BookRequest) if defer else nullcontext()
+        with indexes:
+            books = self.plan_books()
+            customer_ids = self.create_customers()
+            open_loans = self.plan_open_loans(books, customer_ids)
+            self.create_books(books)
+            self.create_loans(books, customer_ids, open_loans)
+            self.create_requests(customer_ids)
+        recompute_loan_counters()
+        invalidate_catalog()
+
+        overdue = sum(1 for loan in open_loans if loan[3] < self.today)
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded {len(books['ids'])} books, {len(customer_ids)} customers, {options['loans']} loans "
+            f"({len(open_loans)} open, {overdue} overdue) and {options['requests']} book requests "
+            f"in {time.perf_counter() - start:.1f}s."
+        ))
+
+    # ===============================
+    # 📚 Books
+    # ===============================
+    def plan_books(self):
+        """
+        Decide ids, popularity and shelf copies up front so open loans can
+        be taken out of `copies` before the books are written.
+        """
+        n = self.options['books']
+        base = (Book.objects.order_by('-pk').values_list('pk', flat=True).first() or 0) + 1
+        cum_weights = zipf_cum_weights(n, self.options['popularity_skew'])
+        # Popular titles (low rank) are stocked with more copies.
+        copies = [max(1, min(10, int(10 / (rank + 1) ** 0.3) + self.rng.randint(0, 1))) for rank in range(n)]
+        order = list(range(n))
+        self.rng.shuffle(order)
+        # Popularity rank is independent of the id, so hot titles are spread across the table.
+        ids = [base + position for position in order]
+        return {"ids": ids, "cum_weights": cum_weights, "copies": dict(zip(ids, copies))}
+
+    def create_books(self, books):
+        rng = self.rng
+        vocabulary = self.vocabulary()
+        authors = [
+            f"{rng.choice(vocabulary).title()} {rng.choice(vocabulary).title()}"
+            for _ in range(max(1, len(books['ids']) // 8))
+        ]
+        rows = (
+            Book(
+                id=book_id,
+                title=' '.join(rng.choice(vocabulary) for _ in range(rng.randint(1, 5))).title(),
+                author=rng.choice(authors),
+                isbn=f"{9780000000000 + book_id:013d}"[-13:],
+                published_date=datetime.date(1900, 1, 1) + datetime.timedelta(days=rng.randrange(45000)),
+                copies_available=books['copies'][book_id],
+            )
+            for book_id in sorted(books['ids'])
+        )
+        self.write(Book, rows)
+
+    def vocabulary(self, size=5000):
+        syllables = ['ka', 'lo', 'mi', 'ren', 'sa', 'tor', 'ul', 'vin', 'dra', 'el', 'qua', 'zen', 'bri', 'on', 'th', 'ar']
+        rng = random.Random(self.options['seed'])
+        words = set()
+        while len(words) < size:
+            words.add(''.join(rng.choice(syllables) for _ in range(rng.randint(2, 4))))
+        return sorted(words)
+
+    # ===============================
+    # 👤 Customers
+    # ===============================
+    def create_customers(self):
+        n = self.options['customers']
+        base = (Customer.objects.order_by('-pk').values_list('pk', flat=True).first() or 0) + 1
+        classes = [code for code, _ in Customer.MEMBERSHIP_CLASSES]
+        rows = (
+            Customer(
+                id=base + i,
+                name=f"Customer {i}",
+                email=f"customer{i}@seed.library",
+                membership_class=self.rng.choices(classes, weights=(80, 15, 5))[0],
+            )
+            for i in range(n)
+        )
+        self.write(Customer, rows)
+        return list(range(base, base + n))
+
+    # ===============================
+    # 🔄 Loans
+    # ===============================
+    def pick_books(self, books, k):
+        return self.rng.choices(books['ids'], cum_weights=books['cum_weights'], k=k)
+
+    def plan_open_loans(self, books, customer_ids):
+        """
+        Open loans are recent, unique per (customer, book) and never exceed
+        a title's copies; draws that hit an exhausted title are retried so
+        the skew pushes open loans down the popularity curve.
+        """
+        wanted = int(self.options['loans'] * self.options['open_fraction'])
+        overdue_fraction = self.options['overdue_fraction']
+        copies, seen, loans = books['copies'], set(), []
+        attempts = 0
+        while len(loans) < wanted and attempts < 10 * wanted:
+            batch = self.pick_books(books, wanted - len(loans))
+            attempts += len(batch)
+            for book_id in batch:
+                customer_id = self.rng.choice(customer_ids)
+                if copies[book_id] < 1 or (customer_id, book_id) in seen:
+                    continue
+                copies[book_id] -= 1
+                seen.add((customer_id, book_id))
+                period = loan_period_days()
+                if self.rng.random() < overdue_fraction:
+                    due = self.today - datetime.timedelta(days=self.rng.randint(1, 60))
+                else:
+                    due = self.today + datetime.timedelta(days=self.rng.randint(0, period))
+                loans.append((customer_id, book_id, due - datetime.timedelta(days=period), due, None, False))
+        return loans
+
+    def create_loans(self, books, customer_ids, open_loans):
+        random_ = self.rng.random
+        history_days, period = self.options['history_days'], loan_period_days()
+        # ISO strings for "n days ago", so the hot loop does no date arithmetic.
+        ago = [(self.today - datetime.timedelta(days=n)).isoformat() for n in range(history_days + 1)]
+        n_customers = len(customer_ids)
+
+        def history():
+            remaining = self.options['loans'] - len(open_loans)
+            for book_ids in batched(range(remaining), self.batch_size):
+                for book_id in self.pick_books(books, len(book_ids)):
+                    checkout = 1 + int(random_() * history_days)
+                    returned = max(checkout - 1 - int(random_() * 35), 0)
+                    yield (
+                        customer_ids[int(random_() * n_customers)], book_id, ago[checkout],
+                        ago[checkout - period] if checkout >= period else self.iso(period - checkout),
+                        ago[returned], True,
+                    )
+
+        self.insert(BorrowRecord, LOAN_FIELDS, itertools.chain(
+            ((c, b, checkout.isoformat(), due.isoformat(), None, False) for c, b, checkout, due, _, _ in open_loans),
+            history(),
+        ))
+
+    def iso(self, days_ahead):
+        return (self.today + datetime.timedelta(days=days_ahead)).isoformat()
+
+    # ===============================
+    # 📖 Book Requests
+    # ===============================
+    def create_requests(self, customer_ids):
+        if not customer_ids:
+            return
+        def request(i):
+            row = BookRequest(customer_id=self.rng.choice(customer_ids), requested_title=f"Wanted {i}")
+            row.set_match_keys()
+            return row
+
+        self.write(BookRequest, (request(i) for i in range(self.options['requests'])))
+
+    def write(self, model, rows):
+        for batch in batched(rows, self.batch_size):
+            with transaction.atomic():
+                model.objects.bulk_create(batch)
+
+    def insert(self, model, field_names, rows):
+        """
+        Plain executemany() for the loan table: at millions of rows the
+        per-object cost of bulk_create()'s SQL compiler dominates the load.
+        Rows are tuples of database-ready values in `field_names` order.
+        """
+        fields = [model._meta.get_field(name) for name in field_names]
+        sql = 'INSERT INTO {} ({}) VALUES ({})'.format(
+            connection.ops.quote_name(model._meta.db_table),
+            ', '.join(connection.ops.quote_name(field.column) for field in fields),
+            ', '.join(['%s'] * len(fields)),
+        )
+        for batch in batched(rows, self.batch_size):
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.executemany(sql, batch)
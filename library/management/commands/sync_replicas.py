@@ -0,0 +1,51 @@
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from library.cache import bump_model_version
+from library.models import Book, DailyCirculation
+
+# Models whose responses are cached per read alias (CachedResponseMixin).
+CACHED_MODELS = (Book, DailyCirculation)
+
+
+class Command(BaseCommand):
+    help = (
+        "Copy the primary SQLite database onto every read replica alias with the online "
+        "backup API. Run on a schedule; replica reads are as fresh as the last run."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('aliases', nargs='*', help="Replica aliases to refresh (default: all).")
+
+    def handle(self, *args, aliases, **options):
+        aliases = aliases or getattr(settings, 'LIBRARY_READ_ALIASES', [])
+        if not aliases:
+            self.stdout.write("No read replicas configured (set LIBRARY_READ_REPLICAS).")
+            return
+        primary = connections[DEFAULT_DB_ALIAS]
+        if primary.vendor != 'sqlite':
+            raise CommandError("sync_replicas copies SQLite files; use the database's own replication.")
+
+        primary.ensure_connection()
+        for alias in aliases:
+            if alias not in connections or alias == DEFAULT_DB_ALIAS:
+                raise CommandError(f"'{alias}' is not a read replica alias.")
+            connections[alias].close()
+            start = time.perf_counter()
+            target = sqlite3.connect(connections[alias].settings_dict['NAME'])
+            try:
+                # One step, so replica readers see the old copy or the new one.
+                primary.connection.backup(target)
+            finally:
+                target.close()
+            self.stdout.write(f"{alias}: copied in {time.perf_counter() - start:.2f}s")
+
+        # Responses cached from the old copies are now stale. The cache is
+        # shared with the web workers (system check library.E001).
+        for model in CACHED_MODELS:
+            bump_model_version(model)
+        self.stdout.write(self.style.SUCCESS(f"{len(aliases)} replica(s) in sync with the primary."))
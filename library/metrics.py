@@ -0,0 +1,116 @@
+import threading
+from bisect import bisect_left
+from collections import defaultdict
+
+# Latency buckets in seconds, Prometheus style (upper bounds).
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _label_key(labels):
+    return tuple(sorted((labels or {}).items()))
+
+
+def _format_labels(key, extra=()):
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ''
+    body = ','.join('{}="{}"'.format(name, str(value).replace('\\', '\\\\').replace('"', '\\"')) for name, value in pairs)
+    return '{' + body + '}'
+
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+# ===============================
+# 📈 Metrics Registry
+# ===============================
+class MetricsRegistry:
+    """
+    Thread-safe, in-process counters and histograms rendered in the
+    Prometheus text format. Each worker process keeps its own numbers.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._help = {}
+        self._counters = defaultdict(lambda: defaultdict(float))
+        self._histograms = defaultdict(dict)
+
+    def describe(self, name, kind, help_text):
+        self._help[name] = (kind, help_text)
+
+    def inc(self, name, labels=None, value=1):
+        self.update(counters=[(name, labels, value)])
+
+    def observe(self, name, value, labels=None, buckets=DEFAULT_BUCKETS):
+        self.update(observations=[(name, labels, value, buckets)])
+
+    def update(self, counters=(), observations=()):
+        """
+        Apply several counter increments `(name, labels, value)` and
+        histogram observations `(name, labels, value[, buckets])` under a
+        single lock acquisition.
+        """
+        with self._lock:
+            for name, labels, value in counters:
+                self._counters[name][_label_key(labels)] += value
+            for name, labels, value, *buckets in observations:
+                key = _label_key(labels)
+                series = self._histograms[name].get(key)
+                if series is None:
+                    bounds = buckets[0] if buckets else DEFAULT_BUCKETS
+                    series = self._histograms[name][key] = {"buckets": bounds, "counts": [0] * len(bounds), "sum": 0.0, "count": 0}
+                index = bisect_left(series["buckets"], value)
+                if index < len(series["buckets"]):
+                    series["counts"][index] += 1
+                series["sum"] += value
+                series["count"] += 1
+
+    def counter_value(self, name, labels=None):
+        with self._lock:
+            return self._counters[name].get(_label_key(labels), 0)
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def render(self):
+        lines = []
+        with self._lock:
+            for name in sorted(set(self._counters) | set(self._histograms)):
+                kind, help_text = self._help.get(name, ('counter' if name in self._counters else 'histogram', ''))
+                if help_text:
+                    lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+                for key, value in sorted(self._counters.get(name, {}).items()):
+                    lines.append(f"{name}{_format_labels(key)} {_format_value(value)}")
+                for key, series in sorted(self._histograms.get(name, {}).items()):
+                    cumulative = 0
+                    for bound, count in zip(series["buckets"], series["counts"]):
+                        cumulative += count
+                        lines.append(f"{name}_bucket{_format_labels(key, [('le', bound)])} {cumulative}")
+                    lines.append(f"{name}_bucket{_format_labels(key, [('le', '+Inf')])} {series['count']}")
+                    lines.append(f"{name}_sum{_format_labels(key)} {series['sum']!r}")
+                    lines.append(f"{name}_count{_format_labels(key)} {series['count']}")
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+registry.describe('library_request_duration_seconds', 'histogram', 'Request latency per route.')
+registry.describe('library_requests_total', 'counter', 'Requests per route and status code.')
+registry.describe('library_db_queries_total', 'counter', 'SQL statements executed per route.')
+registry.describe('library_db_duration_seconds_total', 'counter', 'Time spent in SQL per route.')
+registry.describe('library_render_duration_seconds_total', 'counter', 'Time spent rendering responses per route.')
+registry.describe('library_response_bytes_total', 'counter', 'Response body bytes per route (non-streaming).')
+registry.describe('library_duplicate_query_requests_total', 'counter',
+                  'Requests that repeated one SQL statement past the duplicate threshold (likely N+1).')
+registry.describe('library_db_routing_total', 'counter',
+                  'Requests per route by the database alias their reads were sent to and why.')
+registry.describe('library_admission_rejected_total', 'counter',
+                  'Writes turned away with 429 per route, by reason (rate_limited or overloaded).')
+registry.describe('library_admission_queued_total', 'counter',
+                  'Writes per route that waited for a slot in the write concurrency gate.')
+registry.describe('library_admission_queue_seconds_total', 'counter',
+                  'Time writes spent waiting for the write concurrency gate per route.')
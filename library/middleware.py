@@ -0,0 +1,293 @@
+import logging
+import time
+from collections import Counter
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.http import JsonResponse
+from django.urls import Resolver404, resolve
+
+from . import admission, routers
+from .metrics import registry
+
+logger = logging.getLogger(__name__)
+
+
+class QueryRecorder:
+    """
+    `connection.execute_wrapper` hook counting statements, SQL time and
+    repeats of the same parametrised SQL within one request.
+    """
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.statements = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+            self.statements[sql] += 1
+
+
+def route_of(request):
+    match = getattr(request, 'resolver_match', None)
+    return match.route if match else 'unmatched'
+
+
+# ===============================
+# ⏱️ Performance Metrics Middleware
+# ===============================
+class PerformanceMetricsMiddleware:
+    """
+    Records per-route latency, SQL count and time, render time and
+    response size into `library.metrics.registry`, flags requests that
+    repeat one statement `LIBRARY_DUPLICATE_QUERY_THRESHOLD` times or
+    more, and adds a `Server-Timing` header.
+
+    Under ASGI, async views run their queries on another thread, so only
+    latency, status and size are recorded for them.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.duplicate_threshold = getattr(settings, 'LIBRARY_DUPLICATE_QUERY_THRESHOLD', 5)
+        self.server_timing = getattr(settings, 'LIBRARY_SERVER_TIMING', True)
+        self.is_async = iscoroutinefunction(self.get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        recorder = QueryRecorder()
+        # Same as connection.execute_wrapper() on every alias (reads may be
+        # routed to a replica), minus the contextmanager cost.
+        wrappers = [connections[alias].execute_wrappers for alias in connections]
+        for alias_wrappers in wrappers:
+            alias_wrappers.append(recorder)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            for alias_wrappers in wrappers:
+                alias_wrappers.remove(recorder)
+        self.record(request, response, time.perf_counter() - start, recorder)
+        return response
+
+    async def __acall__(self, request):
+        start = time.perf_counter()
+        response = await self.get_response(request)
+        self.record(request, response, time.perf_counter() - start, None)
+        return response
+
+    def process_template_response(self, request, response):
+        # DRF responses are rendered right after this hook returns.
+        request._metrics_render_start = time.perf_counter()
+        return response
+
+    def record(self, request, response, total, recorder):
+        labels = {"route": route_of(request)}
+        render_start = getattr(request, '_metrics_render_start', None)
+        render = min(time.perf_counter() - render_start, total) if render_start else 0.0
+        db = recorder.duration if recorder else 0.0
+
+        counters = [
+            ('library_requests_total', {**labels, "method": request.method, "status": response.status_code}, 1),
+            ('library_render_duration_seconds_total', labels, render),
+        ]
+        if not response.streaming:
+            counters.append(('library_response_bytes_total', labels, len(response.content)))
+        if recorder is not None:
+            counters.append(('library_db_queries_total', labels, recorder.count))
+            counters.append(('library_db_duration_seconds_total', labels, db))
+            self.check_duplicates(labels, recorder, counters)
+        registry.update(counters, [('library_request_duration_seconds', labels, total)])
+
+        if self.server_timing:
+            timings = [
+                f'render;dur={render * 1000:.2f}',
+                f'app;dur={max(total - db - render, 0) * 1000:.2f}',
+                f'total;dur={total * 1000:.2f}',
+            ]
+            if recorder is not None:
+                timings.insert(0, f'db;dur={db * 1000:.2f};desc="{recorder.count} queries"')
+            response['Server-Timing'] = ', '.join(timings)
+
+    def check_duplicates(self, labels, recorder, counters):
+        if recorder.count < self.duplicate_threshold:
+            return
+        sql, repeats = recorder.statements.most_common(1)[0]
+        if repeats >= self.duplicate_threshold:
+            counters.append(('library_duplicate_query_requests_total', labels, 1))
+            logger.warning("%s ran the same query %d times (possible N+1): %s", labels["route"], repeats, sql)
+
+
+# ===============================
+# 🔀 Read Replica Routing Middleware
+# ===============================
+class ReadReplicaRoutingMiddleware:
+    """
+    Decides per request where `routers.ReadReplicaRouter` sends reads.
+
+    Safe requests to views with `replica_reads = True` (lists, search,
+    analytics, the change feed) read from a `LIBRARY_READ_ALIASES` alias.
+    Any request that writes sets a cookie that keeps the client's reads on
+    the primary for `LIBRARY_READ_YOUR_WRITES_SECONDS`. Each decision is
+    counted in `library_db_routing_total` and returned in `X-DB-Route`.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(self.get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        routing, token = self.begin(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            routers.end(token)
+        return self.finish(request, response, routing)
+
+    async def __acall__(self, request):
+        routing, token = self.begin(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            routers.end(token)
+        return self.finish(request, response, routing)
+
+    def begin(self, request):
+        request.db_routing = routing = routers.Routing()
+        return routing, routers.begin(routing)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        view_class = getattr(view_func, 'view_class', None)
+        request.db_routing.alias, request.db_routing.reason = routers.choose(
+            getattr(view_class, 'replica_reads', False),
+            request.method,
+            routers.PIN_COOKIE in request.COOKIES,
+        )
+
+    def finish(self, request, response, routing):
+        alias, reason = routing.alias, routing.reason
+        if routing.wrote and reason == 'replica':
+            alias, reason = DEFAULT_DB_ALIAS, 'wrote'
+        registry.inc('library_db_routing_total', {"route": route_of(request), "alias": alias, "reason": reason})
+        response['X-DB-Route'] = f'{alias}; reason={reason}'
+        seconds = routers.pin_seconds()
+        if seconds and (routing.wrote or reason == 'write'):
+            response.set_cookie(routers.PIN_COOKIE, '1', max_age=seconds, httponly=True, samesite='Lax')
+        return response
+
+
+# ===============================
+# 🚦 Admission Control Middleware
+# ===============================
+class AdmissionControlMiddleware:
+    """
+    Sheds write load before it reaches SQLite's single writer.
+
+    Every POST, PUT, PATCH and DELETE first takes a token from its
+    client's bucket (`LIBRARY_WRITE_RATE_LIMIT`, see
+    `admission.client_key`; it runs after AuthenticationMiddleware so
+    signed-in users are told apart), then a slot in a gate admitting
+    `LIBRARY_WRITE_CONCURRENCY` writes at a time. A write that finds the
+    gate full queues for up to `LIBRARY_WRITE_QUEUE_SECONDS` behind at most
+    `LIBRARY_WRITE_QUEUE_DEPTH` others. Anything turned away gets a 429
+    with `Retry-After` straight away instead of timing out on the database
+    lock. Limits are per worker process; reads pass untouched.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        rate_limit = admission.write_rate_limit()
+        self.limiter = admission.RateLimiter(rate_limit['rate'], rate_limit['burst']) if rate_limit else None
+        concurrency = getattr(settings, 'LIBRARY_WRITE_CONCURRENCY', None)
+        self.gate = admission.ConcurrencyGate(
+            concurrency,
+            getattr(settings, 'LIBRARY_WRITE_QUEUE_SECONDS', 0.5),
+            getattr(settings, 'LIBRARY_WRITE_QUEUE_DEPTH', 32),
+        ) if concurrency else None
+        self.is_async = iscoroutinefunction(self.get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        rejection, admitted = self.admit(request)
+        if rejection:
+            return rejection
+        try:
+            return self.get_response(request)
+        finally:
+            if admitted:
+                self.gate.leave()
+
+    async def __acall__(self, request):
+        if self.exempt(request):
+            return await self.get_response(request)
+        # Queueing blocks, so it happens off the event loop.
+        rejection, admitted = await sync_to_async(self.admit, thread_sensitive=False)(request)
+        if rejection:
+            return rejection
+        try:
+            return await self.get_response(request)
+        finally:
+            if admitted:
+                self.gate.leave()
+
+    def exempt(self, request):
+        return request.method in ('GET', 'HEAD', 'OPTIONS') or not (self.limiter or self.gate)
+
+    def admit(self, request):
+        """
+        `(rejection, admitted)`: a 429 response if the write is turned
+        away, and whether it holds a gate slot to give back.
+        """
+        if self.exempt(request):
+            return None, False
+        try:
+            # Resolved here so the metrics middleware can label shed requests.
+            request.resolver_match = resolve(request.path_info)
+        except Resolver404:
+            pass
+        labels = {"route": route_of(request)}
+
+        if self.limiter:
+            wait = self.limiter.take(admission.client_key(request))
+            if wait:
+                return self.reject(labels, 'rate_limited', wait, "Too many writes from this client."), False
+        if not self.gate:
+            return None, False
+
+        admitted, queued = self.gate.enter()
+        if queued is not None:
+            registry.update([
+                ('library_admission_queued_total', labels, 1),
+                ('library_admission_queue_seconds_total', labels, queued),
+            ])
+        if not admitted:
+            return self.reject(labels, 'overloaded', self.gate.wait, "The library is busy; try again shortly."), False
+        return None, True
+
+    def reject(self, labels, reason, wait, message):
+        registry.inc('library_admission_rejected_total', {**labels, "reason": reason})
+        response = JsonResponse({"error": message}, status=429)
+        response['Retry-After'] = admission.retry_after(wait)
+        return response
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.7 on 2026-10-18 20:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library', '0006_bookrequest_borrowrecord_customer_delete_libraryuser_and_more'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='borrowrecord',
+            constraint=models.UniqueConstraint(condition=models.Q(('return_date__isnull', True)), fields=('customer', 'book'), name='unique_open_loan_per_customer_book'),
+        ),
+    ]
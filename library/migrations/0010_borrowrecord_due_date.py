@@ -0,0 +1,52 @@
+import datetime
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F
+
+
+def backfill_due_dates(apps, schema_editor):
+    BorrowRecord = apps.get_model('library', 'BorrowRecord')
+    days = getattr(settings, 'LIBRARY_LOAN_PERIOD_DAYS', {}).get('default', 14)
+    BorrowRecord.objects.filter(due_date__isnull=True).update(
+        due_date=F('checkout_date') + datetime.timedelta(days=days)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library', '0009_book_fulltext_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customer',
+            name='membership_class',
+            field=models.CharField(choices=[('standard', 'Standard'), ('student', 'Student'), ('staff', 'Staff')], default='standard', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='book',
+            name='loan_period_days',
+            field=models.PositiveSmallIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='borrowrecord',
+            name='due_date',
+            field=models.DateField(null=True),
+        ),
+        migrations.RunPython(backfill_due_dates, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='borrowrecord',
+            name='due_date',
+            field=models.DateField(),
+        ),
+        migrations.RemoveIndex(
+            model_name='borrowrecord',
+            name='borrow_open_checkout_idx',
+        ),
+        migrations.AddIndex(
+            model_name='borrowrecord',
+            index=models.Index(condition=models.Q(('return_date__isnull', True)), fields=['due_date'], name='borrow_open_due_idx'),
+        ),
+    ]
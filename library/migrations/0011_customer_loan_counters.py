@@ -0,0 +1,54 @@
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+
+def backfill_loan_counters(apps, schema_editor):
+    Customer = apps.get_model('library', 'Customer')
+    BorrowRecord = apps.get_model('library', 'BorrowRecord')
+    today = timezone.localdate()
+
+    def loan_count(**filters):
+        return Coalesce(Subquery(
+            BorrowRecord.objects.filter(customer=OuterRef('pk'), **filters)
+            .order_by().values('customer').annotate(n=Count('pk')).values('n')
+        ), 0)
+
+    Customer.objects.update(
+        open_loan_count=loan_count(return_date__isnull=True),
+        overdue_loan_count=loan_count(return_date__isnull=True, due_date__lt=today),
+        lifetime_loan_count=loan_count(),
+        overdue_counted_on=today,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library', '0010_borrowrecord_due_date'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customer',
+            name='open_loan_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='customer',
+            name='overdue_loan_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='customer',
+            name='lifetime_loan_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='customer',
+            name='overdue_counted_on',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.RunPython(backfill_loan_counters, migrations.RunPython.noop),
+    ]
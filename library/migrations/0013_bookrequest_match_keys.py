@@ -0,0 +1,41 @@
+from django.db import migrations, models
+
+from library.models import match_key
+
+
+def backfill_match_keys(apps, schema_editor):
+    BookRequest = apps.get_model('library', 'BookRequest')
+    batch = []
+    for request in BookRequest.objects.only('requested_title', 'requested_author').iterator(chunk_size=5000):
+        request.title_key = match_key(request.requested_title, 200)
+        request.author_key = match_key(request.requested_author, 100)
+        batch.append(request)
+        if len(batch) == 5000:
+            BookRequest.objects.bulk_update(batch, ['title_key', 'author_key'])
+            batch = []
+    BookRequest.objects.bulk_update(batch, ['title_key', 'author_key'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library', '0012_holds'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bookrequest',
+            name='author_key',
+            field=models.CharField(default='', editable=False, max_length=100),
+        ),
+        migrations.AddField(
+            model_name='bookrequest',
+            name='title_key',
+            field=models.CharField(default='', editable=False, max_length=200),
+        ),
+        migrations.RunPython(backfill_match_keys, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='bookrequest',
+            index=models.Index(condition=models.Q(('is_fulfilled', False)), fields=['title_key'], name='bookrequest_pending_title_idx'),
+        ),
+    ]
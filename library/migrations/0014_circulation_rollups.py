@@ -0,0 +1,60 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library', '0013_bookrequest_match_keys'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyAuthorCirculation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('author', models.CharField(max_length=100)),
+                ('checkouts', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='DailyBookCirculation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('checkouts', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='DailyCirculation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(unique=True)),
+                ('checkouts', models.PositiveIntegerField(default=0)),
+                ('returns', models.PositiveIntegerField(default=0)),
+                ('loan_days', models.PositiveBigIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='borrowrecord',
+            index=models.Index(fields=['checkout_date'], name='borrow_checkout_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='borrowrecord',
+            index=models.Index(condition=models.Q(('return_date__isnull', False)), fields=['return_date'], name='borrow_return_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='dailyauthorcirculation',
+            index=models.Index(fields=['day', 'author', 'checkouts'], name='daily_author_circulation_idx'),
+        ),
+        migrations.AddField(
+            model_name='dailybookcirculation',
+            name='book',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='library.book'),
+        ),
+        migrations.AddIndex(
+            model_name='dailybookcirculation',
+            index=models.Index(fields=['day', 'book', 'checkouts'], name='daily_book_circulation_idx'),
+        ),
+    ]
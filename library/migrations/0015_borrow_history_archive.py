@@ -0,0 +1,54 @@
+# Generated by Django 5.2.7 on 2026-10-18 22:03
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+COLUMNS = 'id, customer_id, book_id, checkout_date, due_date, return_date, is_returned'
+
+CREATE_VIEW = f"""
+CREATE VIEW library_borrowhistory AS
+    SELECT {COLUMNS}, false AS is_archived FROM library_borrowrecord
+    UNION ALL
+    SELECT {COLUMNS}, true AS is_archived FROM library_archivedborrowrecord
+"""
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library', '0014_circulation_rollups'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BorrowHistory',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('checkout_date', models.DateField()),
+                ('due_date', models.DateField()),
+                ('return_date', models.DateField(blank=True, null=True)),
+                ('is_returned', models.BooleanField(default=False)),
+                ('is_archived', models.BooleanField(default=False)),
+            ],
+            options={
+                'verbose_name_plural': 'borrow history',
+                'db_table': 'library_borrowhistory',
+                'managed': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedBorrowRecord',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('checkout_date', models.DateField()),
+                ('due_date', models.DateField()),
+                ('return_date', models.DateField()),
+                ('is_returned', models.BooleanField(default=True)),
+                ('book', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_loans', to='library.book')),
+                ('customer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_loans', to='library.customer')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['checkout_date'], name='archived_checkout_date_idx'), models.Index(fields=['return_date'], name='archived_return_date_idx')],
+            },
+        ),
+        migrations.RunSQL(CREATE_VIEW, 'DROP VIEW library_borrowhistory'),
+    ]
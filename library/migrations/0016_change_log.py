@@ -0,0 +1,193 @@
+# Generated by Django 5.2.7 on 2026-10-18 22:16
+
+from django.db import migrations, models
+
+COLUMNS = 'id, customer_id, book_id, checkout_date, due_date, return_date, is_returned, updated_at, change_seq'
+
+CREATE_VIEW = f"""
+CREATE VIEW library_borrowhistory AS
+    SELECT {COLUMNS}, false AS is_archived FROM library_borrowrecord
+    UNION ALL
+    SELECT {COLUMNS}, true AS is_archived FROM library_archivedborrowrecord
+"""
+
+PREVIOUS_VIEW = """
+CREATE VIEW library_borrowhistory AS
+    SELECT id, customer_id, book_id, checkout_date, due_date, return_date, is_returned, false AS is_archived
+    FROM library_borrowrecord
+    UNION ALL
+    SELECT id, customer_id, book_id, checkout_date, due_date, return_date, is_returned, true AS is_archived
+    FROM library_archivedborrowrecord
+"""
+
+NOW = "strftime('%Y-%m-%d %H:%M:%f', 'now')"
+
+# (table, change log kind, the columns a client sees change). Stamping a
+# row's own updated_at/change_seq is not in the list, so it never re-fires
+# the update trigger.
+TRACKED = [
+    ('library_book', 'book',
+     ['title', 'author', 'isbn', 'published_date', 'copies_available', 'loan_period_days']),
+    ('library_customer', 'customer',
+     ['name', 'email', 'phone', 'joined_date', 'membership_class',
+      'open_loan_count', 'overdue_loan_count', 'lifetime_loan_count']),
+    ('library_borrowrecord', 'borrow_record',
+     ['customer_id', 'book_id', 'checkout_date', 'due_date', 'return_date', 'is_returned']),
+]
+
+
+def log_change(table, kind, row, deleted):
+    """
+    Trigger body: replace the object's change log entry with a new one and,
+    unless it was deleted, stamp the row with it.
+    """
+    # Not REPLACE: an outer upsert's conflict handling would override it.
+    statements = [
+        f"DELETE FROM library_changelog WHERE kind = '{kind}' AND object_id = {row}.id;",
+        f"INSERT INTO library_changelog (kind, object_id, deleted, changed_at) "
+        f"VALUES ('{kind}', {row}.id, {int(deleted)}, {NOW});",
+    ]
+    if not deleted:
+        statements.append(
+            f"UPDATE {table} SET change_seq = last_insert_rowid(), updated_at = {NOW} WHERE id = {row}.id;"
+        )
+    return '\n        '.join(statements)
+
+
+def triggers():
+    statements = []
+    for table, kind, columns in TRACKED:
+        old = ', '.join(f'old.{column}' for column in columns)
+        new = ', '.join(f'new.{column}' for column in columns)
+        # A loan moved by archive_loans is not deleted; see ArchivedBorrowRecord.
+        archived = (
+            " WHEN NOT EXISTS (SELECT 1 FROM library_archivedborrowrecord WHERE id = old.id)"
+            if table == 'library_borrowrecord' else ''
+        )
+        statements += [
+            f"""
+    CREATE TRIGGER {table}_change_ai AFTER INSERT ON {table} BEGIN
+        {log_change(table, kind, 'new', deleted=False)}
+    END
+    """,
+            f"""
+    CREATE TRIGGER {table}_change_au AFTER UPDATE OF {', '.join(columns)} ON {table}
+    WHEN ({old}) IS NOT ({new}) BEGIN
+        {log_change(table, kind, 'new', deleted=False)}
+    END
+    """,
+            f"""
+    CREATE TRIGGER {table}_change_ad AFTER DELETE ON {table}{archived} BEGIN
+        {log_change(table, kind, 'old', deleted=True)}
+    END
+    """,
+        ]
+    statements.append(f"""
+    CREATE TRIGGER library_archivedborrowrecord_change_ad AFTER DELETE ON library_archivedborrowrecord BEGIN
+        {log_change('library_archivedborrowrecord', 'borrow_record', 'old', deleted=True)}
+    END
+    """)
+    return statements
+
+
+def backfill():
+    """
+    Log every existing row once, in id order, and stamp it.
+    """
+    statements = []
+    for table, kind, _ in TRACKED:
+        source = 'library_borrowhistory' if kind == 'borrow_record' else table
+        statements.append(
+            f"INSERT INTO library_changelog (kind, object_id, deleted, changed_at) "
+            f"SELECT '{kind}', id, 0, {NOW} FROM {source} ORDER BY id"
+        )
+        targets = [table, 'library_archivedborrowrecord'] if kind == 'borrow_record' else [table]
+        statements += [
+            f"UPDATE {target} SET updated_at = {NOW}, change_seq = ("
+            f"SELECT seq FROM library_changelog WHERE kind = '{kind}' AND object_id = {target}.id)"
+            for target in targets
+        ]
+    return statements
+
+
+def run_sqlite(statements):
+    def operation(apps, schema_editor):
+        if schema_editor.connection.vendor != 'sqlite':
+            return
+        for statement in statements():
+            schema_editor.execute(statement)
+    return operation
+
+
+def drop_triggers():
+    tables = [table for table, _, _ in TRACKED]
+    return [
+        f"DROP TRIGGER IF EXISTS {table}_change_{event}" for table in tables for event in ('ai', 'au', 'ad')
+    ] + ["DROP TRIGGER IF EXISTS library_archivedborrowrecord_change_ad"]
+
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library', '0015_borrow_history_archive'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='archivedborrowrecord',
+            name='change_seq',
+            field=models.BigIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='archivedborrowrecord',
+            name='updated_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='book',
+            name='change_seq',
+            field=models.BigIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='book',
+            name='updated_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='borrowrecord',
+            name='change_seq',
+            field=models.BigIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='borrowrecord',
+            name='updated_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='customer',
+            name='change_seq',
+            field=models.BigIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='customer',
+            name='updated_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.CreateModel(
+            name='ChangeLog',
+            fields=[
+                ('seq', models.BigAutoField(primary_key=True, serialize=False)),
+                ('kind', models.CharField(choices=[('book', 'Book'), ('customer', 'Customer'), ('borrow_record', 'Borrow record')], max_length=20)),
+                ('object_id', models.BigIntegerField()),
+                ('deleted', models.BooleanField(default=False)),
+                ('changed_at', models.DateTimeField()),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('kind', 'object_id'), name='unique_change_per_object')],
+            },
+        ),
+        migrations.RunSQL('DROP VIEW library_borrowhistory', PREVIOUS_VIEW),
+        migrations.RunSQL(CREATE_VIEW, 'DROP VIEW library_borrowhistory'),
+        migrations.RunPython(run_sqlite(lambda: backfill() + triggers()), run_sqlite(drop_triggers)),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.7 on 2026-10-18 22:25
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library', '0016_change_log'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LoanFine',
+            fields=[
+                ('loan_id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('accrued_cents', models.PositiveIntegerField(default=0)),
+                ('accrued_through', models.DateField()),
+                ('book', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='library.book')),
+                ('customer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='loan_fines', to='library.customer')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='FineLedgerEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('amount_cents', models.PositiveIntegerField(default=0)),
+                ('balance_cents', models.PositiveIntegerField(default=0)),
+                ('customer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='fine_entries', to='library.customer')),
+            ],
+            options={
+                'verbose_name_plural': 'fine ledger entries',
+                'constraints': [models.UniqueConstraint(fields=('customer', 'day'), name='unique_fine_entry_per_day')],
+            },
+        ),
+    ]
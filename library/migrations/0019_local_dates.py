@@ -0,0 +1,31 @@
+# Generated by Django 5.2.7 on 2026-10-18 22:48
+
+import django.utils.timezone
+from django.db import migrations, models
+
+# The columns are unchanged; only the Python-side default moves from
+# auto_now_add's date.today() to the active time zone's date. State only,
+# so SQLite does not rebuild the tables and drop their change log triggers.
+FIELDS = [
+    ('bookrequest', 'date_requested'),
+    ('borrowrecord', 'checkout_date'),
+    ('customer', 'joined_date'),
+]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library', '0018_customer_email_lower_idx'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(state_operations=[
+            migrations.AlterField(
+                model_name=model_name,
+                name=name,
+                field=models.DateField(default=django.utils.timezone.localdate, editable=False),
+            )
+            for model_name, name in FIELDS
+        ]),
+    ]
@@ -0,0 +1,30 @@
+from django.db import migrations
+
+
+def journal_mode(mode):
+    def operation(apps, schema_editor):
+        connection = schema_editor.connection
+        # In-memory test databases have no journal to switch.
+        if connection.vendor != 'sqlite' or connection.is_in_memory_db():
+            return
+        with connection.cursor() as cursor:
+            cursor.execute(f'PRAGMA journal_mode={mode}')
+    return operation
+
+
+class Migration(migrations.Migration):
+    """
+    WAL is recorded in the database file, so it is switched on once here
+    rather than by every new connection; the tuned connection profile only
+    sets per-connection pragmas. SQLite refuses to change the journal mode
+    inside a transaction.
+    """
+    atomic = False
+
+    dependencies = [
+        ('library', '0019_local_dates'),
+    ]
+
+    operations = [
+        migrations.RunPython(journal_mode('WAL'), journal_mode('DELETE')),
+    ]
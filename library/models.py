@@ -1,14 +1,88 @@
+import datetime
+import re
+import unicodedata
+
+from django.conf import settings
 from django.db import models
+from django.db.models.functions import Lower
 from django.contrib.auth.models import User
+from django.utils import timezone
+
+
+def loan_period_days(book_loan_period_days=None, membership_class=None):
+    """
+    Number of days a loan runs: the book's own loan period if it has one,
+    otherwise the period for the customer's membership class, otherwise
+    the library default.
+    """
+    if book_loan_period_days:
+        return book_loan_period_days
+    periods = getattr(settings, 'LIBRARY_LOAN_PERIOD_DAYS', {})
+    return periods.get(membership_class, periods.get('default', 14))
+
+
+def max_open_loans(membership_class=None):
+    """
+    How many loans a customer of `membership_class` may have open at once.
+    """
+    limits = getattr(settings, 'LIBRARY_MAX_OPEN_LOANS', {})
+    return limits.get(membership_class, limits.get('default', 5))
+
+
+def fine_rule(membership_class=None):
+    """
+    `{'daily_cents', 'grace_days', 'max_cents'}` for overdue loans of a
+    customer of `membership_class`.
+    """
+    rules = getattr(settings, 'LIBRARY_FINE_RULES', {})
+    return rules.get(membership_class, rules.get('default', {'daily_cents': 25, 'grace_days': 1, 'max_cents': 1000}))
+
+
+def match_key(value, max_length=None):
+    """
+    A title or author normalized for matching book requests against the
+    catalog: case, accents, punctuation and spacing are ignored.
+    """
+    if not value:
+        return ''
+    value = ''.join(ch for ch in unicodedata.normalize('NFKD', value) if not unicodedata.combining(ch))
+    return ' '.join(re.sub(r'[\W_]+', ' ', value.casefold()).split())[:max_length]
+
 
 # ===============================
 # 1️⃣ Customer Model
 # ===============================
 class Customer(models.Model):
+    MEMBERSHIP_CLASSES = [
+        ('standard', 'Standard'),
+        ('student', 'Student'),
+        ('staff', 'Staff'),
+    ]
+
     name = models.CharField(max_length=100)
     email = models.EmailField(unique=True)
     phone = models.CharField(max_length=20, blank=True, null=True)
-    joined_date = models.DateField(auto_now_add=True)
+    joined_date = models.DateField(default=timezone.localdate, editable=False)
+    membership_class = models.CharField(max_length=20, choices=MEMBERSHIP_CLASSES, default='standard')
+
+    # Denormalized loan counters, kept in step by the circulation services
+    # and recomputed by `manage.py reconcile_loan_counters`. Overdue loans
+    # are counted as of `overdue_counted_on`, the last reconciliation.
+    open_loan_count = models.PositiveIntegerField(default=0)
+    overdue_loan_count = models.PositiveIntegerField(default=0)
+    lifetime_loan_count = models.PositiveIntegerField(default=0)
+    overdue_counted_on = models.DateField(blank=True, null=True)
+
+    # Stamped by the change log triggers (migration 0016) on every insert
+    # or real update; `change_seq` is the row's latest ChangeLog.seq.
+    updated_at = models.DateTimeField(blank=True, null=True, editable=False)
+    change_seq = models.BigIntegerField(blank=True, null=True, editable=False)
+
+    class Meta:
+        indexes = [
+            # Catalog imports match emails case-insensitively.
+            models.Index(Lower('email'), name='customer_email_lower_idx'),
+        ]
 
     def __str__(self):
         return self.name
@@ -23,6 +97,16 @@ class Book(models.Model):
     isbn = models.CharField(max_length=13, unique=True)
     published_date = models.DateField()
     copies_available = models.PositiveIntegerField(default=1)
+    # Overrides the membership-based loan period, e.g. for short-loan titles.
+    loan_period_days = models.PositiveSmallIntegerField(blank=True, null=True)
+    updated_at = models.DateTimeField(blank=True, null=True, editable=False)
+    change_seq = models.BigIntegerField(blank=True, null=True, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['title'], name='book_title_idx'),
+            models.Index(fields=['author'], name='book_author_idx'),
+        ]
 
     def __str__(self):
         return f"{self.title} by {self.author}"
@@ -34,14 +118,170 @@ class Book(models.Model):
 class BorrowRecord(models.Model):
     customer = models.ForeignKey(Customer, on_delete=models.CASCADE)
     book = models.ForeignKey(Book, on_delete=models.CASCADE)
-    checkout_date = models.DateField(auto_now_add=True)
+    checkout_date = models.DateField(default=timezone.localdate, editable=False)
+    due_date = models.DateField()
+    return_date = models.DateField(blank=True, null=True)
+    is_returned = models.BooleanField(default=False)
+    updated_at = models.DateTimeField(blank=True, null=True, editable=False)
+    change_seq = models.BigIntegerField(blank=True, null=True, editable=False)
+
+    class Meta:
+        constraints = [
+            # A customer can hold at most one open loan per title.
+            models.UniqueConstraint(
+                fields=['customer', 'book'],
+                condition=models.Q(return_date__isnull=True),
+                name='unique_open_loan_per_customer_book',
+            ),
+        ]
+        indexes = [
+            # Open loans by due date, for overdue scans; returned history is excluded.
+            models.Index(
+                fields=['due_date'],
+                condition=models.Q(return_date__isnull=True),
+                name='borrow_open_due_idx',
+            ),
+            # Open loans per title, for availability and hold lookups.
+            models.Index(
+                fields=['book'],
+                condition=models.Q(return_date__isnull=True),
+                name='borrow_open_book_idx',
+            ),
+            # Checkouts and returns by day, for incremental rollup refreshes.
+            models.Index(fields=['checkout_date'], name='borrow_checkout_date_idx'),
+            models.Index(
+                fields=['return_date'],
+                condition=models.Q(return_date__isnull=False),
+                name='borrow_return_date_idx',
+            ),
+        ]
+
+    def save(self, *args, **kwargs):
+        if self.due_date is None:
+            checkout_date = self.checkout_date or timezone.localdate()
+            days = loan_period_days(self.book.loan_period_days, self.customer.membership_class)
+            self.due_date = checkout_date + datetime.timedelta(days=days)
+        super().save(*args, **kwargs)
+
+    def __str__(self):
+        return f"{self.customer.name} borrowed {self.book.title}"
+
+
+# ===============================
+# 🗄️ Borrow History Archive
+# ===============================
+class ArchivedBorrowRecord(models.Model):
+    """
+    A returned loan moved out of BorrowRecord by `manage.py archive_loans`
+    so the hot table only carries open and recent loans. Ids are carried
+    over from BorrowRecord.
+    """
+    id = models.BigAutoField(primary_key=True)
+    customer = models.ForeignKey(Customer, on_delete=models.CASCADE, related_name='archived_loans')
+    book = models.ForeignKey(Book, on_delete=models.CASCADE, related_name='archived_loans')
+    checkout_date = models.DateField()
+    due_date = models.DateField()
+    return_date = models.DateField()
+    is_returned = models.BooleanField(default=True)
+    updated_at = models.DateTimeField(blank=True, null=True, editable=False)
+    change_seq = models.BigIntegerField(blank=True, null=True, editable=False)
+
+    class Meta:
+        indexes = [
+            # The same date indexes as BorrowRecord, so exports and rollup
+            # rebuilds over BorrowHistory search both tables.
+            models.Index(fields=['checkout_date'], name='archived_checkout_date_idx'),
+            models.Index(fields=['return_date'], name='archived_return_date_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.customer.name} borrowed {self.book.title}"
+
+
+class BorrowHistory(models.Model):
+    """
+    Every loan, hot or archived: a read-only view over BorrowRecord UNION
+    ALL ArchivedBorrowRecord (see migrations 0015 and 0016). Filters, ordering and
+    limits are pushed into both tables, so it pages like either of them.
+    """
+    customer = models.ForeignKey(Customer, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+')
+    book = models.ForeignKey(Book, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+')
+    checkout_date = models.DateField()
+    due_date = models.DateField()
     return_date = models.DateField(blank=True, null=True)
     is_returned = models.BooleanField(default=False)
+    updated_at = models.DateTimeField(blank=True, null=True, editable=False)
+    change_seq = models.BigIntegerField(blank=True, null=True, editable=False)
+    is_archived = models.BooleanField(default=False)
+
+    class Meta:
+        managed = False
+        db_table = 'library_borrowhistory'
+        verbose_name_plural = 'borrow history'
 
     def __str__(self):
         return f"{self.customer.name} borrowed {self.book.title}"
 
 
+# ===============================
+# 🕒 Hold Model
+# ===============================
+class Hold(models.Model):
+    """
+    A place in a title's reservation queue. Waiting holds are served in
+    `created_at` order; a returned copy is set aside for the queue head,
+    whose hold becomes ready until it is borrowed or `expires_on` passes.
+    """
+    WAITING = 'waiting'
+    READY = 'ready'
+    FULFILLED = 'fulfilled'
+    CANCELLED = 'cancelled'
+    EXPIRED = 'expired'
+    STATUSES = [
+        (WAITING, 'Waiting'),
+        (READY, 'Ready for pickup'),
+        (FULFILLED, 'Fulfilled'),
+        (CANCELLED, 'Cancelled'),
+        (EXPIRED, 'Expired'),
+    ]
+    ACTIVE = (WAITING, READY)
+
+    customer = models.ForeignKey(Customer, on_delete=models.CASCADE)
+    book = models.ForeignKey(Book, on_delete=models.CASCADE)
+    created_at = models.DateTimeField(auto_now_add=True)
+    status = models.CharField(max_length=10, choices=STATUSES, default=WAITING)
+    ready_on = models.DateField(blank=True, null=True)
+    expires_on = models.DateField(blank=True, null=True)
+
+    class Meta:
+        constraints = [
+            # One place in the queue per customer and title.
+            models.UniqueConstraint(
+                fields=['customer', 'book'],
+                condition=models.Q(status__in=['waiting', 'ready']),
+                name='unique_active_hold_per_customer_book',
+            ),
+        ]
+        indexes = [
+            # The queue itself: waiting holds per title, oldest first, so the
+            # head is the first index entry for the book.
+            models.Index(
+                fields=['book', 'created_at'],
+                condition=models.Q(status='waiting'),
+                name='hold_queue_idx',
+            ),
+            # Ready holds by pickup deadline, for expiry sweeps.
+            models.Index(
+                fields=['expires_on'],
+                condition=models.Q(status='ready'),
+                name='hold_ready_expiry_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.customer.name} holds {self.book.title}"
+
+
 # ===============================
 # 4️⃣ Book Request Model (NEW FEATURE 💡)
 # ===============================
@@ -49,9 +289,173 @@ class BookRequest(models.Model):
     customer = models.ForeignKey(Customer, on_delete=models.CASCADE)
     requested_title = models.CharField(max_length=200)
     requested_author = models.CharField(max_length=100, blank=True, null=True)
-    date_requested = models.DateField(auto_now_add=True)
+    date_requested = models.DateField(default=timezone.localdate, editable=False)
     is_fulfilled = models.BooleanField(default=False)
     extra_fee = models.DecimalField(max_digits=6, decimal_places=2, default=0.00)
+    # match_key() of the requested title and author, set on save; the
+    # fulfillment matcher joins them against new catalog rows.
+    title_key = models.CharField(max_length=200, editable=False, default='')
+    author_key = models.CharField(max_length=100, editable=False, default='')
+
+    class Meta:
+        indexes = [
+            # Pending requests by normalized title, for the fulfillment matcher.
+            models.Index(
+                fields=['title_key'],
+                condition=models.Q(is_fulfilled=False),
+                name='bookrequest_pending_title_idx',
+            ),
+            # Pending requests in arrival order. A partial index rather than
+            # (is_fulfilled, date_requested): Django renders is_fulfilled=False
+            # as NOT "is_fulfilled", which SQLite cannot match to a column index.
+            models.Index(
+                fields=['date_requested'],
+                condition=models.Q(is_fulfilled=False),
+                name='bookrequest_pending_idx',
+            ),
+        ]
+
+    def set_match_keys(self):
+        self.title_key = match_key(self.requested_title, 200)
+        self.author_key = match_key(self.requested_author, 100)
+
+    def save(self, *args, **kwargs):
+        self.set_match_keys()
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return f"{self.customer.name} requested {self.requested_title}"
+
+
+# ===============================
+# 📊 Circulation Rollups
+# ===============================
+class DailyCirculation(models.Model):
+    """
+    Library-wide circulation for one day, precomputed from borrow records
+    by `manage.py refresh_rollups` for the analytics endpoints.
+    """
+    day = models.DateField(unique=True)
+    checkouts = models.PositiveIntegerField(default=0)
+    returns = models.PositiveIntegerField(default=0)
+    # Checkout-to-return days summed over the loans returned that day.
+    loan_days = models.PositiveBigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.day}: {self.checkouts} out, {self.returns} in"
+
+
+class DailyBookCirculation(models.Model):
+    """
+    Checkouts of one title on one day; only days with checkouts have rows.
+    """
+    day = models.DateField()
+    book = models.ForeignKey(Book, on_delete=models.CASCADE)
+    checkouts = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            # Covering: top-title reports over a date range read only this
+            # index. (day, book) is unique because refreshes replace whole days.
+            models.Index(fields=['day', 'book', 'checkouts'], name='daily_book_circulation_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.day}: {self.book.title} x{self.checkouts}"
+
+
+class DailyAuthorCirculation(models.Model):
+    """
+    Checkouts of one author's titles on one day, so top-author reports
+    need no join against the catalog.
+    """
+    day = models.DateField()
+    author = models.CharField(max_length=100)
+    checkouts = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['day', 'author', 'checkouts'], name='daily_author_circulation_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.day}: {self.author} x{self.checkouts}"
+
+
+# ===============================
+# 🔄 Change Log
+# ===============================
+class ChangeLog(models.Model):
+    """
+    The latest change to each book, customer and loan, for delta sync.
+
+    Rows are written by SQLite triggers (migration 0016), so bulk_create(),
+    queryset.update() and raw SQL are all recorded. A change replaces the
+    object's previous entry under a new, higher `seq`, so the log holds one
+    entry per object and reading everything after a `seq` costs only the
+    changes since. Deletes leave a `deleted` entry (a tombstone). Archiving
+    a loan is not a change: it stays in BorrowHistory.
+    """
+    BOOK = 'book'
+    CUSTOMER = 'customer'
+    BORROW_RECORD = 'borrow_record'
+    KINDS = [
+        (BOOK, 'Book'),
+        (CUSTOMER, 'Customer'),
+        (BORROW_RECORD, 'Borrow record'),
+    ]
+
+    seq = models.BigAutoField(primary_key=True)
+    kind = models.CharField(max_length=20, choices=KINDS)
+    object_id = models.BigIntegerField()
+    deleted = models.BooleanField(default=False)
+    changed_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['kind', 'object_id'], name='unique_change_per_object'),
+        ]
+
+    def __str__(self):
+        return f"#{self.seq} {self.kind} {self.object_id}{' deleted' if self.deleted else ''}"
+
+
+# ===============================
+# 💸 Fines
+# ===============================
+# Amounts are whole cents so the nightly job can sum them exactly in SQL.
+class LoanFine(models.Model):
+    """
+    The fine accrued so far on one overdue loan, kept by `manage.py
+    compute_fines`. It only grows, up to the rule's cap, and stays when
+    the loan is returned or archived.
+    """
+    loan_id = models.BigIntegerField(primary_key=True)
+    customer = models.ForeignKey(Customer, on_delete=models.CASCADE, related_name='loan_fines')
+    book = models.ForeignKey(Book, on_delete=models.CASCADE, related_name='+')
+    accrued_cents = models.PositiveIntegerField(default=0)
+    accrued_through = models.DateField()
+
+    def __str__(self):
+        return f"Loan {self.loan_id}: {self.accrued_cents} cents"
+
+
+class FineLedgerEntry(models.Model):
+    """
+    Fines posted to a customer on one day, with the running balance after
+    them, so a customer's balance is their latest entry.
+    """
+    customer = models.ForeignKey(Customer, on_delete=models.CASCADE, related_name='fine_entries')
+    day = models.DateField()
+    amount_cents = models.PositiveIntegerField(default=0)
+    balance_cents = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name_plural = 'fine ledger entries'
+        constraints = [
+            # Also the index behind "latest entry per customer".
+            models.UniqueConstraint(fields=['customer', 'day'], name='unique_fine_entry_per_day'),
+        ]
+
+    def __str__(self):
+        return f"{self.day}: +{self.amount_cents} = {self.balance_cents} cents"
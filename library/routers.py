@@ -0,0 +1,94 @@
+import itertools
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+# Set on responses to writes; while present, the client's reads stay on
+# the primary so it sees its own writes despite replica lag.
+PIN_COOKIE = 'library_read_primary'
+
+_routing = ContextVar('library_db_routing', default=None)
+_next_replica = itertools.count()
+
+
+class Routing:
+    """
+    Where the current request's reads go, and why. `wrote` flips when the
+    request writes, moving its remaining reads to the primary.
+    """
+    __slots__ = ('alias', 'reason', 'wrote')
+
+    def __init__(self, alias=DEFAULT_DB_ALIAS, reason='primary'):
+        self.alias = alias
+        self.reason = reason
+        self.wrote = False
+
+
+def read_aliases():
+    return getattr(settings, 'LIBRARY_READ_ALIASES', [])
+
+
+def pin_seconds():
+    return getattr(settings, 'LIBRARY_READ_YOUR_WRITES_SECONDS', 5)
+
+
+def choose(replica_reads, method, pinned):
+    """
+    `(alias, reason)` for a request's reads: a read alias, round robin,
+    only for safe requests to views that opt in with `replica_reads` from
+    clients not pinned to the primary.
+    """
+    aliases = read_aliases()
+    if method not in ('GET', 'HEAD', 'OPTIONS'):
+        return DEFAULT_DB_ALIAS, 'write'
+    if not replica_reads:
+        return DEFAULT_DB_ALIAS, 'primary'
+    if pinned:
+        return DEFAULT_DB_ALIAS, 'pinned'
+    if not aliases:
+        return DEFAULT_DB_ALIAS, 'no_replicas'
+    return aliases[next(_next_replica) % len(aliases)], 'replica'
+
+
+def begin(routing):
+    return _routing.set(routing)
+
+
+def end(token):
+    _routing.reset(token)
+
+
+def current():
+    return _routing.get()
+
+
+# ===============================
+# 🔀 Read Replica Router
+# ===============================
+class ReadReplicaRouter:
+    """
+    Writes always go to the primary. Reads go where the request's Routing
+    says (see ReadReplicaRoutingMiddleware), except inside a transaction on
+    the primary or after the request has written. Outside a request
+    (management commands, shells) everything stays on the primary.
+    """
+    def db_for_read(self, model, **hints):
+        routing = _routing.get()
+        if routing is None or routing.wrote or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return routing.alias
+
+    def db_for_write(self, model, **hints):
+        routing = _routing.get()
+        if routing is not None:
+            routing.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Read aliases hold copies of the primary's rows.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas are copied from the primary (`manage.py sync_replicas`).
+        return db == DEFAULT_DB_ALIAS
@@ -0,0 +1,106 @@
+import re
+
+from django.db import connection
+from django.db.models import Q
+from django.utils.html import escape
+
+from .models import Book
+
+FTS_TABLE = 'library_book_fts'
+HIGHLIGHT_START = '<mark>'
+HIGHLIGHT_END = '</mark>'
+# FTS5 marks matches with these control characters; the text around them
+# is HTML-escaped before they become HIGHLIGHT_START / HIGHLIGHT_END.
+_MARK_START = '\x02'
+_MARK_END = '\x03'
+
+# Ranked results are paged by offset, which FTS5 has to walk; deeper
+# than this, refine the query instead.
+MAX_RESULTS = 1000
+
+# bm25() column weights, in FTS column order: title, author, isbn.
+RANK_WEIGHTS = (10.0, 5.0, 1.0)
+
+_TOKEN = re.compile(r'"([^"]*)"|(\S+)')
+_WORD = re.compile(r'\w+')
+
+
+# ===============================
+# 🔎 Query Parsing
+# ===============================
+def build_match_query(q):
+    """
+    Turn user input into a safe FTS5 MATCH expression.
+
+    Every term is quoted so FTS5 operators in the input are treated as
+    text. `"exact phrase"` is kept as a phrase, and a trailing `*` makes
+    a term a prefix query (`tolk*`). Terms are ANDed together.
+    """
+    parts = []
+    for phrase, word in _TOKEN.findall(q or ''):
+        if phrase:
+            terms = _WORD.findall(phrase)
+            if terms:
+                parts.append('"{}"'.format(' '.join(terms)))
+            continue
+        terms = _WORD.findall(word)
+        parts.extend(f'"{term}"' for term in terms)
+        if terms and word.endswith('*'):
+            parts[-1] += '*'
+    return ' '.join(parts)
+
+
+def render_highlight(value):
+    """
+    HTML-escape a field highlighted with the match markers, then turn the
+    markers into `<mark>` tags, so stored text never comes back as markup.
+    """
+    if value is None:
+        return None
+    return escape(value).replace(_MARK_START, HIGHLIGHT_START).replace(_MARK_END, HIGHLIGHT_END)
+
+
+# ===============================
+# 📚 Book Search
+# ===============================
+def search_books(q, limit=50, offset=0):
+    """
+    Return up to `limit` books matching `q` after the first `offset`,
+    best match first (ties by id, so pages never overlap).
+
+    On SQLite this runs against the FTS5 index with BM25 ranking and sets
+    `rank`, `title_highlight` and `author_highlight` (escaped HTML) on
+    every result. On other backends it falls back to an unranked
+    `icontains` filter.
+    """
+    match = build_match_query(q)
+    if not match:
+        return []
+
+    if connection.vendor != 'sqlite':
+        books = list(
+            Book.objects.filter(Q(title__icontains=q) | Q(author__icontains=q) | Q(isbn=q))
+            .order_by('pk')[offset:offset + limit]
+        )
+        for book in books:
+            book.rank, book.title_highlight, book.author_highlight = None, escape(book.title), escape(book.author)
+        return books
+
+    weights = ', '.join(str(weight) for weight in RANK_WEIGHTS)
+    sql = f"""
+        SELECT b.*,
+               bm25({FTS_TABLE}, {weights}) AS rank,
+               highlight({FTS_TABLE}, 0, %s, %s) AS title_highlight,
+               highlight({FTS_TABLE}, 1, %s, %s) AS author_highlight
+        FROM {FTS_TABLE}
+        JOIN {Book._meta.db_table} b ON b.id = {FTS_TABLE}.rowid
+        WHERE {FTS_TABLE} MATCH %s
+        ORDER BY rank, b.id
+        LIMIT %s OFFSET %s
+    """
+    params = [_MARK_START, _MARK_END, _MARK_START, _MARK_END, match, limit, offset]
+    books = list(Book.objects.raw(sql, params))
+    for book in books:
+        book.title_highlight = render_highlight(book.title_highlight)
+        book.author_highlight = render_highlight(book.author_highlight)
+    return books
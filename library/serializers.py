@@ -1,43 +1,338 @@
+import datetime
+from operator import itemgetter
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.db.models import F, Func, TextField
+from django.db.models.query import ValuesIterable
 from rest_framework import serializers
-from .models import Book, Customer, BorrowRecord, BookRequest
+from .models import Book, Customer, BorrowRecord, BorrowHistory, BookRequest, Hold
+from .services import MAX_ID
+
+
+# ===============================
+# ⚡ Eager Loading Mixin
+# ===============================
+class EagerLoadingMixin:
+    """
+    Declares the relations a serializer renders so list views can fetch
+    them with the main query instead of once per row.
+    """
+    select_related_fields = ()
+    only_fields = ()
+
+    @classmethod
+    def setup_eager_loading(cls, queryset):
+        if cls.select_related_fields:
+            queryset = queryset.select_related(*cls.select_related_fields)
+        if cls.only_fields:
+            queryset = queryset.only(*cls.only_fields)
+        return queryset
+
+
+# ===============================
+# 🪶 Sparse Fieldsets & Fast Read Path
+# ===============================
+# values() refuses aliases that shadow model fields, so fast path columns
+# are selected as `<key>__fast` and RawValuesIterable strips the suffix.
+FAST_ALIAS_SUFFIX = '__fast'
+
+
+class RawColumn(Func):
+    """
+    A column as the driver returns it. The output field has no database
+    converters, so `.values()` skips the per-value parsing and
+    `SparseFieldsMixin.fast_representation()` formats the few values that
+    need it.
+    """
+    template = '%(expressions)s'
+    output_field = TextField()
+
+    def __init__(self, lookup):
+        super().__init__(F(lookup))
+        self.name = lookup
+
+
+class StoredDate(RawColumn):
+    """
+    A date column as the database stores it. SQLite stores ISO text, and
+    reading it as text skips the driver parsing every value into a date
+    only for it to be formatted back.
+    """
+    def as_sqlite(self, compiler, connection, **extra_context):
+        return super().as_sql(compiler, connection, template="(%(expressions)s || '')", **extra_context)
+
+
+class RawValuesIterable(ValuesIterable):
+    """
+    `.values()` rows keyed by the names the fast path asked for. Set as
+    the queryset's `_iterable_class`, the one Django internal the fast path
+    leans on; SparseFieldsTests pin its output byte for byte.
+    """
+    def __iter__(self):
+        for row in super().__iter__():
+            yield {key.removesuffix(FAST_ALIAS_SUFFIX): value for key, value in row.items()}
+
+
+def _date_getter(key):
+    def get(row):
+        value = row[key]
+        return value if value is None or isinstance(value, str) else value.isoformat()
+    return get
+
+
+def _bool_getter(key):
+    # Computed columns (e.g. BorrowHistory.is_archived) have no declared
+    # type, so SQLite hands them back as 0/1.
+    def get(row):
+        value = row[key]
+        return value if value is None else bool(value)
+    return get
+
+
+def _datetime_getter(key, field):
+    def get(row):
+        value = row[key]
+        if isinstance(value, str):
+            value = parse_datetime(value)
+            # SQLite stores naive UTC when USE_TZ is on.
+            if value is not None and settings.USE_TZ and timezone.is_naive(value):
+                value = timezone.make_aware(value, datetime.timezone.utc)
+        return None if value is None else field.to_representation(value)
+    return get
+
+
+def _decimal_getter(key, field):
+    def get(row):
+        value = row[key]
+        return None if value is None else field.to_representation(value)
+    return get
+
+
+class SparseFieldsMixin:
+    """
+    `fields=[...]` trims the rendered fields. List views also get a
+    read-only fast path: rows are fetched with `.values()` and turned into
+    the same JSON shape as `to_representation()` in place, without model
+    instances or per-field DRF calls.
+
+    Relations rendered as strings declare how to rebuild `__str__` from
+    columns in `fast_relations`: `{name: (format, lookups)}`.
+    """
+    fast_relations = {}
+
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+    @classmethod
+    def fast_fields(cls):
+        """
+        `{name: (columns, getter)}` for every field, built once per class.
+        `columns` maps row keys to the expressions selected for them;
+        `getter` is None when the row value is already the output.
+        """
+        if '_fast_fields' not in cls.__dict__:
+            cls._fast_fields = {name: cls._fast_field(name, field) for name, field in cls().fields.items()}
+        return cls._fast_fields
+
+    @classmethod
+    def _fast_field(cls, name, field):
+        if name in cls.fast_relations:
+            template, lookups = cls.fast_relations[name]
+            columns = {lookup: RawColumn(lookup) for lookup in lookups}
+            if len(lookups) == 1:
+                return columns, lambda row, lookup=lookups[0]: template.format(row[lookup])
+            values = itemgetter(*lookups)
+            return columns, lambda row: template.format(*values(row))
+        if isinstance(field, (serializers.ManyRelatedField, serializers.SerializerMethodField)) or (
+            isinstance(field, serializers.RelatedField) and not isinstance(field, serializers.PrimaryKeyRelatedField)
+        ):
+            raise ImproperlyConfigured(f"{cls.__name__}.{name} needs an entry in fast_relations.")
+        if isinstance(field, serializers.BooleanField):
+            return {name: RawColumn(field.source)}, _bool_getter(name)
+        if isinstance(field, serializers.DateTimeField):
+            return {name: RawColumn(field.source)}, _datetime_getter(name, field)
+        if isinstance(field, serializers.DateField):
+            return {name: StoredDate(field.source)}, _date_getter(name)
+        if isinstance(field, serializers.DecimalField):
+            return {name: RawColumn(field.source)}, _decimal_getter(name, field)
+        return {name: RawColumn(field.source)}, None
+
+    @classmethod
+    def fast_columns(cls, fields=None, extra=()):
+        """
+        The row keys and expressions `fields` need, plus the `extra` model
+        fields (e.g. the paginator's ordering).
+        """
+        spec = cls.fast_fields()
+        columns = {}
+        for name in fields or spec:
+            columns.update(spec[name][0])
+        for name in extra:
+            columns.setdefault(name, RawColumn(name))
+        return columns
+
+    @classmethod
+    def fast_lookups(cls, fields=None, extra=()):
+        """
+        The model lookups behind `fast_columns()`, for `.only()`.
+        """
+        return [expression.name for expression in cls.fast_columns(fields, extra).values()]
+
+    @classmethod
+    def fast_values(cls, queryset, fields=None, extra=()):
+        """
+        `queryset.values()` restricted to the columns `fields` need, read
+        with RawValuesIterable.
+        """
+        columns = cls.fast_columns(fields, extra)
+        queryset = queryset.values(**{key + FAST_ALIAS_SUFFIX: expression for key, expression in columns.items()})
+        queryset._iterable_class = RawValuesIterable
+        return queryset
+
+    @classmethod
+    def fast_representation(cls, rows, fields=None):
+        """
+        Turn `fast_values()` rows into output dicts, reusing the row dicts
+        unless a relation has to be rebuilt in field order.
+        """
+        spec = cls.fast_fields()
+        names = list(fields or spec)
+        getters = [(name, spec[name][1]) for name in names if spec[name][1] is not None]
+        rows = list(rows)
+        for row in rows:
+            for name, get in getters:
+                row[name] = get(row)
+        if any(name in cls.fast_relations for name in names):
+            return [{name: row[name] for name in names} for row in rows]
+        if rows and len(rows[0]) > len(names):
+            extra = [key for key in rows[0] if key not in set(names)]
+            for row in rows:
+                for key in extra:
+                    del row[key]
+        return rows
+
+
+# ===============================
+# 🔄 Change Stamps
+# ===============================
+class ChangeStampedMixin:
+    """
+    `updated_at` and `change_seq` are stamped by database triggers, so
+    reload them after a write to return what was actually stored.
+    """
+    def save(self, **kwargs):
+        instance = super().save(**kwargs)
+        instance.refresh_from_db(fields=['updated_at', 'change_seq'])
+        return instance
 
 
 # ===============================
 # 1️⃣ Customer Serializer
 # ===============================
-class CustomerSerializer(serializers.ModelSerializer):
+class CustomerSerializer(ChangeStampedMixin, SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Customer
         fields = '__all__'
+        read_only_fields = ('open_loan_count', 'overdue_loan_count', 'lifetime_loan_count', 'overdue_counted_on')
 
 
 # ===============================
 # 2️⃣ Book Serializer
 # ===============================
-class BookSerializer(serializers.ModelSerializer):
+class BookSerializer(ChangeStampedMixin, SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Book
         fields = '__all__'
 
 
+class BookSearchResultSerializer(BookSerializer):
+    rank = serializers.FloatField(read_only=True)
+    title_highlight = serializers.CharField(read_only=True)
+    author_highlight = serializers.CharField(read_only=True)
+
+
 # ===============================
 # 3️⃣ Borrow Record Serializer
 # ===============================
-class BorrowRecordSerializer(serializers.ModelSerializer):
+class BorrowRecordSerializer(EagerLoadingMixin, SparseFieldsMixin, serializers.ModelSerializer):
     customer = serializers.StringRelatedField(read_only=True)
     book = serializers.StringRelatedField(read_only=True)
 
+    fast_relations = {
+        'customer': ('{}', ('customer__name',)),
+        'book': ('{} by {}', ('book__title', 'book__author')),
+    }
+
+    # Customer.__str__ and Book.__str__ only need these columns.
+    select_related_fields = ('customer', 'book')
+    only_fields = (
+        'id', 'checkout_date', 'due_date', 'return_date', 'is_returned', 'updated_at', 'change_seq',
+        'customer__name', 'book__title', 'book__author',
+    )
+
     class Meta:
         model = BorrowRecord
         fields = '__all__'
 
 
+class BorrowHistorySerializer(BorrowRecordSerializer):
+    """
+    Loans from the BorrowHistory view, archived ones included.
+    """
+    only_fields = BorrowRecordSerializer.only_fields + ('is_archived',)
+
+    class Meta:
+        model = BorrowHistory
+        fields = '__all__'
+
+
+# ===============================
+# 🕒 Hold Serializer
+# ===============================
+class HoldSerializer(serializers.ModelSerializer):
+    position = serializers.IntegerField(read_only=True, allow_null=True)
+    # Input for placing a hold; `services.place_hold` does the rest.
+    customer_id = serializers.IntegerField(write_only=True, min_value=1, max_value=MAX_ID)
+    book_id = serializers.IntegerField(write_only=True, min_value=1, max_value=MAX_ID)
+
+    class Meta:
+        model = Hold
+        fields = [
+            'id', 'customer', 'book', 'status', 'position', 'created_at', 'ready_on', 'expires_on',
+            'customer_id', 'book_id',
+        ]
+        read_only_fields = ['id', 'customer', 'book', 'status', 'created_at', 'ready_on', 'expires_on']
+
+
+class HoldCancelSerializer(serializers.Serializer):
+    """
+    Input for cancelling a hold; `services.cancel_hold` does the rest.
+    """
+    customer_id = serializers.IntegerField(min_value=1, max_value=MAX_ID)
+    book_id = serializers.IntegerField(min_value=1, max_value=MAX_ID)
+
+
 # ===============================
 # 4️⃣ Book Request Serializer (NEW FEATURE 💡)
 # ===============================
-class BookRequestSerializer(serializers.ModelSerializer):
+class BookRequestSerializer(EagerLoadingMixin, SparseFieldsMixin, serializers.ModelSerializer):
     customer = serializers.StringRelatedField(read_only=True)
 
+    fast_relations = {'customer': ('{}', ('customer__name',))}
+
+    select_related_fields = ('customer',)
+    only_fields = (
+        'id', 'requested_title', 'requested_author', 'date_requested',
+        'is_fulfilled', 'extra_fee', 'customer__name',
+    )
+
     class Meta:
         model = BookRequest
-        fields = '__all__'
+        exclude = ('title_key', 'author_key')
+        read_only_fields = ('is_fulfilled',)
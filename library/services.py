@@ -0,0 +1,571 @@
+import datetime
+
+from django.db import IntegrityError, transaction
+from django.conf import settings
+from django.db.models import Case, Count, F, IntegerField, OuterRef, Q, Subquery, Value, When, Window
+from django.db.models.functions import Coalesce, Greatest, RowNumber
+from django.utils import timezone
+
+from .models import ArchivedBorrowRecord, Book, Customer, BorrowRecord, Hold, loan_period_days, max_open_loans
+from .signals import invalidate_catalog
+
+
+# ===============================
+# ⚠️ Circulation Errors
+# ===============================
+class CirculationError(Exception):
+    """Base class for borrow/return failures surfaced to the API."""
+    message = "Circulation request failed."
+
+    def __init__(self, message=None):
+        super().__init__(message or self.message)
+        self.message = message or self.message
+
+
+class NotFound(CirculationError):
+    message = "Book or Customer not found."
+
+
+class NoCopiesAvailable(CirculationError):
+    message = "No copies available for this book."
+
+
+class AlreadyBorrowed(CirculationError):
+    message = "This customer already borrowed this book."
+
+
+class NoActiveLoan(CirculationError):
+    message = "No active borrow record found for this book and customer."
+
+
+class LoanLimitReached(CirculationError):
+    message = "This customer has reached their limit of open loans."
+
+
+class HoldNotNeeded(CirculationError):
+    message = "Copies of this book are available; borrow it instead."
+
+
+class AlreadyHeld(CirculationError):
+    message = "This customer already has a hold on this book."
+
+
+class NoActiveHold(CirculationError):
+    message = "No active hold found for this book and customer."
+
+
+# ===============================
+# 📊 Loan Counters
+# ===============================
+def _loan_count(model=BorrowRecord, **filters):
+    """
+    Correlated COUNT of a customer's loans in `model` matching `filters`.
+    Open loans are never archived, so only lifetime counts need
+    ArchivedBorrowRecord too.
+    """
+    return Coalesce(
+        Subquery(
+            model.objects.filter(customer=OuterRef('pk'), **filters)
+            .order_by().values('customer').annotate(n=Count('pk')).values('n')
+        ),
+        0,
+    )
+
+
+def _lifetime_loan_count():
+    """
+    Live plus archived loans, counted per table off each one's customer_id
+    index. Counting the BorrowHistory view instead has SQLite materialize
+    the whole UNION ALL for every customer.
+    """
+    return _loan_count() + _loan_count(ArchivedBorrowRecord)
+
+
+def _decrement(field, by=1):
+    return Greatest(F(field) - by, Value(0), output_field=IntegerField())
+
+
+def _overdue_decrement(due_date):
+    """
+    A returned loan only comes off `overdue_loan_count` if the last
+    reconciliation counted it, i.e. it was already overdue then.
+    """
+    return Case(
+        When(overdue_counted_on__gt=due_date, then=_decrement('overdue_loan_count')),
+        default=F('overdue_loan_count'),
+        output_field=IntegerField(),
+    )
+
+
+def loan_counter_drift(customers=None):
+    """
+    Customers whose stored loan counters disagree with their borrow
+    records, annotated with the `actual_*` values.
+    """
+    customers = Customer.objects.all() if customers is None else customers
+    return customers.annotate(
+        actual_open=_loan_count(return_date__isnull=True),
+        actual_overdue=_loan_count(return_date__isnull=True, due_date__lt=OuterRef('overdue_counted_on')),
+        actual_lifetime=_lifetime_loan_count(),
+    ).exclude(
+        open_loan_count=F('actual_open'),
+        overdue_loan_count=F('actual_overdue'),
+        lifetime_loan_count=F('actual_lifetime'),
+    )
+
+
+def recompute_loan_counters(customers=None, today=None):
+    """
+    Rewrite the loan counters of `customers` (default: everyone) from
+    their borrow records in a single UPDATE, counting loans overdue as of
+    `today`. Returns the number of customers updated.
+    """
+    customers = Customer.objects.all() if customers is None else customers
+    today = today or timezone.localdate()
+    return customers.update(
+        open_loan_count=_loan_count(return_date__isnull=True),
+        overdue_loan_count=_loan_count(return_date__isnull=True, due_date__lt=today),
+        lifetime_loan_count=_lifetime_loan_count(),
+        overdue_counted_on=today,
+    )
+
+
+# ===============================
+# 🔄 Borrow & Return
+# ===============================
+def _customer_and_book(customer_id, book_id):
+    try:
+        return Customer.objects.get(pk=customer_id), Book.objects.get(pk=book_id)
+    except (Customer.DoesNotExist, Book.DoesNotExist, ValueError, TypeError):
+        raise NotFound()
+
+
+def borrow_book(customer_id, book_id):
+    """
+    Check a book out to a customer.
+
+    The customer's loan slot is claimed with a conditional `UPDATE ...
+    WHERE open_loan_count < <limit>` and the copy with `UPDATE ... WHERE
+    copies_available > 0`, so concurrent borrowers can never exceed their
+    limit or take more copies than exist, and the partial unique
+    constraint on open loans rejects a duplicate loan without a prior
+    existence check. A customer whose hold is ready picks up the copy set
+    aside for them instead of taking one off the shelf, and any active
+    hold of theirs on the title is fulfilled. All of it happens in one
+    transaction: if any step fails the slot, the copy and the hold are
+    given back.
+
+    Note that the returned record's `book.copies_available` reflects the
+    value read before the update.
+    """
+    with transaction.atomic():
+        customer, book = _customer_and_book(customer_id, book_id)
+
+        hold = Hold.objects.filter(customer=customer, book=book, status__in=Hold.ACTIVE).values_list(
+            'pk', 'status'
+        ).first()
+        picked_up = hold is not None and hold[1] == Hold.READY and Hold.objects.filter(
+            pk=hold[0], status=Hold.READY
+        ).update(status=Hold.FULFILLED)
+        if not picked_up:
+            reserved = Book.objects.filter(pk=book.pk, copies_available__gt=0).update(
+                copies_available=F('copies_available') - 1
+            )
+            if not reserved:
+                raise NoCopiesAvailable()
+            if hold is not None:
+                Hold.objects.filter(pk=hold[0], status=Hold.WAITING).update(status=Hold.FULFILLED)
+
+        claimed = Customer.objects.filter(
+            pk=customer.pk, open_loan_count__lt=max_open_loans(customer.membership_class)
+        ).update(
+            open_loan_count=F('open_loan_count') + 1,
+            lifetime_loan_count=F('lifetime_loan_count') + 1,
+        )
+        if not claimed:
+            raise LoanLimitReached()
+
+        try:
+            with transaction.atomic():
+                record = BorrowRecord.objects.create(customer=customer, book=book)
+        except IntegrityError:
+            raise AlreadyBorrowed()
+        invalidate_catalog()
+
+    return record
+
+
+def return_book(customer_id, book_id):
+    """
+    Close a customer's open loan and put the copy back on the shelf.
+
+    The loan is closed with a conditional update on `return_date IS NULL`,
+    so when two return requests race only one of them closes the loan and
+    the copy is released exactly once: to the head of the title's hold
+    queue if anyone is waiting, otherwise back onto the shelf.
+    """
+    with transaction.atomic():
+        customer, book = _customer_and_book(customer_id, book_id)
+
+        record = BorrowRecord.objects.filter(
+            customer=customer, book=book, return_date__isnull=True
+        ).first()
+        if record is None:
+            raise NoActiveLoan()
+
+        today = timezone.localdate()
+        closed = BorrowRecord.objects.filter(pk=record.pk, return_date__isnull=True).update(
+            return_date=today, is_returned=True
+        )
+        if not closed:
+            raise NoActiveLoan()
+
+        _release_copies({book.pk: 1}, today)
+        Customer.objects.filter(pk=customer.pk).update(
+            open_loan_count=_decrement('open_loan_count'),
+            overdue_loan_count=_overdue_decrement(record.due_date),
+        )
+
+    record.customer, record.book = customer, book
+    record.return_date, record.is_returned = today, True
+    return record
+
+
+# ===============================
+# 📦 Bulk Borrow & Return
+# ===============================
+class BatchConflict(CirculationError):
+    message = "The batch conflicted with a concurrent update. Please retry."
+
+
+MAX_ID = 2 ** 63 - 1
+
+
+def _as_id(value):
+    # JSON true would otherwise pass as id 1, and 1.5 as 1.
+    if isinstance(value, bool) or (isinstance(value, float) and not value.is_integer()):
+        raise TypeError("not an id")
+    value = int(value)
+    # Past SQLite's INTEGER range the batch lookup would raise OverflowError.
+    if not 1 <= value <= MAX_ID:
+        raise ValueError("not an id")
+    return value
+
+
+def _parse_pairs(items):
+    """
+    Normalise a list of `{"customer_id": ..., "book_id": ...}` dicts into
+    `(customer_id, book_id)` int pairs, using None for malformed items.
+    """
+    pairs = []
+    for item in items:
+        try:
+            pairs.append((_as_id(item["customer_id"]), _as_id(item["book_id"])))
+        except (KeyError, TypeError, ValueError):
+            pairs.append(None)
+    return pairs
+
+
+def _result(pair, item, error=None, ok_status=None):
+    if pair:
+        customer_id, book_id = pair
+    elif isinstance(item, dict):
+        customer_id, book_id = item.get("customer_id"), item.get("book_id")
+    else:
+        customer_id = book_id = None
+    if error:
+        return {"customer_id": customer_id, "book_id": book_id, "status": "error", "error": error}
+    return {"customer_id": customer_id, "book_id": book_id, "status": ok_status}
+
+
+def bulk_borrow(items):
+    """
+    Check out many (customer, book) pairs at once.
+
+    Validation is set-based (one query each for customers, books,
+    already-open loans and active holds), inventory, holds and customer
+    loan counters are updated with one grouped conditional UPDATE each
+    and the loans are inserted with `bulk_create`, so the query count
+    does not grow with the batch. Items with a ready hold take the copy
+    set aside for them. Items that fail are reported individually and do
+    not abort the rest of the batch.
+    """
+    pairs = _parse_pairs(items)
+    valid = [pair for pair in pairs if pair]
+    customer_ids = {customer_id for customer_id, _ in valid}
+    book_ids = {book_id for _, book_id in valid}
+
+    with transaction.atomic():
+        membership, headroom = {}, {}
+        for pk, membership_class, open_count in Customer.objects.filter(pk__in=customer_ids).values_list(
+            'pk', 'membership_class', 'open_loan_count'
+        ):
+            membership[pk] = membership_class
+            headroom[pk] = max_open_loans(membership_class) - open_count
+        stock, book_loan_days = {}, {}
+        for pk, copies, days in (
+            Book.objects.select_for_update()
+            .filter(pk__in=book_ids)
+            .values_list('pk', 'copies_available', 'loan_period_days')
+        ):
+            stock[pk], book_loan_days[pk] = copies, days
+        open_pairs = set(
+            BorrowRecord.objects.filter(
+                return_date__isnull=True, customer_id__in=customer_ids, book_id__in=book_ids
+            ).values_list('customer_id', 'book_id')
+        )
+        holds = {
+            (customer_id, book_id): (pk, hold_status)
+            for pk, customer_id, book_id, hold_status in Hold.objects.filter(
+                status__in=Hold.ACTIVE, customer_id__in=customer_ids, book_id__in=book_ids
+            ).values_list('pk', 'customer_id', 'book_id', 'status')
+        }
+
+        results, accepted, demand, borrowed, fulfilled = [], [], {}, {}, {Hold.WAITING: [], Hold.READY: []}
+        today = timezone.localdate()
+        for item, pair in zip(items, pairs):
+            if pair is None:
+                results.append(_result(pair, item, error="customer_id and book_id are required integers."))
+                continue
+            customer_id, book_id = pair
+            hold_pk, hold_status = holds.get(pair, (None, None))
+            if customer_id not in membership or book_id not in stock:
+                error = NotFound.message
+            elif pair in open_pairs:
+                error = AlreadyBorrowed.message
+            elif headroom[customer_id] - borrowed.get(customer_id, 0) < 1:
+                error = LoanLimitReached.message
+            elif hold_status != Hold.READY and stock[book_id] - demand.get(book_id, 0) < 1:
+                error = NoCopiesAvailable.message
+            else:
+                error = None
+                open_pairs.add(pair)
+                if hold_pk is not None:
+                    fulfilled[hold_status].append(hold_pk)
+                if hold_status != Hold.READY:
+                    demand[book_id] = demand.get(book_id, 0) + 1
+                borrowed[customer_id] = borrowed.get(customer_id, 0) + 1
+                days = loan_period_days(book_loan_days[book_id], membership[customer_id])
+                accepted.append(BorrowRecord(
+                    customer_id=customer_id, book_id=book_id,
+                    due_date=today + datetime.timedelta(days=days),
+                ))
+            results.append(_result(pair, item, error=error, ok_status="borrowed"))
+
+        if accepted:
+            if demand:
+                taken = Case(*[When(pk=book_id, then=Value(count)) for book_id, count in demand.items()])
+                updated = Book.objects.filter(pk__in=demand, copies_available__gte=taken).update(
+                    copies_available=F('copies_available') - taken
+                )
+                if updated != len(demand):
+                    raise BatchConflict()
+            holds_to_close = fulfilled[Hold.WAITING] + fulfilled[Hold.READY]
+            if holds_to_close:
+                updated = Hold.objects.filter(
+                    Q(pk__in=fulfilled[Hold.WAITING], status=Hold.WAITING)
+                    | Q(pk__in=fulfilled[Hold.READY], status=Hold.READY)
+                ).update(status=Hold.FULFILLED)
+                if updated != len(holds_to_close):
+                    raise BatchConflict()
+            added = Case(*[When(pk=pk, then=Value(count)) for pk, count in borrowed.items()])
+            limit = Case(*[
+                When(pk=pk, then=Value(max_open_loans(membership[pk]) - count)) for pk, count in borrowed.items()
+            ])
+            updated = Customer.objects.filter(pk__in=borrowed, open_loan_count__lte=limit).update(
+                open_loan_count=F('open_loan_count') + added,
+                lifetime_loan_count=F('lifetime_loan_count') + added,
+            )
+            if updated != len(borrowed):
+                raise BatchConflict()
+            try:
+                with transaction.atomic():
+                    BorrowRecord.objects.bulk_create(accepted)
+            except IntegrityError:
+                raise BatchConflict()
+            invalidate_catalog()
+
+    return results
+
+
+def bulk_return(items):
+    """
+    Close many open loans at once.
+
+    Open loans are looked up in one query and closed with one UPDATE; the
+    returned copies go to waiting holds or back on the shelf through
+    `_release_copies()` and customer loan counters are adjusted with one
+    grouped UPDATE.
+    """
+    pairs = _parse_pairs(items)
+    valid = [pair for pair in pairs if pair]
+    customer_ids = {customer_id for customer_id, _ in valid}
+    book_ids = {book_id for _, book_id in valid}
+
+    with transaction.atomic():
+        open_loans, counted_on = {}, {}
+        for pk, customer_id, book_id, due_date, overdue_counted_on in (
+            BorrowRecord.objects.select_for_update()
+            .filter(return_date__isnull=True, customer_id__in=customer_ids, book_id__in=book_ids)
+            .values_list('pk', 'customer_id', 'book_id', 'due_date', 'customer__overdue_counted_on')
+        ):
+            open_loans[customer_id, book_id] = pk, due_date
+            counted_on[customer_id] = overdue_counted_on
+
+        results, closing, returned, closed_by, overdue_by = [], [], {}, {}, {}
+        for item, pair in zip(items, pairs):
+            if pair is None:
+                results.append(_result(pair, item, error="customer_id and book_id are required integers."))
+                continue
+            loan = open_loans.pop(pair, None)
+            if loan is None:
+                results.append(_result(pair, item, error=NoActiveLoan.message))
+                continue
+            pk, due_date = loan
+            customer_id, book_id = pair
+            closing.append(pk)
+            returned[book_id] = returned.get(book_id, 0) + 1
+            closed_by[customer_id] = closed_by.get(customer_id, 0) + 1
+            if counted_on.get(customer_id) and due_date < counted_on[customer_id]:
+                overdue_by[customer_id] = overdue_by.get(customer_id, 0) + 1
+            results.append(_result(pair, item, ok_status="returned"))
+
+        if closing:
+            closed = BorrowRecord.objects.filter(pk__in=closing, return_date__isnull=True).update(
+                return_date=timezone.localdate(), is_returned=True
+            )
+            if closed != len(closing):
+                raise BatchConflict()
+            _release_copies(returned)
+            Customer.objects.filter(pk__in=closed_by).update(
+                open_loan_count=_decrement('open_loan_count', Case(
+                    *[When(pk=pk, then=Value(count)) for pk, count in closed_by.items()]
+                )),
+                overdue_loan_count=_decrement('overdue_loan_count', Case(
+                    *[When(pk=pk, then=Value(count)) for pk, count in overdue_by.items()], default=Value(0)
+                )),
+            )
+
+    return results
+
+
+# ===============================
+# 🕒 Holds
+# ===============================
+def set_queue_positions(holds):
+    """
+    Set `position` on each of `holds`: a waiting hold's 1-based place in
+    its title's queue, None for holds no longer waiting. One ranked query
+    over the queues of the holds' titles, up to the newest of them, read
+    off the hold queue index like `_release_copies`.
+    """
+    waiting = [hold for hold in holds if hold.status == Hold.WAITING]
+    places = {}
+    if waiting:
+        places = dict(
+            Hold.objects.filter(
+                book_id__in={hold.book_id for hold in waiting}, status=Hold.WAITING,
+                created_at__lte=max(hold.created_at for hold in waiting),
+            )
+            .annotate(place=Window(RowNumber(), partition_by=F('book_id'), order_by=(F('created_at'), F('pk'))))
+            .values_list('pk', 'place')
+        )
+    for hold in holds:
+        hold.position = places.get(hold.pk)
+    return holds
+
+
+def _release_copies(returned, today=None):
+    """
+    Put `{book_id: copies}` back into circulation. Each copy goes to the
+    oldest waiting hold on its title, which becomes ready for pickup; the
+    rest go back on the shelf. Queue heads are read off the hold queue
+    index, one ranked query however many titles are involved.
+    """
+    today = today or timezone.localdate()
+    heads = (
+        Hold.objects.filter(book_id__in=returned, status=Hold.WAITING)
+        .annotate(place=Window(RowNumber(), partition_by=F('book_id'), order_by=(F('created_at'), F('pk'))))
+        .filter(place__lte=max(returned.values()))
+        .values_list('pk', 'book_id', 'place')
+    )
+    allocated, ready = {}, []
+    for pk, book_id, place in heads:
+        if place <= returned[book_id]:
+            ready.append(pk)
+            allocated[book_id] = allocated.get(book_id, 0) + 1
+
+    if ready:
+        pickup_days = getattr(settings, 'LIBRARY_HOLD_PICKUP_DAYS', 3)
+        Hold.objects.filter(pk__in=ready, status=Hold.WAITING).update(
+            status=Hold.READY, ready_on=today, expires_on=today + datetime.timedelta(days=pickup_days)
+        )
+    shelved = {book_id: count - allocated.get(book_id, 0) for book_id, count in returned.items()}
+    shelved = {book_id: count for book_id, count in shelved.items() if count}
+    if shelved:
+        given_back = Case(*[When(pk=book_id, then=Value(count)) for book_id, count in shelved.items()])
+        Book.objects.filter(pk__in=shelved).update(copies_available=F('copies_available') + given_back)
+        invalidate_catalog()
+    return len(ready)
+
+
+def place_hold(customer_id, book_id):
+    """
+    Join the queue for a title with no copies on the shelf. The partial
+    unique constraint on active holds rejects a second place in the same
+    queue. Returns the hold with its `position` set.
+    """
+    with transaction.atomic():
+        customer, book = _customer_and_book(customer_id, book_id)
+        if book.copies_available > 0:
+            raise HoldNotNeeded()
+        if BorrowRecord.objects.filter(customer=customer, book=book, return_date__isnull=True).exists():
+            raise AlreadyBorrowed()
+        try:
+            with transaction.atomic():
+                hold = Hold.objects.create(customer=customer, book=book)
+        except IntegrityError:
+            raise AlreadyHeld()
+        set_queue_positions([hold])
+
+    hold.customer, hold.book = customer, book
+    return hold
+
+
+def cancel_hold(customer_id, book_id):
+    """
+    Leave a title's queue. Cancelling a ready hold passes the copy set
+    aside for it to the next customer in line, or back to the shelf.
+    """
+    with transaction.atomic():
+        customer, book = _customer_and_book(customer_id, book_id)
+        hold = Hold.objects.filter(customer=customer, book=book, status__in=Hold.ACTIVE).first()
+        if hold is None:
+            raise NoActiveHold()
+        cancelled = Hold.objects.filter(pk=hold.pk, status=hold.status).update(status=Hold.CANCELLED)
+        if not cancelled:
+            raise NoActiveHold()
+        if hold.status == Hold.READY:
+            _release_copies({book.pk: 1})
+
+    hold.customer, hold.book, hold.status = customer, book, Hold.CANCELLED
+    return hold
+
+
+def expire_ready_holds(today=None):
+    """
+    Expire ready holds whose pickup deadline has passed and pass their
+    copies on. Returns the number of holds expired.
+    """
+    today = today or timezone.localdate()
+    with transaction.atomic():
+        expiring = list(
+            Hold.objects.filter(status=Hold.READY, expires_on__lt=today).values_list('pk', 'book_id')
+        )
+        returned = {}
+        for _, book_id in expiring:
+            returned[book_id] = returned.get(book_id, 0) + 1
+        if expiring:
+            Hold.objects.filter(pk__in=[pk for pk, _ in expiring], status=Hold.READY).update(status=Hold.EXPIRED)
+            _release_copies(returned, today)
+    return len(expiring)
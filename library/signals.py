@@ -0,0 +1,20 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .cache import bump_model_version
+from .models import Book
+
+
+def invalidate_catalog():
+    """
+    Drop cached book responses once the current transaction commits, so
+    no request can re-cache the pre-commit state in between.
+    """
+    transaction.on_commit(lambda: bump_model_version(Book))
+
+
+@receiver(post_save, sender=Book)
+@receiver(post_delete, sender=Book)
+def book_changed(sender, **kwargs):
+    invalidate_catalog()
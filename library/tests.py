@@ -1,3 +1,1484 @@
-from django.test import TestCase
+import base64
+import datetime
+import io
+import itertools
+import json
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+from urllib.parse import parse_qs, urlparse
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import OperationalError, connection
+from django.db.models import Count, F, QuerySet
+from django.http import HttpResponse
+from django.test import AsyncClient, RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import generics
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from . import admission, routers, services
+from .archive import archive_returned_loans
+from .async_views import AsyncBookListView
+from .benchmarks import build_scenarios, compare
+from .fines import compute_fines
+from .fulfillment import fulfil_requests
+from .importer import IMPORTERS
+from .management.commands.seed_library import count as seed_count
+from .models import (
+    ArchivedBorrowRecord, Book, BookRequest, BorrowHistory, BorrowRecord, ChangeLog, Customer, DailyCirculation,
+    FineLedgerEntry, Hold, LoanFine, match_key,
+)
+from .cache import cache_stats, get_cache
+from .checks import check_replica_cache
+from .metrics import registry
+from .middleware import AdmissionControlMiddleware
+from .pagination import LibraryCursorPagination
+from .serializers import (
+    BookRequestSerializer, BookSerializer, BorrowHistorySerializer, BorrowRecordSerializer, CustomerSerializer,
+)
+from .views import BorrowRecordListView
+
+_serial = itertools.count()
+
+
+def make_books(count, copies=1):
+    serials = [next(_serial) for _ in range(count)]
+    return Book.objects.bulk_create(
+        Book(
+            title=f"Title {i}",
+            author=f"Author {i % 50}",
+            isbn=f"{i:013d}",
+            published_date=datetime.date(2000, 1, 1),
+            copies_available=copies,
+        )
+        for i in serials
+    )
+
+
+def make_customers(count):
+    serials = [next(_serial) for _ in range(count)]
+    return Customer.objects.bulk_create(
+        Customer(name=f"Customer {i}", email=f"customer{i}@example.com")
+        for i in serials
+    )
+
+
+def make_borrow_records(count):
+    customers = make_customers(max(1, count // 10))
+    books = make_books(count)
+    return BorrowRecord.objects.bulk_create(
+        BorrowRecord(
+            customer=customers[i % len(customers)], book=books[i],
+            due_date=datetime.date.today() + datetime.timedelta(days=14),
+        )
+        for i in range(count)
+    )
+
+
+# ===============================
+# ⚡ Query Count Tests
+# ===============================
+class ListQueryCountTests(TestCase):
+    """
+    List endpoints must cost a constant number of queries regardless of
+    how many rows they render.
+    """
+    def setUp(self):
+        self.client = APIClient()
+
+    def assert_constant_queries(self, url, expected):
+        with self.assertNumQueries(expected):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def assert_flat_pages(self, url, fields, pages=3):
+        """
+        The first page and the later ones reached through `next` each cost
+        one query, rendering every field or only a `?fields=` subset.
+        """
+        for params in ('?page_size=4', f'?page_size=4&fields={fields}'):
+            next_url, sizes = url + params, []
+            while next_url and len(sizes) < pages:
+                response = self.assert_constant_queries(next_url, 1)
+                sizes.append(len(response.data['results']))
+                next_url = response.data['next']
+            self.assertEqual(len(sizes), pages, params)
+            self.assertTrue(all(sizes), params)
+        return response
+
+    def test_borrow_records_10(self):
+        make_borrow_records(10)
+        self.assert_flat_pages(reverse('borrow-records'), 'customer,book,due_date')
+
+    def test_borrow_records_1000(self):
+        make_borrow_records(1000)
+        self.assert_flat_pages(reverse('borrow-records'), 'customer,book,due_date')
+
+    def test_borrow_records_10000(self):
+        make_borrow_records(10000)
+        self.assert_flat_pages(reverse('borrow-records'), 'customer,book,due_date')
+
+    def test_customer_borrowed_books(self):
+        records = make_borrow_records(1000)
+        customer = records[0].customer
+        url = reverse('customer-borrowed-books', args=[customer.id])
+        response = self.assert_flat_pages(url, 'customer,due_date')
+        self.assertEqual(response.data['results'][0]['customer'], customer.name)
+
+    def test_book_requests(self):
+        customers = make_customers(100)
+        BookRequest.objects.bulk_create(
+            BookRequest(customer=customers[i % 100], requested_title=f"Wanted {i}")
+            for i in range(1000)
+        )
+        self.assert_flat_pages(reverse('book-request-list'), 'customer,requested_title')
+
+
+# ===============================
+# 📑 Pagination Tests
+# ===============================
+class CursorPaginationTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        make_borrow_records(120)
+
+    def collect_ids(self, url):
+        ids = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            ids.extend(row['id'] for row in response.data['results'])
+            url = response.data['next']
+        return ids
+
+    def test_walks_every_row_once(self):
+        ids = self.collect_ids(reverse('borrow-records') + '?page_size=25')
+        self.assertEqual(len(ids), 120)
+        self.assertEqual(ids, sorted(ids, reverse=True))
+
+    def test_inserts_while_paging_do_not_shift_pages(self):
+        first = self.client.get(reverse('borrow-records') + '?page_size=25').data
+        seen = [row['id'] for row in first['results']]
+        make_borrow_records(10)
+        seen += self.collect_ids(first['next'])
+        self.assertEqual(len(seen), len(set(seen)))
+        self.assertEqual(len(seen), 120)
+
+    def test_page_size_is_capped(self):
+        with mock.patch.object(LibraryCursorPagination, 'max_page_size', 30):
+            response = self.client.get(reverse('borrow-records') + '?page_size=100000')
+        self.assertEqual(len(response.data['results']), 30)
+
+    def test_deep_page_costs_one_query(self):
+        response = self.client.get(reverse('borrow-records') + '?page_size=10')
+        for _ in range(5):
+            response = self.client.get(response.data['next'])
+        with self.assertNumQueries(1):
+            self.client.get(response.data['next'])
+
+
+# ===============================
+# 🔄 Borrow & Return Tests
+# ===============================
+class BorrowReturnTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.book = make_books(1, copies=1)[0]
+        self.customer = make_customers(1)[0]
+
+    def post(self, name, **data):
+        return self.client.post(reverse(name), data, format='json')
+
+    def test_borrow_and_return(self):
+        response = self.post('borrow-book', customer_id=self.customer.id, book_id=self.book.id)
+        self.assertEqual(response.status_code, 201)
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.copies_available, 0)
+
+        response = self.post('return-book', customer_id=self.customer.id, book_id=self.book.id)
+        self.assertEqual(response.status_code, 200)
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.copies_available, 1)
+        record = BorrowRecord.objects.get()
+        self.assertTrue(record.is_returned)
+        self.assertIsNotNone(record.return_date)
+
+    def test_no_copies_left(self):
+        other = make_customers(1)[0]
+        self.post('borrow-book', customer_id=self.customer.id, book_id=self.book.id)
+        response = self.post('borrow-book', customer_id=other.id, book_id=self.book.id)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(BorrowRecord.objects.count(), 1)
+
+    def test_duplicate_open_loan_gives_copy_back(self):
+        Book.objects.filter(pk=self.book.pk).update(copies_available=2)
+        self.post('borrow-book', customer_id=self.customer.id, book_id=self.book.id)
+        response = self.post('borrow-book', customer_id=self.customer.id, book_id=self.book.id)
+        self.assertEqual(response.status_code, 400)
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.copies_available, 1)
+
+    def test_double_return_increments_once(self):
+        self.post('borrow-book', customer_id=self.customer.id, book_id=self.book.id)
+        self.post('return-book', customer_id=self.customer.id, book_id=self.book.id)
+        response = self.post('return-book', customer_id=self.customer.id, book_id=self.book.id)
+        self.assertEqual(response.status_code, 404)
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.copies_available, 1)
+
+    def test_unknown_customer(self):
+        response = self.post('borrow-book', customer_id=999999, book_id=self.book.id)
+        self.assertEqual(response.status_code, 404)
+
+
+class ConcurrentBorrowTests(TransactionTestCase):
+    """
+    Many threads borrowing the last few copies of one title at once must
+    never oversell it.
+    """
+    borrowers = 60
+    copies = 5
+
+    def borrow_with_retry(self, customer_id, book_id):
+        try:
+            for _ in range(200):
+                try:
+                    services.borrow_book(customer_id, book_id)
+                    return 'ok'
+                except services.CirculationError:
+                    return 'rejected'
+                except OperationalError:
+                    # SQLite's single writer; the caller retries, as a client would.
+                    time.sleep(0.005)
+            return 'gave-up'
+        finally:
+            connection.close()
+
+    def test_no_overselling(self):
+        book = make_books(1, copies=self.copies)[0]
+        customers = make_customers(self.borrowers)
+
+        with ThreadPoolExecutor(max_workers=self.borrowers) as pool:
+            outcomes = list(pool.map(
+                lambda customer: self.borrow_with_retry(customer.id, book.id), customers
+            ))
+
+        book.refresh_from_db()
+        self.assertNotIn('gave-up', outcomes)
+        self.assertEqual(outcomes.count('ok'), self.copies)
+        self.assertEqual(book.copies_available, 0)
+        self.assertEqual(BorrowRecord.objects.filter(book=book).count(), self.copies)
+
+
+# ===============================
+# 📦 Bulk Circulation Tests
+# ===============================
+class BulkCirculationTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+
+    def post(self, name, items):
+        return self.client.post(reverse(name), {"items": items}, format='json')
+
+    @override_settings(LIBRARY_MAX_OPEN_LOANS={'default': 250})
+    def test_bulk_borrow_and_return_500_items(self):
+        books = make_books(250, copies=2)
+        customers = make_customers(2)
+        items = [
+            {"customer_id": customer.id, "book_id": book.id}
+            for book in books for customer in customers
+        ]
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.post('bulk-borrow', items)
+        # A handful of lookups plus bulk INSERTs chunked by SQLite's variable limit.
+        self.assertLessEqual(len(queries), 15)
+        self.assertEqual(response.data["succeeded"], 500)
+        self.assertEqual(BorrowRecord.objects.filter(return_date__isnull=True).count(), 500)
+        self.assertFalse(Book.objects.exclude(copies_available=0).exists())
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.post('bulk-return', items)
+        # One more for the hold queue heads of the returned titles.
+        self.assertLessEqual(len(queries), 7)
+        self.assertEqual(response.data["succeeded"], 500)
+        self.assertFalse(Book.objects.exclude(copies_available=2).exists())
+
+    def test_bulk_borrow_reports_per_item_errors(self):
+        book = make_books(1, copies=1)[0]
+        customers = make_customers(2)
+        items = [
+            {"customer_id": customers[0].id, "book_id": book.id},
+            {"customer_id": customers[0].id, "book_id": book.id},
+            {"customer_id": customers[1].id, "book_id": book.id},
+            {"customer_id": 999999, "book_id": book.id},
+            {"book_id": book.id},
+        ]
+        response = self.post('bulk-borrow', items)
+        self.assertEqual(
+            [result["status"] for result in response.data["results"]],
+            ["borrowed", "error", "error", "error", "error"],
+        )
+        self.assertEqual(response.data["results"][1]["error"], services.AlreadyBorrowed.message)
+        self.assertEqual(response.data["results"][2]["error"], services.NoCopiesAvailable.message)
+        book.refresh_from_db()
+        self.assertEqual(book.copies_available, 0)
+
+    def test_bulk_return_without_open_loan(self):
+        book = make_books(1)[0]
+        customer = make_customers(1)[0]
+        response = self.post('bulk-return', [{"customer_id": customer.id, "book_id": book.id}])
+        self.assertEqual(response.data["failed"], 1)
+
+    def test_rejects_empty_batch(self):
+        self.assertEqual(self.post('bulk-borrow', []).status_code, 400)
+
+    def test_rejects_non_object_bodies_and_boolean_ids(self):
+        for body in ([{"customer_id": 1, "book_id": 1}], "items", 3):
+            self.assertEqual(self.client.post(reverse('bulk-borrow'), body, format='json').status_code, 400)
+        book = make_books(1)[0]
+        result = self.post('bulk-borrow', [{"customer_id": True, "book_id": book.id}]).data["results"][0]
+        self.assertEqual(result["status"], "error")
+
+    def test_out_of_range_ids_fail_only_their_item(self):
+        customer, book = make_customers(1)[0], make_books(1)[0]
+        items = [{"customer_id": customer.id, "book_id": 10 ** 30}, {"customer_id": customer.id, "book_id": book.id}]
+        for name, ok in (('bulk-borrow', "borrowed"), ('bulk-return', "returned")):
+            response = self.post(name, items)
+            self.assertEqual(response.status_code, 200, name)
+            self.assertEqual([row["status"] for row in response.data["results"]], ["error", ok], name)
+
+
+# ===============================
+# 🗂️ Query Plan Tests
+# ===============================
+class QueryPlanTests(TestCase):
+    def test_hot_paths_use_indexes(self):
+        out = io.StringIO()
+        call_command('check_query_plans', stdout=out)
+        self.assertNotIn('✗', out.getvalue())
+
+
+# ===============================
+# 🔎 Full-Text Search Tests
+# ===============================
+class BookFullTextSearchTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        published = datetime.date(1954, 7, 29)
+        Book.objects.bulk_create([
+            Book(title="The Fellowship of the Ring", author="J. R. R. Tolkien", isbn="9780261102354", published_date=published),
+            Book(title="The Two Towers", author="J. R. R. Tolkien", isbn="9780261102361", published_date=published),
+            Book(title="Ring of Fire", author="Eric Flint", isbn="9780671319724", published_date=published),
+            Book(title="Dune", author="Frank Herbert", isbn="9780441013593", published_date=published),
+        ])
+
+    def search(self, q):
+        response = self.client.get(reverse('book-search'), {'q': q})
+        self.assertEqual(response.status_code, 200)
+        return response.data['results']
+
+    def test_prefix_query(self):
+        titles = {row['title'] for row in self.search('tolk*')}
+        self.assertEqual(titles, {"The Fellowship of the Ring", "The Two Towers"})
+
+    def test_phrase_query(self):
+        results = self.search('"two towers"')
+        self.assertEqual([row['title'] for row in results], ["The Two Towers"])
+
+    def test_title_matches_rank_first_and_are_highlighted(self):
+        results = self.search('ring')
+        self.assertEqual(results[0]['title'], "Ring of Fire")
+        self.assertIn("<mark>Ring</mark>", results[0]['title_highlight'])
+
+    def test_index_follows_updates_and_deletes(self):
+        Book.objects.filter(title="Dune").update(title="Dune Messiah")
+        self.assertEqual([row['title'] for row in self.search('messiah')], ["Dune Messiah"])
+        Book.objects.filter(title="Dune Messiah").delete()
+        self.assertEqual(self.search('messiah'), [])
+
+    def test_isbn_and_operator_input(self):
+        self.assertEqual(self.search('9780441013593')[0]['title'], "Dune")
+        self.assertEqual(self.search('AND OR NOT ('), [])
+
+    def test_exact_filters_still_work(self):
+        response = self.client.get(reverse('book-search'), {'author': 'Frank Herbert'})
+        self.assertEqual(len(response.data['results']), 1)
+
+    def test_highlights_escape_stored_markup(self):
+        Book.objects.create(title="<script>alert(1)</script> Ring", author="Mallory <b>", isbn="9780000000001",
+                            published_date=datetime.date(2000, 1, 1))
+        row = next(row for row in self.search('alert') if row['isbn'] == "9780000000001")
+        self.assertEqual(row['title_highlight'], "&lt;script&gt;<mark>alert</mark>(1)&lt;/script&gt; Ring")
+        self.assertEqual(row['author_highlight'], "Mallory &lt;b&gt;")
+
+    def test_ranked_results_page_by_offset(self):
+        ids = []
+        url = reverse('book-search') + '?q=j*&page_size=1'
+        while url:
+            response = self.client.get(url)
+            ids += [row['id'] for row in response.data['results']]
+            url = response.data['next']
+        self.assertEqual(sorted(ids), sorted(Book.objects.filter(author__startswith="J.").values_list('pk', flat=True)))
+        self.assertIsNotNone(response.data['previous'])
+        self.assertEqual(self.client.get(reverse('book-search'), {'q': 'ring', 'offset': -1}).status_code, 400)
+
+
+# ===============================
+# ⏰ Due Date & Overdue Tests
+# ===============================
+class OverdueLoanTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_due_date_follows_membership_and_book_overrides(self):
+        standard, student = make_customers(2)
+        Customer.objects.filter(pk=student.pk).update(membership_class='student')
+        student.refresh_from_db()
+        book, short_loan = make_books(2, copies=2)
+        Book.objects.filter(pk=short_loan.pk).update(loan_period_days=3)
+
+        today = datetime.date.today()
+        self.assertEqual(services.borrow_book(standard.id, book.id).due_date, today + datetime.timedelta(days=14))
+        self.assertEqual(services.borrow_book(student.id, book.id).due_date, today + datetime.timedelta(days=21))
+        self.assertEqual(services.borrow_book(student.id, short_loan.id).due_date, today + datetime.timedelta(days=3))
+
+    def test_bulk_borrow_sets_due_dates(self):
+        customer = make_customers(1)[0]
+        book = make_books(1)[0]
+        services.bulk_borrow([{"customer_id": customer.id, "book_id": book.id}])
+        self.assertEqual(BorrowRecord.objects.get().due_date, datetime.date.today() + datetime.timedelta(days=14))
+
+    def test_overdue_endpoints(self):
+        records = make_borrow_records(30)
+        past = datetime.date.today() - datetime.timedelta(days=1)
+        overdue_ids = [record.id for record in records[:12]]
+        BorrowRecord.objects.filter(pk__in=overdue_ids).update(due_date=past)
+        BorrowRecord.objects.filter(pk=overdue_ids[0]).update(return_date=past)
+
+        ids, url = [], reverse('overdue-books') + '?page_size=5'
+        while url:
+            response = self.client.get(url)
+            ids += [row['id'] for row in response.data['results']]
+            url = response.data['next']
+        self.assertEqual(sorted(ids), overdue_ids[1:])
+
+        rows = self.client.get(reverse('overdue-by-customer')).data['results']
+        self.assertEqual(sum(row['overdue_count'] for row in rows), 11)
+        self.assertEqual({row['oldest_due_date'] for row in rows}, {past})
+
+    def test_overdue_cursor_keys_on_due_date_and_id(self):
+        records = make_borrow_records(12)
+        past = datetime.date.today() - datetime.timedelta(days=1)
+        BorrowRecord.objects.update(due_date=past)
+
+        pages, url = [], reverse('overdue-books') + '?page_size=5'
+        while url:
+            response = self.client.get(url)
+            pages.append([row['id'] for row in response.data['results']])
+            url = response.data['next']
+            if url:
+                cursor = base64.b64decode(parse_qs(urlparse(url).query)['cursor'][0]).decode()
+                self.assertNotIn('o=', cursor)
+        self.assertEqual(sum(pages, []), sorted(record.id for record in records))
+
+        previous = self.client.get(response.data['previous']).data
+        self.assertEqual([row['id'] for row in previous['results']], pages[1])
+
+    @override_settings(TIME_ZONE='Pacific/Kiritimati')
+    def test_due_dates_follow_the_local_date(self):
+        customer = make_customers(1)[0]
+        book = make_books(1)[0]
+        late_evening_utc = datetime.datetime(2026, 1, 1, 23, 30, tzinfo=datetime.timezone.utc)
+        with mock.patch('django.utils.timezone.now', return_value=late_evening_utc):
+            record = services.borrow_book(customer.id, book.id)
+        self.assertEqual(record.checkout_date, datetime.date(2026, 1, 2))
+        self.assertEqual(record.due_date, datetime.date(2026, 1, 16))
+
+
+# ===============================
+# 🗄️ Catalog Cache Tests
+# ===============================
+class CatalogCacheTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        get_cache().clear()
+        self.book = make_books(1, copies=2)[0]
+        self.customer = make_customers(1)[0]
+
+    def get_detail(self, **headers):
+        return self.client.get(reverse('book-detail', args=[self.book.id]), headers=headers)
+
+    def test_second_read_is_served_from_cache(self):
+        self.assertEqual(self.get_detail()['X-Cache'], 'MISS')
+        with self.assertNumQueries(0):
+            response = self.get_detail()
+        self.assertEqual(response['X-Cache'], 'HIT')
+        self.assertEqual(cache_stats()['hit_ratio'], 0.5)
+
+    def test_if_none_match_returns_304(self):
+        etag = self.get_detail()['ETag']
+        response = self.get_detail(**{'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+
+    def test_save_and_delete_invalidate(self):
+        self.client.get(reverse('book-list-create'))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(reverse('book-detail', args=[self.book.id]), {'title': 'Renamed'}, format='json')
+        self.assertEqual(self.get_detail().data['title'], 'Renamed')
+        response = self.client.get(reverse('book-list-create'))
+        self.assertEqual(response['X-Cache'], 'MISS')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(reverse('book-detail', args=[self.book.id]))
+        self.assertEqual(self.get_detail().status_code, 404)
+
+    def test_borrow_and_return_invalidate(self):
+        self.get_detail()
+        with self.captureOnCommitCallbacks(execute=True):
+            services.borrow_book(self.customer.id, self.book.id)
+        self.assertEqual(self.get_detail().data['copies_available'], 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            services.return_book(self.customer.id, self.book.id)
+        self.assertEqual(self.get_detail().data['copies_available'], 2)
+
+
+# ===============================
+# 📤 Export Tests
+# ===============================
+class BorrowRecordExportTests(TestCase):
+    def setUp(self):
+        self.records = make_borrow_records(30)
+
+    def export(self, **params):
+        return self.client.get(reverse('borrow-records-export'), params)
+
+    def test_csv(self):
+        response = self.export()
+        self.assertTrue(response.streaming)
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0].split(',')[:3], ['id', 'customer_id', 'customer'])
+        self.assertEqual(len(lines), 31)
+
+    def test_ndjson_with_filters(self):
+        customer = self.records[0].customer
+        BorrowRecord.objects.filter(pk=self.records[0].pk).update(checkout_date=datetime.date(2020, 1, 1))
+        response = self.export(format='ndjson', customer_id=customer.id, to='2020-12-31')
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+        self.assertEqual([row['id'] for row in rows], [self.records[0].id])
+        self.assertEqual(rows[0]['checkout_date'], '2020-01-01')
+        self.assertEqual(rows[0]['customer'], customer.name)
+
+    def test_rejects_bad_params(self):
+        self.assertEqual(self.export(format='xml').status_code, 400)
+        self.assertEqual(self.export(**{'from': 'yesterday'}).status_code, 400)
+        self.assertEqual(self.export(customer_id='abc').status_code, 400)
+
+
+# ===============================
+# 📥 Catalog Import Tests
+# ===============================
+class CatalogImportTests(TestCase):
+    def test_command_upserts_and_reports_bad_rows(self):
+        make_books(1)
+        existing = Book.objects.get()
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as f:
+            f.write("title,author,isbn,published_date,copies_available\n")
+            f.write(f"Updated,Someone,{existing.isbn},2001-01-01,4\n")
+            f.write("New Book,Someone Else,9781111111111,2002-02-02,2\n")
+            f.write("No Date,Author,9782222222222,sometime,1\n")
+            f.write(",Author,9783333333333,2003-03-03,1\n")
+        self.addCleanup(os.remove, f.name)
+
+        out, err = io.StringIO(), io.StringIO()
+        call_command('import_catalog', f.name, batch_size=2, stdout=out, stderr=err)
+
+        self.assertIn("1 created, 1 updated, 2 errors", out.getvalue())
+        self.assertIn("row 3:", err.getvalue())
+        self.assertIn("row 4:", err.getvalue())
+        existing.refresh_from_db()
+        # Copies are circulation state; re-imports only seed new titles.
+        self.assertEqual((existing.title, existing.copies_available), ("Updated", 1))
+        self.assertEqual(Book.objects.get(isbn="9781111111111").copies_available, 2)
+
+    def test_reimport_keeps_columns_the_row_omits(self):
+        book = make_books(1, copies=3)[0]
+        Book.objects.filter(pk=book.pk).update(loan_period_days=7)
+        customer = Customer.objects.create(name="Grace", email="Grace@Example.com", phone="555", membership_class='staff')
+
+        IMPORTERS['books'].import_rows([
+            {"title": "Renamed", "author": book.author, "isbn": book.isbn, "published_date": "2000-01-01"},
+        ])
+        result = IMPORTERS['customers'].import_rows([{"name": "Grace Hopper", "email": "grace@example.com"}])
+
+        book.refresh_from_db()
+        self.assertEqual((book.title, book.copies_available, book.loan_period_days), ("Renamed", 3, 7))
+        self.assertEqual((result.created, result.updated), (0, 1))
+        customer.refresh_from_db()
+        self.assertEqual((customer.name, customer.phone, customer.membership_class), ("Grace Hopper", "555", 'staff'))
+
+    def test_customer_import_api(self):
+        rows = [
+            {"name": "Ada", "email": "ADA@example.com", "membership_class": "staff"},
+            {"name": "Ada Lovelace", "email": "ada@example.com"},
+            {"name": "Bad", "email": "not-an-email"},
+        ]
+        response = APIClient().post(reverse('customer-import'), {"rows": rows}, format='json')
+        self.assertEqual(response.data["created"], 1)
+        self.assertEqual([error["row"] for error in response.data["errors"]], [3])
+        self.assertEqual(Customer.objects.get(email="ada@example.com").name, "Ada Lovelace")
+
+    def test_import_rejects_a_body_that_is_not_an_object(self):
+        for name, body in (('book-import', [1, 2]), ('customer-import', "x")):
+            response = APIClient().post(reverse(name), body, format='json')
+            self.assertEqual(response.status_code, 400, name)
+
+    def test_book_import_is_searchable(self):
+        rows = [{"title": "Neuromancer", "author": "William Gibson", "isbn": "9780441569595", "published_date": "1984-07-01"}]
+        APIClient().post(reverse('book-import'), {"rows": rows}, format='json')
+        response = APIClient().get(reverse('book-search'), {'q': 'neuro*'})
+        self.assertEqual(response.data['results'][0]['title'], "Neuromancer")
+
+
+# ===============================
+# ⚡ Async View Tests
+# ===============================
+class AsyncReadViewTests(TestCase):
+    def setUp(self):
+        self.records = make_borrow_records(25)
+
+    async def test_borrow_records_match_sync_output(self):
+        client = AsyncClient()
+        response = await client.get(reverse('async-borrow-records'), {'page_size': 10})
+        self.assertEqual(response.status_code, 200)
+        page = response.json()
+        sync_page = await sync_to_async(self.client.get)(reverse('borrow-records'), {'page_size': 10})
+        self.assertEqual(page['results'], sync_page.json()['results'])
+
+        ids = [row['id'] for row in page['results']]
+        while page['next']:
+            page = (await client.get(page['next'])).json()
+            ids += [row['id'] for row in page['results']]
+        self.assertEqual(sorted(ids, reverse=True), ids)
+        self.assertEqual(len(ids), 25)
+
+    async def test_pages_are_fetched_with_aiterator(self):
+        limits, aiterator = [], QuerySet.aiterator
+
+        def fetch(queryset, *args, **kwargs):
+            limits.append(queryset.query.high_mark - queryset.query.low_mark)
+            return aiterator(queryset, *args, **kwargs)
+
+        with mock.patch.object(QuerySet, 'aiterator', fetch):
+            page = (await AsyncClient().get(reverse('async-borrow-records'), {'page_size': 10})).json()
+            previous = (await AsyncClient().get((await AsyncClient().get(page['next'])).json()['previous'])).json()
+        self.assertEqual(limits, [11, 11, 11])
+        self.assertEqual(previous['results'], page['results'])
+
+    async def test_customer_loans_and_book_detail(self):
+        client = AsyncClient()
+        record = self.records[3]
+        response = await client.get(reverse('async-customer-borrowed-books', args=[record.customer_id]))
+        self.assertIn(record.id, [row['id'] for row in response.json()['results']])
+
+        response = await client.get(reverse('async-book-detail', args=[record.book_id]))
+        self.assertEqual(response.json()['isbn'], record.book.isbn)
+        response = await client.get(reverse('async-book-detail', args=[999999]))
+        self.assertEqual(response.status_code, 404)
+
+    async def test_drf_permissions_and_methods_apply(self):
+        client = AsyncClient()
+        with mock.patch.object(AsyncBookListView, 'permission_classes', [IsAuthenticated]):
+            self.assertEqual((await client.get(reverse('async-book-list'))).status_code, 403)
+        self.assertEqual((await client.post(reverse('async-book-list'))).status_code, 405)
+
+
+# ===============================
+# 📈 Instrumentation Tests
+# ===============================
+class PerformanceMetricsTests(TestCase):
+    def setUp(self):
+        registry.reset()
+        get_cache().clear()
+
+    def test_server_timing_and_metrics_endpoint(self):
+        make_borrow_records(5)
+        response = self.client.get(reverse('borrow-records'))
+        self.assertIn('db;dur=', response['Server-Timing'])
+        self.assertIn('desc="1 queries"', response['Server-Timing'])
+
+        body = self.client.get(reverse('metrics')).content.decode()
+        self.assertIn('library_requests_total{method="GET",route="api/borrow-records/",status="200"} 1', body)
+        self.assertIn('library_db_queries_total{route="api/borrow-records/"} 1', body)
+        self.assertIn('library_request_duration_seconds_bucket{route="api/borrow-records/",le="+Inf"} 1', body)
+
+    def test_duplicate_queries_are_flagged(self):
+        make_borrow_records(10)
+        # Force the ModelSerializer path without eager loading: one query per row.
+        with mock.patch.object(BorrowRecordListView, 'list', generics.ListAPIView.list), \
+                mock.patch.object(BorrowRecordSerializer, 'select_related_fields', ()), \
+                mock.patch.object(BorrowRecordSerializer, 'only_fields', ()), \
+                self.assertLogs('library.middleware', 'WARNING'):
+            self.client.get(reverse('borrow-records'))
+        self.assertEqual(
+            registry.counter_value('library_duplicate_query_requests_total', {"route": "api/borrow-records/"}), 1
+        )
+
+
+# ===============================
+# 🏁 Benchmark Suite Tests
+# ===============================
+class BenchmarkSuiteTests(TestCase):
+    def test_seed_is_deterministic(self):
+        call_command('seed_library', books=50, customers=10, loans=200, requests=5, seed=7, stdout=io.StringIO())
+        first = list(BorrowRecord.objects.order_by('pk').values_list('customer__email', 'book__isbn', 'return_date'))
+        call_command('seed_library', books=50, customers=10, loans=200, requests=5, seed=7, flush=True, stdout=io.StringIO())
+        second = list(BorrowRecord.objects.order_by('pk').values_list('customer__email', 'book__isbn', 'return_date'))
+        self.assertEqual(first, second)
+        self.assertFalse(Book.objects.filter(copies_available__lt=0).exists())
+
+    def test_seed_distributions(self):
+        call_command('seed_library', books=200, customers=50, loans=4000, open_fraction=0.1,
+                     overdue_fraction=0.5, stdout=io.StringIO())
+        self.assertEqual(BorrowRecord.objects.count(), 4000)
+        open_loans = BorrowRecord.objects.filter(return_date__isnull=True)
+        self.assertTrue(0 < open_loans.count() <= 400)
+        self.assertTrue(open_loans.filter(due_date__lt=datetime.date.today()).exists())
+        # Zipf skew: the ten busiest titles carry far more than 10/200 of the loans.
+        busiest = BorrowRecord.objects.values('book').annotate(n=Count('id')).order_by('-n')[:10]
+        self.assertGreater(sum(row['n'] for row in busiest), 4000 * 0.2)
+
+    def test_seed_counts_accept_suffixes(self):
+        self.assertEqual([seed_count('1M'), seed_count('200k'), seed_count('1_500'), seed_count('2.5k')],
+                         [1_000_000, 200_000, 1500, 2500])
+
+    def test_every_route_runs_and_baseline_round_trips(self):
+        call_command('seed_library', books=50, customers=10, loans=200, stdout=io.StringIO())
+        with tempfile.TemporaryDirectory() as directory:
+            baseline = os.path.join(directory, 'baseline.json')
+            out = io.StringIO()
+            call_command('benchmark_api', iterations=2, warmup=0, contention_threads=0,
+                         save_baseline=baseline, stdout=out)
+            self.assertIn('borrow-records', out.getvalue())
+            with open(baseline) as f:
+                self.assertEqual(set(json.load(f)), set(build_scenarios()))
+
+    def test_compare_flags_regressions(self):
+        baseline = {"books": {"requests": 10, "throughput": 100.0, "p50_ms": 1.0}}
+        current = {"books": {"requests": 10, "throughput": 50.0, "p50_ms": 1.5}}
+        self.assertEqual(len(compare(current, baseline, max_regression=20)), 2)
+        self.assertEqual(compare(current, baseline, max_regression=100), [])
+
+
+# ===============================
+# 🪶 Sparse Fieldset Tests
+# ===============================
+class SparseFieldsTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        get_cache().clear()
+        records = make_borrow_records(20)
+        BorrowRecord.objects.filter(pk__in=[r.pk for r in records[:5]]).update(
+            return_date=datetime.date.today(), is_returned=True
+        )
+        BookRequest.objects.create(customer=records[0].customer, requested_title="Dune", extra_fee='2.50')
+        BookRequest.objects.create(customer=records[1].customer, requested_title="Emma", requested_author="Austen")
+
+    def test_fast_path_matches_model_serializer(self):
+        for serializer_class in (
+            BookSerializer, CustomerSerializer, BorrowRecordSerializer, BorrowHistorySerializer, BookRequestSerializer,
+        ):
+            queryset = serializer_class.Meta.model.objects.order_by('pk')
+            if hasattr(serializer_class, 'setup_eager_loading'):
+                queryset = serializer_class.setup_eager_loading(queryset)
+            # Rendered bytes, not parsed JSON: after json.loads, 1 == True and 1 == 1.0.
+            expected = JSONRenderer().render(serializer_class(queryset, many=True).data)
+            fast = serializer_class.fast_representation(serializer_class.fast_values(queryset))
+            self.assertEqual(JSONRenderer().render(fast), expected, serializer_class.__name__)
+
+    def test_fast_values_skip_converters(self):
+        row = BorrowHistorySerializer.fast_values(BorrowHistory.objects.order_by('pk'))[0]
+        self.assertIsInstance(row['due_date'], str)
+        self.assertIs(type(row['is_archived']), int)
+
+    def test_fields_trim_sql_and_output(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('book-list-create') + '?fields=id,title')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(response.data['results'][0]), {'id', 'title'})
+        sql = queries.captured_queries[-1]['sql']
+        self.assertNotIn('"author"', sql)
+        self.assertNotIn('"isbn"', sql)
+
+    def test_fields_on_relation_columns_and_pagination(self):
+        url = reverse('borrow-records') + '?fields=book,due_date&page_size=8'
+        seen = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            seen.extend(response.data['results'])
+            url = response.data['next']
+        self.assertEqual(len(seen), 20)
+        self.assertEqual(set(seen[0]), {'book', 'due_date'})
+        self.assertIn(' by ', seen[0]['book'])
+
+    def test_fields_on_detail(self):
+        book = Book.objects.first()
+        response = self.client.get(reverse('book-detail', args=[book.pk]) + '?fields=title,copies_available')
+        self.assertEqual(response.data, {'title': book.title, 'copies_available': book.copies_available})
+
+    def test_unknown_field_is_rejected(self):
+        response = self.client.get(reverse('customer-list-create') + '?fields=id,password')
+        self.assertEqual(response.status_code, 400)
+
+
+# ===============================
+# 📊 Loan Counter Tests
+# ===============================
+class LoanCounterTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.customer = make_customers(1)[0]
+        self.books = make_books(3, copies=2)
+
+    def post(self, name, book, customer=None):
+        customer = customer or self.customer
+        return self.client.post(reverse(name), {"customer_id": customer.id, "book_id": book.id}, format='json')
+
+    def counters(self):
+        self.customer.refresh_from_db()
+        return self.customer.open_loan_count, self.customer.overdue_loan_count, self.customer.lifetime_loan_count
+
+    def test_borrow_and_return_keep_counters(self):
+        self.post('borrow-book', self.books[0])
+        self.post('borrow-book', self.books[1])
+        self.assertEqual(self.counters(), (2, 0, 2))
+        self.post('return-book', self.books[0])
+        self.assertEqual(self.counters(), (1, 0, 2))
+        self.assertFalse(services.loan_counter_drift().exists())
+
+    @override_settings(LIBRARY_MAX_OPEN_LOANS={'default': 2})
+    def test_open_loan_limit(self):
+        self.post('borrow-book', self.books[0])
+        self.post('borrow-book', self.books[1])
+        response = self.post('borrow-book', self.books[2])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Book.objects.get(pk=self.books[2].pk).copies_available, 2)
+        self.assertEqual(self.counters(), (2, 0, 2))
+
+        items = [{"customer_id": self.customer.id, "book_id": self.books[2].id}]
+        response = self.client.post(reverse('bulk-borrow'), {"items": items}, format='json')
+        self.assertEqual(response.data["results"][0]["error"], services.LoanLimitReached.message)
+
+    def test_returning_a_counted_overdue_loan(self):
+        self.post('borrow-book', self.books[0])
+        BorrowRecord.objects.update(due_date=datetime.date.today() - datetime.timedelta(days=3))
+        services.recompute_loan_counters()
+        self.assertEqual(self.counters(), (1, 1, 1))
+        self.post('return-book', self.books[0])
+        self.assertEqual(self.counters(), (0, 0, 1))
+
+    def test_bulk_paths_keep_counters(self):
+        items = [{"customer_id": self.customer.id, "book_id": book.id} for book in self.books]
+        self.client.post(reverse('bulk-borrow'), {"items": items}, format='json')
+        self.assertEqual(self.counters(), (3, 0, 3))
+        self.client.post(reverse('bulk-return'), {"items": items[:2]}, format='json')
+        self.assertEqual(self.counters(), (1, 0, 3))
+
+    def test_recompute_counts_loan_tables_not_the_history_view(self):
+        with CaptureQueriesContext(connection) as queries:
+            services.recompute_loan_counters()
+        update = next(q['sql'] for q in queries.captured_queries if q['sql'].startswith('UPDATE'))
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + update)
+            plan = '\n'.join(row[-1] for row in cursor.fetchall())
+        self.assertNotRegex(plan, r'\bSCAN library_(borrowrecord|archivedborrowrecord)\b(?! USING)')
+        self.assertNotIn('library_borrowhistory', update)
+
+    def test_reconcile_reports_and_fixes_drift(self):
+        make_borrow_records(12)
+        out = io.StringIO()
+        call_command('reconcile_loan_counters', dry_run=True, batch_size=5, stdout=out)
+        self.assertIn('1 customers drifted', out.getvalue())
+        self.assertTrue(services.loan_counter_drift().exists())
+
+        call_command('reconcile_loan_counters', batch_size=5, stdout=io.StringIO())
+        self.assertFalse(services.loan_counter_drift().exists())
+        customer = BorrowRecord.objects.first().customer
+        customer.refresh_from_db()
+        self.assertEqual(customer.open_loan_count, BorrowRecord.objects.filter(customer=customer).count())
+
+
+# ===============================
+# 🕒 Hold Queue Tests
+# ===============================
+class HoldQueueTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.book = make_books(1, copies=1)[0]
+        self.borrower, *self.waiting = make_customers(4)
+        self.pair(self.borrower, 'borrow-book')
+
+    def pair(self, customer, name, book=None):
+        book = book or self.book
+        return self.client.post(reverse(name), {"customer_id": customer.id, "book_id": book.id}, format='json')
+
+    def hold(self, customer):
+        return Hold.objects.get(customer=customer, book=self.book)
+
+    def test_queue_positions(self):
+        positions = [self.pair(customer, 'hold-list-create').data["position"] for customer in self.waiting]
+        self.assertEqual(positions, [1, 2, 3])
+        self.assertEqual(self.pair(self.waiting[0], 'hold-list-create').status_code, 400)
+        self.assertEqual(self.pair(self.borrower, 'hold-list-create').data["error"], services.AlreadyBorrowed.message)
+
+        self.pair(self.waiting[0], 'hold-cancel')
+        response = self.client.get(reverse('hold-list-create'), {'book': self.book.id, 'status': 'waiting'})
+        self.assertEqual(sorted(row["position"] for row in response.data["results"]), [1, 2])
+
+    def test_hold_list_reads_positions_in_one_query(self):
+        for customer in self.waiting:
+            self.pair(customer, 'hold-list-create')
+        customers = make_customers(20)
+        Hold.objects.bulk_create(Hold(customer=customer, book=self.book) for customer in customers)
+        with CaptureQueriesContext(connection) as queries:
+            rows = self.client.get(reverse('hold-list-create'), {'page_size': 5}).data["results"]
+        self.assertEqual(len(queries), 2)
+        self.assertEqual([row["position"] for row in rows], [23, 22, 21, 20, 19])
+
+    def test_hold_input_is_validated_by_the_serializer(self):
+        response = self.client.post(reverse('hold-list-create'), {"customer_id": True, "book_id": self.book.id},
+                                    format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("customer_id", response.data)
+        self.assertIn("book_id", self.client.post(reverse('hold-list-create'), {}, format='json').data)
+
+    def test_cancel_input_is_validated_by_a_serializer(self):
+        url = reverse('hold-cancel')
+        self.assertEqual(self.client.post(url, [1, 2], format='json').status_code, 400)
+        response = self.client.post(url, {"customer_id": "x"}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(set(response.data), {"customer_id", "book_id"})
+        response = self.client.post(url, {"customer_id": 10 ** 30, "book_id": self.book.id}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_no_hold_while_copies_are_on_the_shelf(self):
+        other = make_books(1, copies=1)[0]
+        response = self.pair(self.waiting[0], 'hold-list-create', book=other)
+        self.assertEqual(response.data["error"], services.HoldNotNeeded.message)
+
+    def test_return_sets_the_copy_aside_for_the_queue_head(self):
+        first, second, _ = self.waiting
+        self.pair(first, 'hold-list-create')
+        self.pair(second, 'hold-list-create')
+        self.pair(self.borrower, 'return-book')
+
+        self.assertEqual(self.hold(first).status, Hold.READY)
+        self.assertEqual(self.hold(second).status, Hold.WAITING)
+        self.assertEqual(Book.objects.get(pk=self.book.pk).copies_available, 0)
+        self.assertEqual(self.pair(second, 'borrow-book').status_code, 400)
+
+        self.assertEqual(self.pair(first, 'borrow-book').status_code, 201)
+        self.assertEqual(self.hold(first).status, Hold.FULFILLED)
+        self.assertEqual(Book.objects.get(pk=self.book.pk).copies_available, 0)
+
+    def test_cancelling_a_ready_hold_passes_the_copy_on(self):
+        first, second, _ = self.waiting
+        self.pair(first, 'hold-list-create')
+        self.pair(second, 'hold-list-create')
+        self.pair(self.borrower, 'return-book')
+
+        self.pair(first, 'hold-cancel')
+        self.assertEqual(self.hold(second).status, Hold.READY)
+        self.pair(second, 'hold-cancel')
+        self.assertEqual(Book.objects.get(pk=self.book.pk).copies_available, 1)
+        self.assertEqual(self.pair(second, 'hold-cancel').status_code, 404)
+
+    def test_expired_pickups_move_down_the_queue(self):
+        first, second, _ = self.waiting
+        self.pair(first, 'hold-list-create')
+        self.pair(second, 'hold-list-create')
+        self.pair(self.borrower, 'return-book')
+        Hold.objects.filter(status=Hold.READY).update(expires_on=datetime.date.today() - datetime.timedelta(days=1))
+
+        call_command('expire_holds', stdout=io.StringIO())
+        self.assertEqual(self.hold(first).status, Hold.EXPIRED)
+        self.assertEqual(self.hold(second).status, Hold.READY)
+
+    def test_bulk_paths_use_the_queue(self):
+        other = make_books(1, copies=1)[0]
+        self.pair(self.borrower, 'borrow-book', book=other)
+        first, second, third = self.waiting
+        self.pair(first, 'hold-list-create')
+        self.pair(second, 'hold-list-create')
+        self.pair(third, 'hold-list-create', book=other)
+
+        returns = [{"customer_id": self.borrower.id, "book_id": book.id} for book in (self.book, other)]
+        with CaptureQueriesContext(connection) as queries:
+            self.client.post(reverse('bulk-return'), {"items": returns}, format='json')
+        self.assertLessEqual(len(queries), 7)
+        self.assertEqual(Hold.objects.filter(status=Hold.READY).count(), 2)
+        self.assertEqual(self.hold(second).status, Hold.WAITING)
+
+        items = [{"customer_id": first.id, "book_id": self.book.id}, {"customer_id": second.id, "book_id": self.book.id}]
+        response = self.client.post(reverse('bulk-borrow'), {"items": items}, format='json')
+        self.assertEqual([result["status"] for result in response.data["results"]], ["borrowed", "error"])
+        self.assertEqual(self.hold(first).status, Hold.FULFILLED)
+        self.assertEqual(Book.objects.get(pk=self.book.pk).copies_available, 0)
+
+
+# ===============================
+# 📬 Book Request Fulfillment Tests
+# ===============================
+class BookRequestFulfillmentTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.customer = make_customers(1)[0]
+
+    def request_book(self, title, author=None):
+        data = {"customer_id": self.customer.id, "title": title, "fee": "1.50"}
+        if author:
+            data["author"] = author
+        return self.client.post(reverse('book-request-create'), data, format='json')
+
+    def add_book(self, title, author, isbn="9780441172719"):
+        return self.client.post(reverse('book-list-create'), {
+            "title": title, "author": author, "isbn": isbn, "published_date": "1965-08-01",
+        }, format='json')
+
+    def test_create_request(self):
+        response = self.request_book("Dune", "Frank Herbert")
+        self.assertEqual(response.status_code, 201)
+        book_request = BookRequest.objects.get()
+        self.assertEqual((book_request.requested_title, str(book_request.extra_fee)), ("Dune", "1.50"))
+        self.assertEqual(self.request_book("").status_code, 400)
+
+    def test_new_book_fulfils_matching_requests(self):
+        self.request_book("  dune ", "FRANK HERBERT")
+        self.request_book("Dune")
+        self.request_book("Dune", "Someone Else")
+        self.request_book("Dune Messiah")
+        self.add_book("Dune!", "Frank  Herbert")
+        self.assertEqual(
+            list(BookRequest.objects.order_by('pk').values_list('is_fulfilled', flat=True)),
+            [True, True, False, False],
+        )
+
+    def test_renaming_a_book_fulfils_matching_requests(self):
+        self.request_book("Dune", "Frank Herbert")
+        book_id = self.add_book("Dnue", "Frank Herbert").data["id"]
+        self.assertFalse(BookRequest.objects.get().is_fulfilled)
+        self.client.patch(reverse('book-detail', args=[book_id]), {"title": "Dune"}, format='json')
+        self.assertTrue(BookRequest.objects.get().is_fulfilled)
+
+    def test_match_key_normalizes(self):
+        self.assertEqual(match_key("  Cien años de  Soledad: A Novel "), "cien anos de soledad a novel")
+
+    def test_import_fulfils_requests_in_batch(self):
+        BookRequest.objects.bulk_create(
+            BookRequest(customer=self.customer, requested_title=f"Wanted {i}", title_key=f"wanted {i}")
+            for i in range(1000)
+        )
+        rows = [
+            {"title": f"WANTED {i}", "author": "Anon", "isbn": f"{i:013d}", "published_date": "2001-01-01"}
+            for i in range(0, 1000, 2)
+        ]
+        response = self.client.post(reverse('book-import'), {"rows": rows}, format='json')
+        self.assertEqual(response.data["requests_fulfilled"], 500)
+        self.assertEqual(BookRequest.objects.filter(is_fulfilled=True).count(), 500)
+
+        # One candidate lookup and one UPDATE, however many books and requests.
+        with self.assertNumQueries(2):
+            self.assertEqual(fulfil_requests((f"Wanted {i}", None) for i in range(1000)), 500)
+
+    def test_backfill_command(self):
+        make_books(3)
+        self.request_book("Title 999999")
+        self.request_book(Book.objects.first().title.upper())
+        out = io.StringIO()
+        call_command('match_book_requests', batch_size=2, stdout=out)
+        self.assertIn("1 of 2 pending book requests fulfilled", out.getvalue())
+
+
+# ===============================
+# 📊 Analytics Tests
+# ===============================
+class AnalyticsTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.today = datetime.date.today()
+        self.books = make_books(3)
+        customers = make_customers(4)
+        # Book 0 is borrowed three times, book 1 twice, book 2 once.
+        loans = [(0, 0, 10, 3), (1, 0, 9, None), (2, 0, 2, 1), (0, 1, 8, 2), (1, 1, 8, None), (2, 2, 1, None)]
+        for customer, book, out_days_ago, back_days_ago in loans:
+            record = BorrowRecord.objects.create(customer=customers[customer], book=self.books[book])
+            BorrowRecord.objects.filter(pk=record.pk).update(
+                checkout_date=self.day(out_days_ago),
+                return_date=self.day(back_days_ago) if back_days_ago is not None else None,
+                is_returned=back_days_ago is not None,
+            )
+        get_cache().clear()
+
+    def day(self, days_ago):
+        return self.today - datetime.timedelta(days=days_ago)
+
+    def get(self, name, **params):
+        return self.client.get(reverse(name), params)
+
+    def test_reports_from_rollups(self):
+        call_command('refresh_rollups', stdout=io.StringIO())
+
+        summary = self.get('analytics-summary').data
+        self.assertEqual(summary["rolled_up_to"], self.today)
+        # Loans of 7, 1 and 6 days.
+        self.assertEqual(summary["results"], {"checkouts": 6, "returns": 3, "average_loan_days": 4.67})
+
+        top = self.get('analytics-top-books', limit=2).data["results"]
+        self.assertEqual([(row["book_id"], row["checkouts"]) for row in top], [(self.books[0].id, 3), (self.books[1].id, 2)])
+        authors = self.get('analytics-top-authors').data["results"]
+        self.assertEqual(authors[0], {"author": self.books[0].author, "checkouts": 3})
+
+        series = self.get('analytics-circulation', **{'from': self.day(10), 'to': self.day(8)}).data["results"]
+        self.assertEqual([(row["checkouts"], row["returns"]) for row in series], [(1, 0), (1, 0), (2, 0)])
+        weekly = self.get('analytics-circulation', interval='week').data["results"]
+        self.assertEqual(sum(row["checkouts"] for row in weekly), 6)
+
+    def test_incremental_refresh_invalidates_cached_reports(self):
+        call_command('refresh_rollups', stdout=io.StringIO())
+        self.assertEqual(self.get('analytics-summary').data["results"]["checkouts"], 6)
+        BorrowRecord.objects.create(customer=Customer.objects.first(), book=self.books[2])
+
+        self.assertEqual(self.get('analytics-summary')['X-Cache'], 'HIT')
+        out = io.StringIO()
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('refresh_rollups', stdout=out)
+        self.assertIn("1 days", out.getvalue())
+        self.assertEqual(self.get('analytics-summary').data["results"]["checkouts"], 7)
+        self.assertEqual(DailyCirculation.objects.count(), 11)
+
+    def test_rejects_bad_parameters(self):
+        self.assertEqual(self.get('analytics-summary', **{'from': 'yesterday'}).status_code, 400)
+        self.assertEqual(self.get('analytics-top-books', limit=0).status_code, 400)
+        self.assertEqual(self.get('analytics-circulation', interval='month').status_code, 400)
+
+
+# ===============================
+# 🗄️ Loan Archive Tests
+# ===============================
+class LoanArchiveTests(TestCase):
+    def setUp(self):
+        self.records = make_borrow_records(6)
+        old = datetime.date.today() - datetime.timedelta(days=400)
+        # Four old returned loans, one recent return, one still open.
+        for record in self.records[:4]:
+            BorrowRecord.objects.filter(pk=record.pk).update(
+                checkout_date=old, return_date=old + datetime.timedelta(days=7), is_returned=True
+            )
+        BorrowRecord.objects.filter(pk=self.records[4].pk).update(
+            return_date=datetime.date.today(), is_returned=True
+        )
+        services.recompute_loan_counters()
+
+    def test_moves_old_returned_loans_in_chunks(self):
+        chunks = []
+        moved = archive_returned_loans(batch_size=2, progress=chunks.append)
+        self.assertEqual(moved, 4)
+        self.assertEqual(chunks, [2, 4])
+        self.assertEqual(
+            sorted(BorrowRecord.objects.values_list('pk', flat=True)), [r.pk for r in self.records[4:]]
+        )
+        self.assertEqual(
+            sorted(ArchivedBorrowRecord.objects.values_list('pk', flat=True)), [r.pk for r in self.records[:4]]
+        )
+        self.assertEqual(archive_returned_loans(), 0)
+
+    def test_history_reads_span_both_tables(self):
+        out = io.StringIO()
+        call_command('archive_loans', stdout=out)
+        self.assertIn("4 loans", out.getvalue())
+
+        rows = APIClient().get(reverse('borrow-records'), {'page_size': 10}).data["results"]
+        self.assertEqual(len(rows), 6)
+        self.assertEqual(sum(row["is_archived"] for row in rows), 4)
+        self.assertEqual(BorrowHistory.objects.filter(return_date__isnull=True).count(), 1)
+
+        response = self.client.get(reverse('borrow-records-export'))
+        self.assertEqual(len(b''.join(response.streaming_content).splitlines()), 7)
+
+    def test_lifetime_counts_survive_archiving(self):
+        before = dict(Customer.objects.values_list('pk', 'lifetime_loan_count'))
+        archive_returned_loans()
+        services.recompute_loan_counters()
+        self.assertEqual(dict(Customer.objects.values_list('pk', 'lifetime_loan_count')), before)
+        self.assertEqual(sum(before.values()), 6)
+
+
+# ===============================
+# 🔄 Change Feed Tests
+# ===============================
+class ChangeFeedTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+
+    def feed(self, since, **params):
+        return self.client.get(reverse('change-feed'), {'since': since, **params})
+
+    def head(self):
+        return ChangeLog.objects.order_by('-seq').values_list('seq', flat=True).first() or 0
+
+    def test_upserts_and_tombstones(self):
+        response = self.client.post(reverse('book-list-create'), {
+            "title": "Dune", "author": "Frank Herbert", "isbn": "9780441013593",
+            "published_date": "1965-08-01", "copies_available": 2,
+        }, format='json')
+        book_id, created_seq = response.data["id"], response.data["change_seq"]
+        self.assertEqual(self.head(), created_seq)
+
+        since = self.head()
+        self.client.patch(reverse('book-detail', args=[book_id]), {"copies_available": 3}, format='json')
+        change = self.feed(since).data["results"]
+        self.assertEqual([(c["type"], c["id"], c["data"]["copies_available"]) for c in change], [("book", book_id, 3)])
+
+        self.client.delete(reverse('book-detail', args=[book_id]))
+        body = self.feed(since).data
+        self.assertEqual([(c["id"], c["deleted"], c["data"]) for c in body["results"]], [(book_id, True, None)])
+        self.assertEqual(body["next"], self.head())
+        # Each object keeps only its latest entry.
+        self.assertEqual(ChangeLog.objects.filter(kind=ChangeLog.BOOK, object_id=book_id).count(), 1)
+
+    def test_bulk_writes_are_logged_and_no_ops_are_not(self):
+        books = make_books(3)
+        since = self.head()
+        Book.objects.filter(pk__in=[b.pk for b in books[:2]]).update(copies_available=F('copies_available') + 1)
+        Book.objects.filter(pk=books[2].pk).update(copies_available=books[2].copies_available)
+        changed = [c["id"] for c in self.feed(since).data["results"]]
+        self.assertEqual(changed, [books[0].pk, books[1].pk])
+        self.assertEqual(Book.objects.get(pk=books[1].pk).change_seq, self.head())
+
+    def test_archived_loans_are_not_tombstoned(self):
+        records = make_borrow_records(2)
+        BorrowRecord.objects.update(return_date=datetime.date(2000, 1, 1), is_returned=True)
+        since = self.head()
+        archive_returned_loans()
+        self.assertEqual(self.feed(since).data["results"], [])
+
+        Customer.objects.filter(pk=records[0].customer_id).delete()
+        tombstones = {(c["type"], c["id"]) for c in self.feed(since).data["results"] if c["deleted"]}
+        self.assertEqual(tombstones, {("customer", records[0].customer_id), ("borrow_record", records[0].pk),
+                                      ("borrow_record", records[1].pk)})
+
+    def test_pages_and_rejects_bad_params(self):
+        make_customers(5)
+        body = self.feed(0, limit=3).data
+        self.assertEqual((len(body["results"]), body["has_more"]), (3, True))
+        rest = self.feed(body["next"], limit=3).data
+        self.assertEqual((len(rest["results"]), rest["has_more"]), (2, False))
+        self.assertEqual(self.feed(-1).status_code, 400)
+        self.assertEqual(self.feed('abc').status_code, 400)
+        self.assertEqual(self.feed(0, limit=0).status_code, 400)
+
+
+# ===============================
+# 🔀 Read Replica Routing Tests
+# ===============================
+class ReadReplicaRouterTests(SimpleTestCase):
+    def setUp(self):
+        self.router = routers.ReadReplicaRouter()
+
+    def test_reads_follow_the_request_until_it_writes(self):
+        self.assertEqual(self.router.db_for_read(Book), 'default')
+        token = routers.begin(routers.Routing('replica1', 'replica'))
+        try:
+            self.assertEqual(self.router.db_for_read(Book), 'replica1')
+            self.assertEqual(self.router.db_for_write(Book), 'default')
+            self.assertEqual(self.router.db_for_read(Book), 'default')
+        finally:
+            routers.end(token)
+        self.assertFalse(self.router.allow_migrate('replica1', 'library'))
+
+    @override_settings(LIBRARY_READ_ALIASES=['replica1', 'replica2'])
+    def test_choice(self):
+        chosen = {routers.choose(True, 'GET', pinned=False)[0] for _ in range(4)}
+        self.assertEqual(chosen, {'replica1', 'replica2'})
+        self.assertEqual(routers.choose(True, 'GET', pinned=True), ('default', 'pinned'))
+        self.assertEqual(routers.choose(False, 'GET', pinned=False), ('default', 'primary'))
+        self.assertEqual(routers.choose(True, 'POST', pinned=False), ('default', 'write'))
+
+    @override_settings(LIBRARY_READ_ALIASES=['replica1'])
+    def test_replicas_require_a_shared_cache(self):
+        self.assertEqual([error.id for error in check_replica_cache(None)], ['library.E001'])
+        shared = {'default': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+                              'LOCATION': tempfile.gettempdir()}}
+        with override_settings(CACHES=shared):
+            self.assertEqual(check_replica_cache(None), [])
+
+
+# The primary stands in for a replica; the decisions are what is tested.
+@override_settings(LIBRARY_READ_ALIASES=['default'])
+class ReadReplicaRoutingTests(TestCase):
+    def setUp(self):
+        registry.reset()
+        get_cache().clear()
+        self.client = APIClient()
+        self.book = make_books(1)[0]
+
+    def test_writes_pin_the_client_to_the_primary(self):
+        response = self.client.get(reverse('book-search'), {'title': self.book.title})
+        self.assertEqual(response['X-DB-Route'], 'default; reason=replica')
+        self.assertNotIn(routers.PIN_COOKIE, response.cookies)
+
+        response = self.client.patch(reverse('book-detail', args=[self.book.id]), {'copies_available': 4}, format='json')
+        self.assertEqual(response['X-DB-Route'], 'default; reason=write')
+        self.assertEqual(response.cookies[routers.PIN_COOKIE]['max-age'], 5)
+
+        response = self.client.get(reverse('book-search'), {'title': self.book.title})
+        self.assertEqual(response['X-DB-Route'], 'default; reason=pinned')
+        self.assertEqual(
+            registry.counter_value(
+                'library_db_routing_total', {"route": "api/books/search/", "alias": "default", "reason": "pinned"}
+            ), 1
+        )
+
+    def test_only_opted_in_views_use_replicas(self):
+        self.assertEqual(self.client.get(reverse('book-detail', args=[self.book.id]))['X-DB-Route'],
+                         'default; reason=primary')
+        self.assertEqual(self.client.get(reverse('change-feed'))['X-DB-Route'], 'default; reason=replica')
+
+
+# ===============================
+# 💸 Fine Tests
+# ===============================
+class FineTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.today = datetime.date.today()
+        self.standard, self.student, self.staff = make_customers(3)
+        Customer.objects.filter(pk=self.student.pk).update(membership_class='student')
+        Customer.objects.filter(pk=self.staff.pk).update(membership_class='staff')
+        books = make_books(4)
+        days_overdue = [(self.standard, 5), (self.standard, 100), (self.student, 5), (self.staff, 5)]
+        self.loans = BorrowRecord.objects.bulk_create(
+            BorrowRecord(customer=customer, book=book, due_date=self.today - datetime.timedelta(days=days))
+            for (customer, days), book in zip(days_overdue, books)
+        )
+
+    def balances(self):
+        latest = {}
+        for customer_id, balance in FineLedgerEntry.objects.order_by('day').values_list('customer_id', 'balance_cents'):
+            latest[customer_id] = balance
+        return latest
+
+    def test_accrual_follows_rules_and_is_idempotent(self):
+        # Standard: 25c/day after 1 grace day, capped at 1000c; student:
+        # 10c/day after 3; staff: free. Ranges of one loan exercise chunking.
+        self.assertEqual(compute_fines(self.today, batch_size=1), 3)
+        self.assertEqual(self.balances(), {self.standard.pk: 100 + 1000, self.student.pk: 20})
+        self.assertEqual(LoanFine.objects.get(pk=self.loans[1].pk).accrued_cents, 1000)
+
+        self.assertEqual(compute_fines(self.today), 0)
+        self.assertEqual(FineLedgerEntry.objects.count(), 2)
+
+        BorrowRecord.objects.filter(pk=self.loans[2].pk).update(return_date=self.today, is_returned=True)
+        tomorrow = self.today + datetime.timedelta(days=1)
+        self.assertEqual(compute_fines(tomorrow), 1)
+        entry = FineLedgerEntry.objects.get(customer=self.standard, day=tomorrow)
+        self.assertEqual((entry.amount_cents, entry.balance_cents), (25, 1125))
+        self.assertEqual(self.balances()[self.student.pk], 20)
+
+        with self.assertRaises(ValueError):
+            compute_fines(self.today)
+
+    def test_command_and_endpoint(self):
+        out = io.StringIO()
+        call_command('compute_fines', day=self.today.isoformat(), stdout=out)
+        self.assertIn("3 loans charged", out.getvalue())
+
+        body = self.client.get(reverse('customer-fines', args=[self.standard.pk])).data
+        self.assertEqual((body["balance_cents"], body["as_of"]), (1100, self.today))
+        self.assertEqual([row["loan_id"] for row in body["loans"]], [self.loans[1].pk, self.loans[0].pk])
+        self.assertEqual(self.client.get(reverse('customer-fines', args=[self.staff.pk])).data["balance_cents"], 0)
+        self.assertEqual(self.client.get(reverse('customer-fines', args=[0])).status_code, 404)
+
+
+# ===============================
+# 🚦 Admission Control Tests
+# ===============================
+class AdmissionPrimitiveTests(SimpleTestCase):
+    def test_token_bucket_refills_at_rate(self):
+        limiter = admission.RateLimiter(rate=2, burst=2)
+        self.assertEqual([limiter.take('a', now=0) for _ in range(2)], [0, 0])
+        self.assertAlmostEqual(limiter.take('a', now=0), 0.5)
+        self.assertEqual(limiter.take('b', now=0), 0)
+        self.assertEqual(limiter.take('a', now=0.5), 0)
+
+    def test_gate_queues_briefly_then_sheds(self):
+        gate = admission.ConcurrencyGate(1, wait=0.05, queue_depth=1)
+        self.assertEqual(gate.enter(), (True, None))
+        with ThreadPoolExecutor(1) as pool:
+            admitted, queued = pool.submit(gate.enter).result()
+        self.assertFalse(admitted)
+        self.assertGreaterEqual(queued, 0.05)
+        gate.queue_depth = 0
+        self.assertEqual(gate.enter(), (False, None))
+        gate.leave()
+        self.assertEqual(gate.enter(), (True, None))
+
+
+@override_settings(LIBRARY_WRITE_RATE_LIMIT={'rate': 1, 'burst': 2})
+class AdmissionControlTests(TestCase):
+    def setUp(self):
+        registry.reset()
+        self.client = APIClient()
+        self.customer, self.other = make_customers(2)
+        self.book = make_books(1, copies=5)[0]
+
+    def borrow(self, customer):
+        return self.client.post(reverse('borrow-book'), {"customer_id": customer.id, "book_id": self.book.id},
+                                format='json')
+
+    def test_writes_are_rate_limited_per_client(self):
+        self.assertEqual(self.borrow(self.customer).status_code, 201)
+        self.assertEqual(self.borrow(self.customer).status_code, 400)
+        # Another customer id in the body is not another client.
+        response = self.borrow(self.other)
+        self.assertEqual((response.status_code, response['Retry-After']), (429, '1'))
+        self.assertEqual(self.client.get(reverse('book-list-create')).status_code, 200)
+        self.assertEqual(
+            registry.counter_value(
+                'library_admission_rejected_total', {"route": "api/borrow/", "reason": "rate_limited"}
+            ), 1
+        )
+
+        self.client.force_login(User.objects.create_user('librarian'))
+        self.assertEqual(self.borrow(self.other).status_code, 201)
+
+    def test_rotating_client_headers_is_still_limited(self):
+        statuses = [
+            self.client.post(reverse('return-book'), {}, format='json', HTTP_X_CLIENT_ID=str(n)).status_code
+            for n in range(3)
+        ]
+        self.assertEqual(statuses[2], 429)
+
+    @override_settings(LIBRARY_WRITE_CONCURRENCY=1, LIBRARY_WRITE_QUEUE_SECONDS=0.01)
+    def test_full_gate_sheds_with_429(self):
+        middleware = AdmissionControlMiddleware(lambda request: HttpResponse())
+        middleware.gate.enter()
+        response = middleware(RequestFactory().post(reverse('return-book')))
+        self.assertEqual((response.status_code, response['Retry-After']), (429, '1'))
+        labels = {"route": "api/return/"}
+        self.assertEqual(registry.counter_value('library_admission_queued_total', labels), 1)
+        self.assertEqual(
+            registry.counter_value('library_admission_rejected_total', {**labels, "reason": "overloaded"}), 1
+        )
+        middleware.gate.leave()
+        self.assertEqual(middleware(RequestFactory().post(reverse('return-book'))).status_code, 200)
@@ -3,15 +3,36 @@ from .views import (
     BookListCreateView,
     BookRetrieveUpdateDeleteView,
     BookSearchView,
+    CacheStatsView,
+    CatalogImportView,
     CustomerListCreateView,
     CustomerRetrieveUpdateDeleteView,
+    CustomerFinesView,
     BorrowBookView,
     ReturnBookView,
+    BulkBorrowView,
+    BulkReturnView,
+    HoldListCreateView,
+    CancelHoldView,
     BorrowRecordListView,
+    BorrowRecordExportView,
     CustomerBorrowedBooksView,
     OverdueBooksView,
+    OverdueByCustomerView,
     BookRequestListCreateView,
-    BookRequestListView
+    BookRequestListView,
+    TopBooksView,
+    TopAuthorsView,
+    CirculationSeriesView,
+    CirculationSummaryView,
+    ChangeFeedView,
+    MetricsView,
+)
+from .async_views import (
+    AsyncBookListView,
+    AsyncBookDetailView,
+    AsyncBorrowRecordListView,
+    AsyncCustomerBorrowedBooksView,
 )
 
 urlpatterns = [
@@ -21,25 +42,61 @@ urlpatterns = [
     path('books/', BookListCreateView.as_view(), name='book-list-create'),
     path('books/<int:pk>/', BookRetrieveUpdateDeleteView.as_view(), name='book-detail'),
     path('books/search/', BookSearchView.as_view(), name='book-search'),
+    path('books/cache-stats/', CacheStatsView.as_view(), name='book-cache-stats'),
+    path('books/import/', CatalogImportView.as_view(kind='books'), name='book-import'),
 
     # ===============================
     # 👤 CUSTOMER URLS
     # ===============================
     path('customers/', CustomerListCreateView.as_view(), name='customer-list-create'),
+    path('customers/import/', CatalogImportView.as_view(kind='customers'), name='customer-import'),
     path('customers/<int:pk>/', CustomerRetrieveUpdateDeleteView.as_view(), name='customer-detail'),
     path('customers/<int:customer_id>/borrowed-books/', CustomerBorrowedBooksView.as_view(), name='customer-borrowed-books'),
+    path('customers/<int:customer_id>/fines/', CustomerFinesView.as_view(), name='customer-fines'),
 
     # ===============================
     # 🔄 BORROW & RETURN URLS
     # ===============================
     path('borrow/', BorrowBookView.as_view(), name='borrow-book'),
     path('return/', ReturnBookView.as_view(), name='return-book'),
+    path('borrow/bulk/', BulkBorrowView.as_view(), name='bulk-borrow'),
+    path('return/bulk/', BulkReturnView.as_view(), name='bulk-return'),
+    path('holds/', HoldListCreateView.as_view(), name='hold-list-create'),
+    path('holds/cancel/', CancelHoldView.as_view(), name='hold-cancel'),
     path('borrow-records/', BorrowRecordListView.as_view(), name='borrow-records'),
+    path('borrow-records/export/', BorrowRecordExportView.as_view(), name='borrow-records-export'),
     path('borrow-records/overdue/', OverdueBooksView.as_view(), name='overdue-books'),
+    path('borrow-records/overdue/by-customer/', OverdueByCustomerView.as_view(), name='overdue-by-customer'),
 
     # ===============================
     # 📖 BOOK REQUEST URLS
     # ===============================
     path('book-requests/', BookRequestListCreateView.as_view(), name='book-request-create'),
     path('book-requests/list/', BookRequestListView.as_view(), name='book-request-list'),
+
+    # ===============================
+    # 📊 ANALYTICS URLS
+    # ===============================
+    path('analytics/top-books/', TopBooksView.as_view(), name='analytics-top-books'),
+    path('analytics/top-authors/', TopAuthorsView.as_view(), name='analytics-top-authors'),
+    path('analytics/circulation/', CirculationSeriesView.as_view(), name='analytics-circulation'),
+    path('analytics/summary/', CirculationSummaryView.as_view(), name='analytics-summary'),
+
+    # ===============================
+    # 🔄 CHANGE FEED URLS
+    # ===============================
+    path('changes/', ChangeFeedView.as_view(), name='change-feed'),
+
+    # ===============================
+    # 📈 METRICS URLS
+    # ===============================
+    path('metrics/', MetricsView.as_view(), name='metrics'),
+
+    # ===============================
+    # ⚡ ASYNC READ URLS (serve under ASGI)
+    # ===============================
+    path('async/books/', AsyncBookListView.as_view(), name='async-book-list'),
+    path('async/books/<int:pk>/', AsyncBookDetailView.as_view(), name='async-book-detail'),
+    path('async/borrow-records/', AsyncBorrowRecordListView.as_view(), name='async-borrow-records'),
+    path('async/customers/<int:customer_id>/borrowed-books/', AsyncCustomerBorrowedBooksView.as_view(), name='async-customer-borrowed-books'),
 ]
@@ -1,52 +1,222 @@
+from django.conf import settings
+from django.db.models import Count, Min
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.utils.dateparse import parse_date
+from django.views import View
 from django.utils import timezone
 from rest_framework import generics, status
+from rest_framework.exceptions import ParseError
 from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
 from rest_framework.views import APIView
 from django_filters.rest_framework import DjangoFilterBackend
-from .models import Book, Customer, BorrowRecord, BookRequest
+from . import analytics, changes, export, fines, search, services
+from .fulfillment import fulfil_requests
+from .cache import CachedResponseMixin, cache_stats
+from .importer import IMPORTERS
+from .metrics import registry
+from .pagination import CustomerCursorPagination, DueDateCursorPagination
+from .models import Book, Customer, BorrowRecord, BorrowHistory, BookRequest, DailyCirculation, Hold
 from .serializers import (
     BookSerializer,
+    BookSearchResultSerializer,
     CustomerSerializer,
     BorrowRecordSerializer,
-    BookRequestSerializer
+    BorrowHistorySerializer,
+    BookRequestSerializer,
+    HoldCancelSerializer,
+    HoldSerializer,
 )
 
+# ===============================
+# ⚡ QUERYSET MIXINS
+# ===============================
+class EagerLoadingQuerySetMixin:
+    """
+    Applies the serializer's declared select_related/only() to the view's
+    queryset so related fields render without a query per row.
+    """
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        serializer_class = self.get_serializer_class()
+        if hasattr(serializer_class, 'setup_eager_loading'):
+            queryset = serializer_class.setup_eager_loading(queryset)
+        return queryset
+
+
+class SparseFieldsViewMixin:
+    """
+    `?fields=id,title` limits both the columns selected and the keys
+    rendered. GET lists skip ModelSerializer entirely: rows come from
+    `.values()` and go through the serializer's fast read path.
+    """
+    def get_requested_fields(self):
+        if not hasattr(self, '_requested_fields'):
+            self._requested_fields = None
+            request = getattr(self, 'request', None)
+            raw = request.query_params.get('fields') if request is not None and request.method == 'GET' else None
+            if raw:
+                fields = list(dict.fromkeys(name.strip() for name in raw.split(',') if name.strip()))
+                unknown = set(fields) - set(self.get_serializer_class().fast_fields())
+                if unknown:
+                    raise ParseError(f"Unknown field(s): {', '.join(sorted(unknown))}.")
+                self._requested_fields = fields
+        return self._requested_fields
+
+    def get_serializer(self, *args, **kwargs):
+        kwargs.setdefault('fields', self.get_requested_fields())
+        return super().get_serializer(*args, **kwargs)
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        fields = self.get_requested_fields()
+        if fields:
+            queryset = queryset.only(*self.get_serializer_class().fast_lookups(fields, extra=('pk',)))
+        return queryset
+
+    def list(self, request, *args, **kwargs):
+        serializer_class = self.get_serializer_class()
+        fields = self.get_requested_fields()
+        ordering = getattr(self.paginator, 'ordering', ())
+        ordering = (ordering,) if isinstance(ordering, str) else ordering
+        rows = serializer_class.fast_values(
+            self.filter_queryset(self.get_queryset()), fields, extra=[name.lstrip('-') for name in ordering]
+        )
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(serializer_class.fast_representation(page, fields))
+        return Response(serializer_class.fast_representation(rows, fields))
+
+
 # ===============================
 # 📚 BOOK VIEWS
 # ===============================
-class BookListCreateView(generics.ListCreateAPIView):
+class BookListCreateView(CachedResponseMixin, SparseFieldsViewMixin, generics.ListCreateAPIView):
+    replica_reads = True
     queryset = Book.objects.all()
     serializer_class = BookSerializer
+    cache_model = Book
 
+    def perform_create(self, serializer):
+        book = serializer.save()
+        fulfil_requests([(book.title, book.author)])
 
-class BookRetrieveUpdateDeleteView(generics.RetrieveUpdateDestroyAPIView):
+
+class BookRetrieveUpdateDeleteView(CachedResponseMixin, SparseFieldsViewMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = Book.objects.all()
     serializer_class = BookSerializer
+    cache_model = Book
+
+    def perform_update(self, serializer):
+        # A rename can turn a title into one customers asked for.
+        book = serializer.save()
+        fulfil_requests([(book.title, book.author)])
 
 
-class BookSearchView(generics.ListAPIView):
+class CacheStatsView(APIView):
+    """
+    Hit/miss counts for the catalog response cache.
+    """
+    def get(self, request):
+        return Response(cache_stats())
+
+
+class BookSearchView(SparseFieldsViewMixin, generics.ListAPIView):
     """
     Search books by title or author.
+
+    `?q=` runs a ranked full-text search over title, author and ISBN
+    (prefix terms with `*`, phrases in double quotes) and returns the
+    matches `page_size` at a time with highlighted fields, paged with
+    `?offset=` through the best `search.MAX_RESULTS`. Without `q`, the
+    exact `?title=` / `?author=` filters apply.
     """
+    replica_reads = True
     queryset = Book.objects.all()
     serializer_class = BookSerializer
     filter_backends = [DjangoFilterBackend]
     filterset_fields = ['title', 'author']
 
+    def list(self, request, *args, **kwargs):
+        q = request.query_params.get('q')
+        if q is None:
+            return super().list(request, *args, **kwargs)
+
+        try:
+            offset = int(request.query_params.get('offset', 0))
+        except ValueError:
+            raise ParseError("'offset' must be a whole number.")
+        if not 0 <= offset < search.MAX_RESULTS:
+            raise ParseError(f"'offset' must be between 0 and {search.MAX_RESULTS - 1}.")
+
+        limit = min(self.paginator.get_page_size(request), search.MAX_RESULTS - offset)
+        books = search.search_books(q, limit=limit + 1, offset=offset)
+        has_more = len(books) > limit and offset + limit < search.MAX_RESULTS
+        serializer = BookSearchResultSerializer(books[:limit], many=True, fields=self.get_requested_fields())
+        url = request.build_absolute_uri()
+        previous = None
+        if offset:
+            previous = (
+                replace_query_param(url, 'offset', offset - limit) if offset > limit
+                else remove_query_param(url, 'offset')
+            )
+        return Response({
+            "next": replace_query_param(url, 'offset', offset + limit) if has_more else None,
+            "previous": previous,
+            "results": serializer.data,
+        })
+
+
+class CatalogImportView(APIView):
+    """
+    Bulk upsert rows posted as `{"rows": [{...}, ...]}`. Uses the same
+    importer as `manage.py import_catalog`; invalid rows are reported per
+    row and do not stop the rest of the import.
+    """
+    kind = None
+
+    def post(self, request):
+        if not isinstance(request.data, dict):
+            return Response({"error": "Expected a JSON object with 'rows'."}, status=status.HTTP_400_BAD_REQUEST)
+        rows = request.data.get("rows")
+        max_rows = getattr(settings, 'LIBRARY_MAX_IMPORT_ROWS', 10000)
+        if not isinstance(rows, list) or not rows:
+            return Response({"error": "'rows' must be a non-empty list."}, status=status.HTTP_400_BAD_REQUEST)
+        if len(rows) > max_rows:
+            return Response({"error": f"An import may contain at most {max_rows} rows."}, status=status.HTTP_400_BAD_REQUEST)
+
+        rows = [row if isinstance(row, dict) else {} for row in rows]
+        result = IMPORTERS[self.kind].import_rows(rows)
+        return Response(result.as_dict(), status=status.HTTP_200_OK)
+
 
 # ===============================
 # 👤 CUSTOMER VIEWS
 # ===============================
-class CustomerListCreateView(generics.ListCreateAPIView):
+class CustomerListCreateView(SparseFieldsViewMixin, generics.ListCreateAPIView):
+    replica_reads = True
     queryset = Customer.objects.all()
     serializer_class = CustomerSerializer
 
 
-class CustomerRetrieveUpdateDeleteView(generics.RetrieveUpdateDestroyAPIView):
+class CustomerRetrieveUpdateDeleteView(SparseFieldsViewMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = Customer.objects.all()
     serializer_class = CustomerSerializer
 
 
+class CustomerFinesView(APIView):
+    """
+    A customer's fine balance in cents as of the last `compute_fines` run,
+    with their recent daily postings and per-loan fines.
+    """
+    replica_reads = True
+
+    def get(self, request, customer_id):
+        if not Customer.objects.filter(pk=customer_id).exists():
+            return Response({"error": "Customer not found."}, status=status.HTTP_404_NOT_FOUND)
+        return Response(fines.customer_fines(customer_id))
+
+
 # ===============================
 # 🔄 BORROW & RETURN VIEWS
 # ===============================
@@ -55,26 +225,14 @@ class BorrowBookView(APIView):
     Allows a customer to borrow a book if copies are available.
     """
     def post(self, request):
-        book_id = request.data.get("book_id")
-        customer_id = request.data.get("customer_id")
-
         try:
-            book = Book.objects.get(id=book_id)
-            customer = Customer.objects.get(id=customer_id)
-        except (Book.DoesNotExist, Customer.DoesNotExist):
-            return Response({"error": "Book or Customer not found."}, status=status.HTTP_404_NOT_FOUND)
-
-        if book.copies_available < 1:
-            return Response({"error": "No copies available for this book."}, status=status.HTTP_400_BAD_REQUEST)
-
-        if BorrowRecord.objects.filter(customer=customer, book=book, return_date__isnull=True).exists():
-            return Response({"error": "This customer already borrowed this book."}, status=status.HTTP_400_BAD_REQUEST)
+            record = services.borrow_book(request.data.get("customer_id"), request.data.get("book_id"))
+        except services.NotFound as exc:
+            return Response({"error": exc.message}, status=status.HTTP_404_NOT_FOUND)
+        except services.CirculationError as exc:
+            return Response({"error": exc.message}, status=status.HTTP_400_BAD_REQUEST)
 
-        BorrowRecord.objects.create(book=book, customer=customer)
-        book.copies_available -= 1
-        book.save()
-
-        return Response({"message": f"{customer.name} borrowed '{book.title}' successfully!"}, status=status.HTTP_201_CREATED)
+        return Response({"message": f"{record.customer.name} borrowed '{record.book.title}' successfully!"}, status=status.HTTP_201_CREATED)
 
 
 class ReturnBookView(APIView):
@@ -84,66 +242,232 @@ class ReturnBookView(APIView):
     increases the book's available copies.
     """
     def post(self, request):
-        book_id = request.data.get("book_id")
-        customer_id = request.data.get("customer_id")
+        try:
+            record = services.return_book(request.data.get("customer_id"), request.data.get("book_id"))
+        except services.CirculationError as exc:
+            return Response({"error": exc.message}, status=status.HTTP_404_NOT_FOUND)
+
+        return Response({"message": f"{record.customer.name} returned '{record.book.title}' successfully!"}, status=status.HTTP_200_OK)
+
+
+class BulkCirculationView(APIView):
+    """
+    Base view for bulk circulation endpoints. Expects
+    `{"items": [{"customer_id": ..., "book_id": ...}, ...]}` and returns
+    a result per item in the same order.
+    """
+    action = None
+
+    def post(self, request):
+        if not isinstance(request.data, dict):
+            return Response({"error": "Expected a JSON object with 'items'."}, status=status.HTTP_400_BAD_REQUEST)
+        items = request.data.get("items")
+        max_items = getattr(settings, 'LIBRARY_MAX_BULK_ITEMS', 1000)
+        if not isinstance(items, list) or not items:
+            return Response({"error": "'items' must be a non-empty list."}, status=status.HTTP_400_BAD_REQUEST)
+        if len(items) > max_items:
+            return Response({"error": f"A batch may contain at most {max_items} items."}, status=status.HTTP_400_BAD_REQUEST)
 
         try:
-            customer = Customer.objects.get(id=customer_id)
-            book = Book.objects.get(id=book_id)
-        except (Customer.DoesNotExist, Book.DoesNotExist):
-            return Response({"error": "Book or Customer not found."}, status=status.HTTP_404_NOT_FOUND)
+            results = self.action(items)
+        except services.BatchConflict as exc:
+            return Response({"error": exc.message}, status=status.HTTP_409_CONFLICT)
+
+        failed = sum(1 for result in results if result["status"] == "error")
+        return Response(
+            {"succeeded": len(results) - failed, "failed": failed, "results": results},
+            status=status.HTTP_200_OK
+        )
+
+
+class BulkBorrowView(BulkCirculationView):
+    """
+    Borrow many books in one request.
+    """
+    action = staticmethod(services.bulk_borrow)
+
 
+class BulkReturnView(BulkCirculationView):
+    """
+    Return many books in one request.
+    """
+    action = staticmethod(services.bulk_return)
+
+
+# ===============================
+# 🕒 HOLD VIEWS
+# ===============================
+class HoldListCreateView(generics.ListCreateAPIView):
+    """
+    GET lists holds (filter with `?customer=`, `?book=`, `?status=`), each
+    waiting hold with its place in the queue. POST
+    `{"customer_id": ..., "book_id": ...}` joins the queue for a title with
+    no copies on the shelf; returned copies are then set aside for the
+    queue head automatically, so clients need not poll for availability.
+    """
+    replica_reads = True
+    serializer_class = HoldSerializer
+    filterset_fields = ['customer', 'book', 'status']
+
+    queryset = Hold.objects.all()
+
+    def list(self, request, *args, **kwargs):
+        page = self.paginate_queryset(self.filter_queryset(self.get_queryset()))
+        services.set_queue_positions(page)
+        return self.get_paginated_response(self.get_serializer(page, many=True).data)
+
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
         try:
-            record = BorrowRecord.objects.get(book=book, customer=customer, return_date__isnull=True)
-        except BorrowRecord.DoesNotExist:
-            return Response({"error": "No active borrow record found for this book and customer."}, status=status.HTTP_404_NOT_FOUND)
+            hold = services.place_hold(serializer.validated_data["customer_id"], serializer.validated_data["book_id"])
+        except services.NotFound as exc:
+            return Response({"error": exc.message}, status=status.HTTP_404_NOT_FOUND)
+        except services.CirculationError as exc:
+            return Response({"error": exc.message}, status=status.HTTP_400_BAD_REQUEST)
 
-        record.return_date = timezone.now()
-        record.save()
+        return Response(HoldSerializer(hold).data, status=status.HTTP_201_CREATED)
 
-        book.copies_available += 1
-        book.save()
 
-        return Response({"message": f"{customer.name} returned '{book.title}' successfully!"}, status=status.HTTP_200_OK)
+class CancelHoldView(APIView):
+    """
+    Cancel a customer's active hold on a book. A copy already set aside
+    for them passes to the next customer in line.
+    """
+    def post(self, request):
+        serializer = HoldCancelSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            hold = services.cancel_hold(serializer.validated_data["customer_id"], serializer.validated_data["book_id"])
+        except services.CirculationError as exc:
+            return Response({"error": exc.message}, status=status.HTTP_404_NOT_FOUND)
+
+        return Response(HoldSerializer(hold).data, status=status.HTTP_200_OK)
 
 
 # ===============================
 # 📄 BORROW RECORD VIEWS
 # ===============================
-class BorrowRecordListView(generics.ListAPIView):
+class BorrowRecordListView(SparseFieldsViewMixin, EagerLoadingQuerySetMixin, generics.ListAPIView):
     """
-    List all borrow records.
+    List all borrow records, archived history included.
     """
-    queryset = BorrowRecord.objects.all()
-    serializer_class = BorrowRecordSerializer
+    replica_reads = True
+    queryset = BorrowHistory.objects.all()
+    serializer_class = BorrowHistorySerializer
 
 
-class CustomerBorrowedBooksView(generics.ListAPIView):
+class CustomerBorrowedBooksView(SparseFieldsViewMixin, EagerLoadingQuerySetMixin, generics.ListAPIView):
     """
     List all books currently borrowed by a specific customer.
     """
+    replica_reads = True
+    queryset = BorrowRecord.objects.all()
     serializer_class = BorrowRecordSerializer
 
     def get_queryset(self):
         customer_id = self.kwargs['customer_id']
-        return BorrowRecord.objects.filter(customer_id=customer_id, return_date__isnull=True)
+        return super().get_queryset().filter(customer_id=customer_id, return_date__isnull=True)
 
 
-class OverdueBooksView(generics.ListAPIView):
+class OverdueBooksView(SparseFieldsViewMixin, EagerLoadingQuerySetMixin, generics.ListAPIView):
     """
     List all borrow records that are overdue.
+    Answered from the open-loans due date index, so the cost follows the
+    number of overdue loans rather than the size of the loan history.
     """
+    replica_reads = True
+    queryset = BorrowRecord.objects.all()
     serializer_class = BorrowRecordSerializer
+    pagination_class = DueDateCursorPagination
+
+    def get_queryset(self):
+        today = timezone.localdate()
+        return super().get_queryset().filter(return_date__isnull=True, due_date__lt=today)
+
+
+class OverdueByCustomerView(generics.ListAPIView):
+    """
+    Overdue loan counts per customer, aggregated in SQL.
+    """
+    replica_reads = True
+    pagination_class = CustomerCursorPagination
 
     def get_queryset(self):
-        today = timezone.now().date()
-        return BorrowRecord.objects.filter(return_date__isnull=True, due_date__lt=today)
+        today = timezone.localdate()
+        return (
+            BorrowRecord.objects.filter(return_date__isnull=True, due_date__lt=today)
+            .values('customer_id', 'customer__name')
+            .annotate(overdue_count=Count('id'), oldest_due_date=Min('due_date'))
+        )
+
+    def list(self, request, *args, **kwargs):
+        page = self.paginate_queryset(self.get_queryset())
+        results = [
+            {
+                "customer_id": row["customer_id"],
+                "customer": row["customer__name"],
+                "overdue_count": row["overdue_count"],
+                "oldest_due_date": row["oldest_due_date"],
+            }
+            for row in page
+        ]
+        return self.get_paginated_response(results)
+
+
+class BorrowRecordExportView(View):
+    """
+    Stream the full borrow history, archived loans included, as CSV
+    (default) or NDJSON.
+
+    Query params: `format=csv|ndjson`, `customer_id`, and `from` / `to`
+    checkout dates (YYYY-MM-DD). Rows are streamed from a server-side
+    iterator, so memory use stays flat however large the export is.
+    A plain Django view: DRF would treat `format` as a renderer override.
+    """
+    formats = {
+        'csv': (export.stream_csv, 'text/csv'),
+        'ndjson': (export.stream_ndjson, 'application/x-ndjson'),
+    }
+
+    @staticmethod
+    def parse_filters(params):
+        customer_id = int(params['customer_id']) if params.get('customer_id') else None
+        dates = []
+        for name in ('from', 'to'):
+            value = params.get(name)
+            parsed = parse_date(value) if value else None
+            if value and parsed is None:
+                raise ValueError(f"Invalid date for '{name}'.")
+            dates.append(parsed)
+        return customer_id, *dates
+
+    def get(self, request):
+        export_format = request.GET.get('format', 'csv')
+        if export_format not in self.formats:
+            return JsonResponse({"error": "format must be 'csv' or 'ndjson'."}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            customer_id, date_from, date_to = self.parse_filters(request.GET)
+        except ValueError:
+            return JsonResponse({"error": "customer_id must be an integer and from/to must be YYYY-MM-DD dates."}, status=status.HTTP_400_BAD_REQUEST)
+
+        stream, content_type = self.formats[export_format]
+        rows = export.borrow_history_rows(customer_id=customer_id, date_from=date_from, date_to=date_to)
+        response = StreamingHttpResponse(stream(rows), content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="borrow-records.{export_format}"'
+        return response
 
 
 # ===============================
 # 📖 BOOK REQUEST VIEWS
 # ===============================
-class BookRequestListCreateView(generics.ListCreateAPIView):
+class BookRequestListCreateView(SparseFieldsViewMixin, EagerLoadingQuerySetMixin, generics.ListCreateAPIView):
+    """
+    GET lists book requests. POST `{"customer_id", "title", "author",
+    "fee"}` records a request for a book the library does not have; it is
+    marked fulfilled when a matching book is added to the catalog.
+    """
     queryset = BookRequest.objects.all()
     serializer_class = BookRequestSerializer
 
@@ -151,25 +475,145 @@ class BookRequestListCreateView(generics.ListCreateAPIView):
         data = request.data
         try:
             customer = Customer.objects.get(id=data.get("customer_id"))
-        except Customer.DoesNotExist:
+        except (Customer.DoesNotExist, ValueError, TypeError):
             return Response({"error": "Customer not found."}, status=status.HTTP_404_NOT_FOUND)
 
-        new_request = BookRequest.objects.create(
-            customer=customer,
-            title=data.get("title"),
-            author=data.get("author"),
-            fee=data.get("fee", 0.00)
-        )
+        serializer = self.get_serializer(data={
+            "requested_title": data.get("title"),
+            "requested_author": data.get("author"),
+            "extra_fee": data.get("fee", 0.00),
+        })
+        serializer.is_valid(raise_exception=True)
+        new_request = serializer.save(customer=customer)
 
         return Response(
-            {"message": f"Book request for '{new_request.title}' has been created. We’ll notify you once it’s available."},
+            {"message": f"Book request for '{new_request.requested_title}' has been created. We’ll notify you once it’s available."},
             status=status.HTTP_201_CREATED
         )
 
 
-class BookRequestListView(generics.ListAPIView):
+class BookRequestListView(SparseFieldsViewMixin, EagerLoadingQuerySetMixin, generics.ListAPIView):
     """
     List all book requests.
     """
+    replica_reads = True
     queryset = BookRequest.objects.all()
     serializer_class = BookRequestSerializer
+
+
+# ===============================
+# 📊 ANALYTICS VIEWS
+# ===============================
+class AnalyticsView(APIView):
+    """
+    Base view for circulation reports. `?from=` / `?to=` (YYYY-MM-DD)
+    bound the report and default to the last 30 days. Figures are read
+    from the daily rollup tables, current as of `rolled_up_to`, the last
+    day `manage.py refresh_rollups` covered. Subclasses add
+    CachedResponseMixin; each refresh invalidates the cached reports.
+
+    Subclasses must define `report(params, date_from, date_to)` returning
+    the `results`; it may raise ValueError on bad parameters.
+    """
+    replica_reads = True
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if not callable(getattr(cls, 'report', None)):
+            raise TypeError(f"{cls.__name__} must define report(params, date_from, date_to).")
+
+    def get(self, request):
+        try:
+            date_from, date_to = analytics.parse_range(request.query_params)
+            results = self.report(request.query_params, date_from, date_to)
+        except ValueError as exc:
+            return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({
+            "from": date_from, "to": date_to,
+            "rolled_up_to": analytics.last_rolled_up_day(),
+            "results": results,
+        })
+
+
+class TopBooksView(CachedResponseMixin, AnalyticsView):
+    """
+    Most borrowed titles in the range, `?limit=` of them (default 10).
+    """
+    cache_model = DailyCirculation
+
+    def report(self, params, date_from, date_to):
+        return analytics.top_books(date_from, date_to, analytics.parse_limit(params))
+
+
+class TopAuthorsView(CachedResponseMixin, AnalyticsView):
+    """
+    Most borrowed authors in the range, `?limit=` of them (default 10).
+    """
+    cache_model = DailyCirculation
+
+    def report(self, params, date_from, date_to):
+        return analytics.top_authors(date_from, date_to, analytics.parse_limit(params))
+
+
+class CirculationSeriesView(CachedResponseMixin, AnalyticsView):
+    """
+    Checkouts, returns and average loan length per `?interval=day|week`.
+    """
+    cache_model = DailyCirculation
+
+    def report(self, params, date_from, date_to):
+        interval = params.get('interval', 'day')
+        if interval not in ('day', 'week'):
+            raise ValueError("interval must be 'day' or 'week'.")
+        return analytics.circulation_series(date_from, date_to, interval)
+
+
+class CirculationSummaryView(CachedResponseMixin, AnalyticsView):
+    """
+    Total checkouts and returns and the average loan length in the range.
+    """
+    cache_model = DailyCirculation
+
+    def report(self, params, date_from, date_to):
+        return analytics.circulation_summary(date_from, date_to)
+
+
+# ===============================
+# 🔄 CHANGE FEED VIEW
+# ===============================
+class ChangeFeedView(APIView):
+    """
+    Books, customers and loans changed after `?since=<seq>` (default 0,
+    i.e. everything), `?limit=` at a time, oldest change first. Deleted
+    rows come back with `deleted: true` and no data. Sync clients keep
+    the returned `next` and pass it as `since` until `has_more` is false.
+    """
+    replica_reads = True
+
+    def get(self, request):
+        try:
+            since, limit = changes.parse_params(request.query_params)
+        except ValueError as exc:
+            return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(changes.changes_since(since, limit))
+
+
+# ===============================
+# 📈 METRICS VIEW
+# ===============================
+class MetricsView(View):
+    """
+    Prometheus text exposition of the request metrics collected by
+    `PerformanceMetricsMiddleware`, plus the catalog cache counters.
+    A plain Django view so DRF content negotiation stays out of the way.
+    """
+    def get(self, request):
+        stats = cache_stats()
+        body = registry.render() + (
+            "# TYPE library_cache_hits_total counter\n"
+            f"library_cache_hits_total {stats['hits']}\n"
+            "# TYPE library_cache_misses_total counter\n"
+            f"library_cache_misses_total {stats['misses']}\n"
+        )
+        return HttpResponse(body, content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -43,11 +44,14 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'library.middleware.PerformanceMetricsMiddleware',
+    'library.middleware.ReadReplicaRoutingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'library.middleware.AdmissionControlMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -75,13 +79,79 @@ WSGI_APPLICATION = 'library_management.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# SQLite connection profiles, picked with the LIBRARY_DB_PROFILE environment
+# variable. "tuned" applies the pragmas below on every new connection, keeps
+# connections open between requests and starts write transactions with
+# BEGIN IMMEDIATE so they queue on the busy timeout instead of failing with
+# "database is locked" when upgrading from a read lock. WAL mode, so readers
+# never block on the writer, is stored in the database file and is switched
+# on once by migration 0020, not per connection, so opening a file never
+# rewrites it.
+SQLITE_PROFILES = {
+    'stock': {},
+    'tuned': {
+        'OPTIONS': {
+            'init_command': (
+                'PRAGMA synchronous=NORMAL;'
+                'PRAGMA mmap_size=268435456;'
+                'PRAGMA cache_size=-65536;'
+                'PRAGMA temp_store=MEMORY;'
+            ),
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': 20,
+        },
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+    },
+}
+LIBRARY_DB_PROFILE = os.environ.get('LIBRARY_DB_PROFILE', 'tuned')
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'NAME': os.environ.get('LIBRARY_DB_NAME', BASE_DIR / 'db.sqlite3'),
+        **SQLITE_PROFILES[LIBRARY_DB_PROFILE],
     }
 }
 
+# Read replicas: a comma-separated list of SQLite files in
+# LIBRARY_READ_REPLICAS, each added as a `replicaN` alias and refreshed from
+# the primary with `manage.py sync_replicas`. List, search and analytics
+# reads are spread over them (see library.routers); clients that just
+# wrote read from the primary for LIBRARY_READ_YOUR_WRITES_SECONDS. Tests
+# mirror every replica onto the primary.
+for number, name in enumerate(filter(None, os.environ.get('LIBRARY_READ_REPLICAS', '').split(',')), start=1):
+    DATABASES[f'replica{number}'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': name.strip(),
+        **SQLITE_PROFILES[LIBRARY_DB_PROFILE],
+        'TEST': {'MIRROR': 'default'},
+    }
+LIBRARY_READ_ALIASES = [alias for alias in DATABASES if alias != 'default']
+LIBRARY_READ_YOUR_WRITES_SECONDS = 5
+DATABASE_ROUTERS = ['library.routers.ReadReplicaRouter']
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# Swap the backend (e.g. Redis or Memcached) to share the catalog cache
+# between worker processes. With LocMemCache each process invalidates only
+# its own copy, so other workers (and anything `manage.py refresh_rollups`
+# changes) can serve stale responses for up to LIBRARY_CACHE_TIMEOUT
+# seconds; read replicas refuse to run on it (check library.E001).
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'library',
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    }
+}
+
+# Cache alias and lifetime (seconds) for cached book responses.
+LIBRARY_CACHE_ALIAS = 'default'
+LIBRARY_CACHE_TIMEOUT = 300
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -127,5 +197,70 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 REST_FRAMEWORK = {
     'DEFAULT_FILTER_BACKENDS': [
         'django_filters.rest_framework.DjangoFilterBackend'
-    ]
-}
\ No newline at end of file
+    ],
+    'DEFAULT_PAGINATION_CLASS': 'library.pagination.LibraryCursorPagination',
+    'PAGE_SIZE': 50,
+}
+
+# Upper bound for the ?page_size= query parameter on list endpoints.
+LIBRARY_MAX_PAGE_SIZE = 500
+
+# Maximum number of items accepted by /api/borrow/bulk/ and /api/return/bulk/.
+LIBRARY_MAX_BULK_ITEMS = 1000
+
+# Maximum number of rows accepted by /api/books/import/ and /api/customers/import/.
+# Larger loads should use `manage.py import_catalog`.
+LIBRARY_MAX_IMPORT_ROWS = 10000
+
+# Request instrumentation: a request that runs the same SQL statement this
+# many times is counted (and logged) as a likely N+1, and responses carry a
+# Server-Timing header with db/render/app/total durations.
+LIBRARY_DUPLICATE_QUERY_THRESHOLD = 5
+LIBRARY_SERVER_TIMING = True
+
+# Loan length in days per customer membership class. A book's own
+# loan_period_days overrides this.
+LIBRARY_LOAN_PERIOD_DAYS = {
+    'default': 14,
+    'standard': 14,
+    'student': 21,
+    'staff': 28,
+}
+
+# Open loans allowed per membership class, enforced when borrowing.
+LIBRARY_MAX_OPEN_LOANS = {
+    'default': 5,
+    'standard': 5,
+    'student': 5,
+    'staff': 10,
+}
+
+# Days a copy set aside for the head of a hold queue waits to be borrowed
+# before `manage.py expire_holds` passes it to the next customer in line.
+LIBRARY_HOLD_PICKUP_DAYS = 3
+
+# Returned loans older than this many days are moved out of the hot
+# BorrowRecord table into ArchivedBorrowRecord by `manage.py archive_loans`.
+LIBRARY_ARCHIVE_AFTER_DAYS = 365
+
+# Overdue fines per membership class, accrued nightly by `manage.py
+# compute_fines`: `daily_cents` for every day overdue past `grace_days`,
+# up to `max_cents` per loan.
+LIBRARY_FINE_RULES = {
+    'default': {'daily_cents': 25, 'grace_days': 1, 'max_cents': 1000},
+    'standard': {'daily_cents': 25, 'grace_days': 1, 'max_cents': 1000},
+    'student': {'daily_cents': 10, 'grace_days': 3, 'max_cents': 500},
+    'staff': {'daily_cents': 0, 'grace_days': 0, 'max_cents': 0},
+}
+
+# Admission control for writes (see library.middleware.AdmissionControlMiddleware).
+# Each client (the signed-in user, else REMOTE_ADDR; behind a proxy, make
+# sure REMOTE_ADDR is the real client address) gets a token bucket of
+# `burst` writes refilled at `rate` per second. At most
+# LIBRARY_WRITE_CONCURRENCY writes run at once per worker, and up to
+# LIBRARY_WRITE_QUEUE_DEPTH more wait LIBRARY_WRITE_QUEUE_SECONDS for a slot
+# before getting a 429. Set either limit to None to turn it off.
+LIBRARY_WRITE_RATE_LIMIT = {'rate': 10, 'burst': 50}
+LIBRARY_WRITE_CONCURRENCY = 4
+LIBRARY_WRITE_QUEUE_SECONDS = 0.5
+LIBRARY_WRITE_QUEUE_DEPTH = 32